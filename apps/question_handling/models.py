@@ -2,6 +2,9 @@
 from django.db import models
 from apps.user_management.models import Users
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 import uuid
 
 
@@ -53,3 +56,12 @@ class Questions(models.Model):
     def save(self, *args, **kwargs):
         self.clean()
         super().save(*args, **kwargs)
+
+
+@receiver(post_save, sender=Questions)
+@receiver(post_delete, sender=Questions)
+def invalidate_questionnaire_cache(sender, instance, **kwargs):
+    """Toute modification d'une question invalide le questionnaire mis en cache."""
+    from .questionnaire_cache import questionnaire_cache
+    # Après validation : un autre processus ne peut pas recharger les anciennes lignes sous la nouvelle version
+    transaction.on_commit(questionnaire_cache.bump_version)
@@ -0,0 +1,123 @@
+# apps/question_handling/questionnaire_cache.py
+
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+from dataclasses import dataclass
+import logging
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+if TYPE_CHECKING:
+    from .models import Questions
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "questionnaire:version"
+# Backends propres au processus : une version qui y est publiée n'atteint pas les autres
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def shared_cache(alias: str) -> Optional[BaseCache]:
+    """Cache de l'alias s'il est partagé entre processus, None sinon (LOCAL_CACHE_BACKENDS)."""
+    cache = caches[alias]
+    return None if isinstance(cache, LOCAL_CACHE_BACKENDS) else cache
+
+
+@dataclass(frozen=True)
+class QuestionnaireSnapshot:
+    """Questionnaire actif tel que chargé à une version donnée (lecture seule)"""
+    version: Optional[str]
+    questions: Tuple['Questions', ...]
+    configurations: Dict[str, Dict[str, Any]]
+    categories: Dict[str, Tuple[str, ...]]
+    loaded_at: float
+
+
+class QuestionnaireCache:
+    """
+    Cache, propre au processus, des questions actives triées par order_num.
+
+    La version courante est partagée dans le cache Django : toute modification
+    du questionnaire (signaux post_save / post_delete, réordonnancement) la
+    remplace, et chaque processus recharge sa copie à la requête suivante.
+    Sans cache partagé (LocMemCache, DummyCache), aucune version n'est lue :
+    la copie expire après QUESTIONNAIRE_CACHE_TTL secondes.
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+        self._snapshot: Optional[QuestionnaireSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self) -> Optional[BaseCache]:
+        return shared_cache(self.alias)
+
+    async def aget(self) -> QuestionnaireSnapshot:
+        """Questionnaire actif, rechargé si sa version a changé."""
+        cache = self.cache
+        version = None
+        if cache is not None:
+            version = await cache.aget(VERSION_KEY)
+            if version is None:
+                await cache.aadd(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+                version = await cache.aget(VERSION_KEY)
+
+        snapshot = self._snapshot
+        if snapshot is not None and self._is_current(snapshot, version):
+            return snapshot
+
+        snapshot = await self._load(version)
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def bump_version(self) -> None:
+        """Invalide le questionnaire de tous les processus."""
+        with self._lock:
+            self._snapshot = None
+        cache = self.cache
+        if cache is None:
+            return
+        try:
+            cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        except Exception as e:
+            logger.warning(f"Version du questionnaire non publiée: {str(e)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    @staticmethod
+    def _is_current(snapshot: QuestionnaireSnapshot, version: Optional[str]) -> bool:
+        if version is None:
+            return time.monotonic() - snapshot.loaded_at < settings.QUESTIONNAIRE_CACHE_TTL
+        return snapshot.version == version
+
+    @staticmethod
+    async def _load(version: Optional[str]) -> QuestionnaireSnapshot:
+        from .models import Questions
+
+        questions = tuple([
+            question async for question in Questions.objects.filter(is_active=True).order_by('order_num')
+        ])
+        categories: Dict[str, list] = {}
+        for question in questions:
+            if question.category:
+                categories.setdefault(question.category, []).append(str(question.id))
+
+        logger.info(f"Questionnaire chargé ({len(questions)} questions, version {version})")
+        return QuestionnaireSnapshot(
+            version=version,
+            questions=questions,
+            configurations={str(question.id): question.configuration or {} for question in questions},
+            categories={category: tuple(ids) for category, ids in categories.items()},
+            loaded_at=time.monotonic()
+        )
+
+
+questionnaire_cache = QuestionnaireCache()
@@ -1,3 +1,44 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
+from asgiref.sync import async_to_sync
+from apps.question_handling import questionnaire_cache
+from apps.question_handling.models import Questions
+from apps.question_handling.questionnaire_cache import QuestionnaireCache
 
-# Create your tests here.
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}})
+class QuestionnaireCacheTest(TestCase):
+    def setUp(self):
+        # Le cache en mémoire locale joue ici le rôle d'un cache partagé (Redis)
+        patcher = mock.patch.object(questionnaire_cache, 'LOCAL_CACHE_BACKENDS', ())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = QuestionnaireCache()
+        self.cache.bump_version()
+        self.question = Questions.objects.create(
+            text="Quel est votre objectif ?", type='TEXT', category="objectifs", order_num=1, configuration={}
+        )
+
+    def test_questionnaire_is_reloaded_only_when_version_changes(self):
+        first = async_to_sync(self.cache.aget)()
+        with self.assertNumQueries(0):
+            self.assertIs(async_to_sync(self.cache.aget)(), first)
+
+        self.question.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.save()
+
+        second = async_to_sync(self.cache.aget)()
+        self.assertEqual(first.categories, {"objectifs": (str(self.question.id),)})
+        self.assertNotEqual(second.version, first.version)
+        self.assertEqual(second.questions, ())
+
+    def test_process_local_cache_expires_after_ttl(self):
+        with mock.patch.object(questionnaire_cache, 'LOCAL_CACHE_BACKENDS', (questionnaire_cache.LocMemCache,)):
+            first = async_to_sync(self.cache.aget)()
+            # Une version publiée en mémoire locale ne préviendrait pas les autres processus
+            self.assertIsNone(first.version)
+            with self.assertNumQueries(0):
+                self.assertIs(async_to_sync(self.cache.aget)(), first)
+            with self.settings(QUESTIONNAIRE_CACHE_TTL=0):
+                self.assertIsNot(async_to_sync(self.cache.aget)(), first)
@@ -4,7 +4,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import render
+from django.db import transaction
 from .models import Questions
+from .questionnaire_cache import questionnaire_cache
 from .serializers import QuestionSerializer
 
 class QuestionsViewSet(viewsets.ModelViewSet):
@@ -26,8 +28,11 @@ class QuestionsViewSet(viewsets.ModelViewSet):
    def reorder(self, request):
        try:
            orders = request.data
-           for question_id, order in orders.items():
-               Questions.objects.filter(id=question_id).update(order_num=order)
+           with transaction.atomic():
+               for question_id, order in orders.items():
+                   Questions.objects.filter(id=question_id).update(order_num=order)
+               # update() n'émet pas post_save
+               transaction.on_commit(questionnaire_cache.bump_version)
            return Response(status=status.HTTP_200_OK)
        except Exception as e:
            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -36,7 +41,7 @@ class QuestionsViewSet(viewsets.ModelViewSet):
    def toggle_active(self, request, pk=None):
         question = self.get_object()
         question.is_active = not question.is_active
-        question.save()
+        question.save()  # post_save invalide le questionnaire en cache
         return Response({'is_active': question.is_active})
 
    @action(detail=False, methods=['get'])
@@ -0,0 +1,34 @@
+# apps/response_management/management/commands/archive_response_backups.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.response_management.services.backup_archive import BackupArchive
+
+
+class Command(BaseCommand):
+    help = "Déplace les backups de réponses anciens vers des archives NDJSON compressées par mois"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.RESPONSE_BACKUP_ARCHIVE_AFTER_DAYS,
+            help="Âge minimal (en jours) des backups archivés"
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="Réponses traitées par lot")
+        parser.add_argument('--directory', help="Répertoire des archives (RESPONSE_BACKUP_ARCHIVE_DIR par défaut)")
+        parser.add_argument('--dry-run', action='store_true', help="Compte les backups concernés sans rien déplacer")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        stats = BackupArchive(options['directory']).archive(
+            cutoff,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+
+        prefix = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{stats['backups']} backup(s) antérieur(s) au {cutoff:%Y-%m-%d} archivé(s) "
+            f"pour {stats['responses']} réponse(s) ({stats['members']} membre(s) d'archive)"
+        ))
@@ -0,0 +1,45 @@
+# apps/response_management/management/commands/benchmark_response_save.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from apps.question_handling.models import Questions
+from apps.response_management.models import Responses
+from apps.user_management.models import Users
+
+
+class Command(BaseCommand):
+    help = "Mesure le nombre de requêtes et la durée de Responses.save selon la taille de l'historique"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--saves', type=int, default=200, help="Nombre d'enregistrements successifs de la même réponse")
+        parser.add_argument('--every', type=int, default=50, help="Intervalle d'affichage des mesures")
+
+    def handle(self, *args, **options):
+        # Données temporaires : tout est annulé en fin de mesure
+        with transaction.atomic():
+            user = Users.objects.create(email="benchmark-responses@example.invalid", username="benchmark-responses")
+            question = Questions.objects.create(text="Question de mesure (benchmark_response_save)", type="TEXT", configuration={})
+
+            self.stdout.write(f"{'version':>8} {'requêtes':>9} {'ms/save':>8}")
+            counts = set()
+            for index in range(1, options['saves'] + 1):
+                response = Responses(user=user, question=question, content={"text": f"Version {index}"})
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response.save(token="benchmark")
+                    elapsed = (time.perf_counter() - start) * 1000
+                if index > 1:
+                    counts.add(len(queries))
+                if index == 1 or index % options['every'] == 0:
+                    self.stdout.write(f"{response.version:>8} {len(queries):>9} {elapsed:>8.2f}")
+
+            transaction.set_rollback(True)
+
+        if len(counts) == 1:
+            self.stdout.write(self.style.SUCCESS(
+                f"Nombre de requêtes constant par mise à jour : {counts.pop()} ({options['saves']} enregistrements)"
+            ))
+        else:
+            self.stderr.write(f"Nombre de requêtes variable selon l'historique : {sorted(counts)}")
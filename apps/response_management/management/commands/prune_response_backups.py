@@ -0,0 +1,51 @@
+# apps/response_management/management/commands/prune_response_backups.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from apps.response_management.models import Responses
+from apps.response_management.services.backup_history import BackupHistory
+
+
+class Command(BaseCommand):
+    help = (
+        "Applique la politique de rétention des backups de réponses : dernières versions "
+        "et dernière version de chaque jour, réencodées en deltas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-last', type=int, default=settings.RESPONSE_BACKUP_KEEP_LAST,
+            help="Nombre de versions les plus récentes conservées par réponse"
+        )
+        parser.add_argument(
+            '--daily-days', type=int, default=None,
+            help="Ne conserver la version quotidienne que sur ces derniers jours (toutes par défaut)"
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Traite aussi les réponses sous le seuil (réencodage des backups existants)"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Calcule sans rien modifier")
+
+    def handle(self, *args, **options):
+        responses = Responses.objects.annotate(backup_count=Count('backups')).filter(backup_count__gt=0)
+        if not options['all']:
+            responses = responses.filter(backup_count__gt=options['keep_last'])
+        response_ids = list(responses.values_list('id', flat=True))
+
+        deleted = rewritten = 0
+        for response_id in response_ids:
+            with transaction.atomic():
+                result = BackupHistory.prune(response_id, options['keep_last'], options['daily_days'])
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+            deleted += result['deleted']
+            rewritten += result['rewritten']
+
+        prefix = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{len(response_ids)} réponse(s) traitée(s) : {deleted} backup(s) supprimé(s), "
+            f"{rewritten} conservé(s) et réencodé(s)"
+        ))
@@ -0,0 +1,94 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicate_responses(apps, schema_editor):
+    """
+    Fusionne les doublons (user, question) avant la contrainte unique.
+
+    La ligne mise à jour le plus récemment (réponse courante de
+    l'utilisateur) est conservée. Le contenu de chaque autre doublon devient
+    un backup de cette ligne, daté de sa dernière mise à jour, et les backups
+    des doublons lui sont rattachés ; l'historique fusionné est renuméroté
+    par date. `version` est ensuite initialisé au nombre de backups + 1.
+    """
+    Responses = apps.get_model("response_management", "Responses")
+    ResponsesBackup = apps.get_model("response_management", "ResponsesBackup")
+
+    duplicates = (
+        Responses.objects.values("user_id", "question_id")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = list(
+            Responses.objects.filter(
+                user_id=duplicate["user_id"], question_id=duplicate["question_id"]
+            ).order_by("-updated_at", "-pk")
+        )
+        kept, others = rows[0], rows[1:]
+        other_ids = [row.id for row in others]
+
+        for row in others:
+            backup = ResponsesBackup.objects.create(
+                response_id=kept.id,
+                user_id=row.user_id,
+                question_id=row.question_id,
+                content=row.content,
+                is_complete=row.is_complete,
+            )
+            # auto_now_add : la date d'origine est rétablie après insertion
+            ResponsesBackup.objects.filter(pk=backup.pk).update(
+                backup_at=row.updated_at
+            )
+        ResponsesBackup.objects.filter(response_id__in=other_ids).update(
+            response_id=kept.id
+        )
+        Responses.objects.filter(id__in=other_ids).delete()
+
+        history = list(
+            ResponsesBackup.objects.filter(response_id=kept.id).order_by(
+                "backup_at", "pk"
+            )
+        )
+        for index, backup in enumerate(history, start=1):
+            backup.version_index = index
+        ResponsesBackup.objects.bulk_update(history, ["version_index"])
+
+    backup_counts = (
+        ResponsesBackup.objects.filter(response_id=OuterRef("pk"))
+        .values("response_id")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Responses.objects.update(version=Coalesce(Subquery(backup_counts), Value(0)) + 1)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("question_handling", "0001_initial"),
+        ("response_management", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="responses",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1,
+                help_text="Numéro de la version courante (incrémenté à chaque mise à jour)",
+            ),
+        ),
+        migrations.RunPython(merge_duplicate_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="responses",
+            constraint=models.UniqueConstraint(
+                fields=("user", "question"), name="unique_user_question_response"
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("question_handling", "0001_initial"),
+        ("response_management", "0002_unique_user_question_response"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="responsesbackup",
+            name="delta",
+            field=models.JSONField(
+                blank=True,
+                help_text="Opérations JSON Patch ramenant la version suivante à celle-ci",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="responsesbackup",
+            name="is_snapshot",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name="responsesbackup",
+            name="content",
+            field=models.JSONField(
+                blank=True,
+                help_text="Contenu complet (versions entières uniquement)",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="responsesbackup",
+            index=models.Index(
+                fields=["response", "version_index"],
+                name="responses_backup_version_idx",
+            ),
+        ),
+    ]
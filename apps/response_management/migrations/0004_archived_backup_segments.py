@@ -0,0 +1,81 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:45
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("response_management", "0003_delta_encoded_backups"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedBackupSegment",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        max_length=36,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "month",
+                    models.CharField(
+                        help_text="Mois des backups archivés (AAAA-MM)", max_length=7
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        help_text="Fichier relatif à RESPONSE_BACKUP_ARCHIVE_DIR",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "offset",
+                    models.BigIntegerField(
+                        help_text="Décalage du membre gzip dans le fichier"
+                    ),
+                ),
+                ("count", models.PositiveIntegerField()),
+                ("first_version", models.PositiveIntegerField(blank=True, null=True)),
+                ("last_version", models.PositiveIntegerField(blank=True, null=True)),
+                ("oldest_backup_at", models.DateTimeField()),
+                ("newest_backup_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "response",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_segments",
+                        to="response_management.responses",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "responses_backup_archive",
+                "ordering": ["oldest_backup_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["response", "oldest_backup_at"],
+                        name="backup_archive_response_idx",
+                    )
+                ],
+            },
+        ),
+    ]
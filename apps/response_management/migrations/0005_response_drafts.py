@@ -0,0 +1,58 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:10
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("question_handling", "0001_initial"),
+        ("response_management", "0004_archived_backup_segments"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResponseDraft",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        max_length=36,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("answer", models.JSONField(blank=True, null=True)),
+                ("saved_at", models.DateTimeField(auto_now=True)),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="question_handling.questions",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="response_drafts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "response_drafts",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="responsedraft",
+            constraint=models.UniqueConstraint(
+                fields=("user", "question"), name="unique_user_question_draft"
+            ),
+        ),
+    ]
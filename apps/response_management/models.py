@@ -5,7 +5,9 @@ import logging
 from django.core.exceptions import ValidationError
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -24,54 +26,94 @@ class Responses(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     draft_data = models.JSONField(blank=True, null=True)
     is_original = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=1, help_text="Numéro de la version courante (incrémenté à chaque mise à jour)")
 
     class Meta:
         db_table = 'responses'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'], name='unique_user_question_response'),
+        ]
 
     def save(self, *args, **kwargs):
+        """
+        Enregistre la réponse de l'utilisateur à la question.
+
+        Si une réponse existe déjà pour ce couple, sa version courante est
+        sauvegardée dans ResponsesBackup puis remplacée : verrou de la ligne
+        (via la contrainte unique), insertion du backup et mise à jour avec
+        incrément de `version`, soit un nombre constant de requêtes quel que
+        soit l'historique. L'instance reflète ensuite la ligne enregistrée.
+        """
         force_insert = kwargs.pop('force_insert', False)
         token = kwargs.pop('token', None)
 
         # Si force_insert est True, c'est une nouvelle création forcée
         if force_insert:
             self.is_original = True
+            return super().save(*args, force_insert=True, **kwargs)
+
+        # Mise à jour partielle d'une réponse connue (validation) : pas de nouvelle version
+        if kwargs.get('update_fields') is not None:
             return super().save(*args, **kwargs)
 
         try:
-            # Vérifier si une réponse existe déjà pour cet utilisateur et cette question
-            existing_response = Responses.objects.filter(
-                user=self.user, 
-                question=self.question
-            ).first()
-
-            if existing_response:
-                # Créer un backup de la réponse existante
-                ResponsesBackup.objects.create(
-                    response=existing_response,
-                    user=existing_response.user,
-                    question=existing_response.question,
-                    content=existing_response.content,
-                    is_complete=existing_response.is_complete,
-                    connection_token=token,
-                    version_index=existing_response.backups.count() + 1
-                )
-                
-                # Mettre à jour la réponse existante
-                existing_response.content = self.content
-                existing_response.is_complete = self.is_complete
-                existing_response.draft_data = self.draft_data
-                existing_response.is_valid = self.is_valid
-                existing_response.save(update_fields=['content', 'is_complete', 'draft_data', 'is_valid', 'updated_at'])
-                return existing_response
-            else:
-                # Première réponse pour cette question
-                self.is_original = True
-                return super().save(*args, **kwargs)
-                
+            with transaction.atomic():
+                previous = self._lock_previous()
+                if previous is None:
+                    try:
+                        # Première réponse pour cette question
+                        with transaction.atomic():
+                            self.is_original = True
+                            return super().save(*args, **kwargs)
+                    except IntegrityError:
+                        # Réponse créée entre-temps par une requête concurrente
+                        previous = self._lock_previous()
+                        if previous is None:
+                            raise
+                return self._replace(previous, token)
+
         except Exception as e:
             logger.error(f"Erreur lors de la sauvegarde de la réponse: {str(e)}")
             raise
 
+    def _lock_previous(self):
+        return Responses.objects.select_for_update().filter(
+            user_id=self.user_id,
+            question_id=self.question_id
+        ).values('id', 'content', 'is_complete', 'version', 'is_original', 'created_at').first()
+
+    def _replace(self, previous, token):
+        """Sauvegarde la version précédente et la remplace (sous verrou de ligne)."""
+        from apps.response_management.services.backup_history import BackupHistory
+
+        BackupHistory.build(
+            response_id=previous['id'],
+            user_id=self.user_id,
+            question_id=self.question_id,
+            version_index=previous['version'],
+            content=previous['content'],
+            next_content=self.content,
+            is_complete=previous['is_complete'],
+            token=token
+        ).save(force_insert=True)
+
+        self.updated_at = timezone.now()
+        Responses.objects.filter(pk=previous['id']).update(
+            content=self.content,
+            is_complete=self.is_complete,
+            draft_data=self.draft_data,
+            is_valid=self.is_valid,
+            updated_at=self.updated_at,
+            version=F('version') + 1
+        )
+
+        self.pk = previous['id']
+        self.version = previous['version'] + 1
+        self.is_original = previous['is_original']
+        self.created_at = previous['created_at']
+        self._state.adding = False
+        return self
+
     def delete(self, *args, force_delete=False, **kwargs):
         """
         Méthode de suppression avec protection de la réponse originale
@@ -153,7 +195,13 @@ class ResponsesBackup(models.Model):
     response = models.ForeignKey('Responses', on_delete=models.CASCADE, related_name="backups")
     user = models.ForeignKey('user_management.Users', on_delete=models.CASCADE)
     question = models.ForeignKey('question_handling.Questions', on_delete=models.CASCADE)
-    content = models.JSONField()
+    content = models.JSONField(blank=True, null=True, help_text="Contenu complet (versions entières uniquement)")
+    delta = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Opérations JSON Patch ramenant la version suivante à celle-ci"
+    )
+    is_snapshot = models.BooleanField(default=True)
     is_complete = models.BooleanField(default=False)
     backup_at = models.DateTimeField(auto_now_add=True)
     connection_token = models.CharField(max_length=255, blank=True, null=True)
@@ -162,30 +210,60 @@ class ResponsesBackup(models.Model):
     class Meta:
         db_table = 'responses_backup'
         ordering = ['backup_at']
+        indexes = [
+            models.Index(fields=['response', 'version_index'], name='responses_backup_version_idx'),
+        ]
+
+class ArchivedBackupSegment(models.Model):
+    """Index des backups d'une réponse déplacés dans un membre d'archive compressé"""
+    id = models.CharField(primary_key=True, max_length=36, default=uuid.uuid4, editable=False)
+    response = models.ForeignKey('Responses', on_delete=models.CASCADE, related_name="archived_segments")
+    user = models.ForeignKey('user_management.Users', on_delete=models.CASCADE)
+    month = models.CharField(max_length=7, help_text="Mois des backups archivés (AAAA-MM)")
+    path = models.CharField(max_length=255, help_text="Fichier relatif à RESPONSE_BACKUP_ARCHIVE_DIR")
+    offset = models.BigIntegerField(help_text="Décalage du membre gzip dans le fichier")
+    count = models.PositiveIntegerField()
+    first_version = models.PositiveIntegerField(blank=True, null=True)
+    last_version = models.PositiveIntegerField(blank=True, null=True)
+    oldest_backup_at = models.DateTimeField()
+    newest_backup_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'responses_backup_archive'
+        ordering = ['oldest_backup_at']
+        indexes = [
+            models.Index(fields=['response', 'oldest_backup_at'], name='backup_archive_response_idx'),
+        ]
+
+class ResponseDraft(models.Model):
+    """Brouillon d'une réponse (sauvegarde automatique), avant soumission"""
+    id = models.CharField(primary_key=True, max_length=36, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('user_management.Users', on_delete=models.CASCADE, related_name="response_drafts")
+    question = models.ForeignKey('question_handling.Questions', on_delete=models.CASCADE)
+    answer = models.JSONField(blank=True, null=True)
+    saved_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'response_drafts'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'], name='unique_user_question_draft'),
+        ]
 
 @receiver(pre_delete, sender='user_management.Users')
 def delete_user_responses(sender, instance, **kwargs):
     """
     Supprime toutes les réponses et backups associés à un utilisateur avant sa suppression.
     """
+    from apps.response_management.services.user_data import UserDataPurge
+
     try:
-        with transaction.atomic():
-            # Récupérer les réponses et backups
-            responses = Responses.objects.filter(user=instance)
-            backups = ResponsesBackup.objects.filter(user=instance)
-            
-            # Compter pour les logs
-            response_count = responses.count()
-            backup_count = backups.count()
-            
-            # Supprimer dans l'ordre correct avec force_delete pour les réponses
-            backups.delete()
-            for response in responses:
-                response.delete(force_delete=True)
-            
-            logger.info(
-                f"Suppression réussie pour l'utilisateur {instance.id}: "
-                f"{response_count} réponses et {backup_count} backups supprimés."
-            )
+        deleted = UserDataPurge.purge([instance.id])
+        logger.info(
+            f"Suppression réussie pour l'utilisateur {instance.id}: "
+            f"{deleted['responses']} réponses et {deleted['backups']} backups supprimés."
+        )
     except Exception as e:
-        logger.error(f"Erreur lors de la suppression des données de l'utilisateur {instance.id}: {str(e)}")
\ No newline at end of file
+        # Pas de suppression partielle : l'utilisateur est conservé tant que ses données ne sont pas purgées
+        logger.error(f"Erreur lors de la suppression des données de l'utilisateur {instance.id}: {str(e)}")
+        raise
@@ -2,10 +2,9 @@
 import uuid
 from rest_framework import serializers
 from .models import Responses, ResponsesBackup
+from .services.backup_history import BackupHistory
 from apps.user_management.models import Users
 from apps.question_handling.models import Questions
-from asgiref.sync import sync_to_async
-from datetime import datetime
 
 
 
@@ -19,39 +18,26 @@ class ResponsesSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         """
-        Méthode pour créer une réponse et ses backups si nécessaire
+        Méthode pour créer une réponse (ou remplacer la réponse existante à la
+        même question, dont la version précédente est sauvegardée)
         """
-        # Créer la réponse principale
-        response = Responses.objects.create(**validated_data)
+        token = validated_data.pop('token', None)
+        response = Responses(**validated_data)
+        response.save(token=token)
         return response
     
-    async def update(self, instance, validated_data):
+    def update(self, instance, validated_data):
         """
-        Méthode pour mettre à jour une réponse et créer un backup, tout en gérant l'asynchronicité
+        Méthode pour mettre à jour une réponse ; le backup de la version
+        précédente est créé par Responses.save
         """
-        # Sauvegarder une ancienne version dans les backups
-        if instance.pk:
-            backup_count = await sync_to_async(instance.backups.count)()  # Compte des versions existantes
-            await sync_to_async(ResponsesBackup.objects.create)(
-                response=instance,
-                user=instance.user,
-                question=instance.question,
-                content=instance.content,
-                is_complete=instance.is_complete,
-                connection_token=self.context.get('token', None),  # Ajouter le token
-                version_index=backup_count + 1  # Index incrémenté
-            )
-
-        # Mettre à jour les champs de la réponse
+        token = validated_data.pop('token', self.context.get('token'))
         instance.content = validated_data.get('content', instance.content)
         instance.is_complete = validated_data.get('is_complete', instance.is_complete)
-        instance.updated_at = validated_data.get('updated_at', datetime.now())
         instance.draft_data = validated_data.get('draft_data', instance.draft_data)
-        instance.connection_token = self.context.get('token', instance.connection_token)
-
-        # Sauvegarder les modifications
-        await sync_to_async(instance.save)()
+        instance.save(token=token)
         return instance
+
     def validate_user(self, value):
          
         try:
@@ -60,6 +46,14 @@ class ResponsesSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Le format de l'UUID pour l'utilisateur est invalide.")
   
 
+class ResponsesBackupListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Reconstruction groupée des versions stockées en delta
+        backups = list(data.all() if hasattr(data, 'all') else data)
+        BackupHistory.materialize(backups)
+        return super().to_representation(backups)
+
+
 class ResponsesBackupSerializer(serializers.ModelSerializer):
     response = ResponsesSerializer(read_only=True)
     user = serializers.PrimaryKeyRelatedField(queryset=Users.objects.all(), required=False)
@@ -69,6 +63,15 @@ class ResponsesBackupSerializer(serializers.ModelSerializer):
         model = ResponsesBackup
         fields = ['id', 'response', 'user', 'question', 'content', 'is_complete', 'backup_at', 'connection_token', 'version_index']
         read_only_fields = ['backup_at', 'version_index']
+        list_serializer_class = ResponsesBackupListSerializer
+
+    def to_representation(self, instance):
+        """Expose toujours le contenu complet de la version, qu'elle soit stockée en delta ou non"""
+        if not hasattr(instance, 'full_content'):
+            BackupHistory.materialize([instance])
+        data = super().to_representation(instance)
+        data['content'] = instance.full_content
+        return data
 
     def create(self, validated_data):
         """
@@ -0,0 +1,297 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import fcntl
+import gzip
+import json
+import logging
+import os
+import zlib
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from .backup_history import BackupHistory
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class BackupArchive:
+    """
+    Archivage froid des backups de réponses anciens.
+
+    Les backups antérieurs à la date limite sont écrits, avec leur contenu
+    complet reconstruit, dans un fichier NDJSON compressé par mois
+    (responses_backup-AAAA-MM.ndjson.gz). Chaque passage ajoute un membre
+    gzip au fichier du mois ; la base ne garde qu'une entrée d'index par
+    réponse et par membre (ArchivedBackupSegment) avec son décalage, ce qui
+    permet de relire un historique sans décompresser le reste du fichier.
+
+    Les écritures (ajout d'un membre, réécriture lors d'une purge) se font
+    sous un verrou exclusif sur le répertoire.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.RESPONSE_BACKUP_ARCHIVE_DIR)
+
+    def archive(self, cutoff: datetime, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Déplace les backups antérieurs à `cutoff` vers les archives.
+
+        Returns:
+            Nombre de réponses concernées, de backups archivés et de fichiers écrits
+        """
+        from apps.response_management.models import ResponsesBackup
+
+        response_ids = list(
+            ResponsesBackup.objects.filter(backup_at__lt=cutoff).order_by().values_list('response_id', flat=True).distinct()
+        )
+        stats = {'responses': len(response_ids), 'backups': 0, 'members': 0}
+        for start in range(0, len(response_ids), batch_size):
+            batch = self._archive_batch(response_ids[start:start + batch_size], cutoff, dry_run)
+            stats['backups'] += batch['backups']
+            stats['members'] += batch['members']
+        return stats
+
+    def _archive_batch(self, response_ids: List[str], cutoff: datetime, dry_run: bool) -> Dict[str, int]:
+        from apps.response_management.models import ArchivedBackupSegment, ResponsesBackup
+
+        backups = list(
+            ResponsesBackup.objects.filter(
+                response_id__in=response_ids,
+                backup_at__lt=cutoff
+            ).order_by('response_id', 'version_index', 'backup_at')
+        )
+        if not backups:
+            return {'backups': 0, 'members': 0}
+        BackupHistory.materialize(backups)
+
+        by_month: Dict[str, List[Any]] = defaultdict(list)
+        for backup in backups:
+            by_month[f"{backup.backup_at:%Y-%m}"].append(backup)
+        if dry_run:
+            return {'backups': len(backups), 'members': len(by_month)}
+
+        segments = []
+        for month, month_backups in by_month.items():
+            path, offset = self._append_member(month, month_backups)
+            per_response: Dict[str, List[Any]] = defaultdict(list)
+            for backup in month_backups:
+                per_response[backup.response_id].append(backup)
+            for response_id, items in per_response.items():
+                versions = [backup.version_index for backup in items if backup.version_index is not None]
+                segments.append(ArchivedBackupSegment(
+                    response_id=response_id,
+                    user_id=items[0].user_id,
+                    month=month,
+                    path=path,
+                    offset=offset,
+                    count=len(items),
+                    first_version=min(versions, default=None),
+                    last_version=max(versions, default=None),
+                    oldest_backup_at=items[0].backup_at,
+                    newest_backup_at=items[-1].backup_at
+                ))
+
+        # Fichiers écrits d'abord : un échec ici ne laisse qu'un membre sans index
+        with transaction.atomic():
+            ArchivedBackupSegment.objects.bulk_create(segments)
+            ResponsesBackup.objects.filter(id__in=[backup.id for backup in backups]).delete()
+
+        logger.info(f"{len(backups)} backup(s) de {len(response_ids)} réponse(s) archivé(s) ({len(by_month)} mois)")
+        return {'backups': len(backups), 'members': len(by_month)}
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append_member(self, month: str, backups: List[Any]) -> Tuple[str, int]:
+        """Ajoute un membre gzip au fichier du mois ; renvoie son chemin relatif et son décalage."""
+        name = f"responses_backup-{month}.ndjson.gz"
+        lines = "".join(
+            json.dumps(self.to_record(backup), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+            for backup in backups
+        )
+        with self._locked(), open(self.directory / name, 'ab') as handle:
+            offset = handle.tell()
+            handle.write(gzip.compress(lines.encode('utf-8')))
+        return name, offset
+
+    def purge_users(self, user_ids: Iterable[Any]) -> Dict[str, int]:
+        """
+        Retire des archives toutes les versions des utilisateurs.
+
+        Les entrées d'index des utilisateurs sont supprimées dans la
+        transaction de l'appelant ; les fichiers mensuels concernés ne sont
+        réécrits qu'après sa validation (transaction.on_commit). Une
+        transaction annulée laisse ainsi fichiers et décalages intacts.
+
+        Returns:
+            Nombre de fichiers à réécrire et d'entrées d'index supprimées
+        """
+        from apps.response_management.models import ArchivedBackupSegment
+
+        user_ids = {str(user_id) for user_id in user_ids}
+        paths = list(
+            ArchivedBackupSegment.objects.filter(user_id__in=user_ids).order_by().values_list('path', flat=True).distinct()
+        )
+        segments, _ = ArchivedBackupSegment.objects.filter(user_id__in=user_ids).delete()
+        if paths:
+            transaction.on_commit(lambda: self._rewrite_files(paths, user_ids))
+        return {'files': len(paths), 'segments': segments}
+
+    def _rewrite_files(self, paths: List[str], user_ids: Set[str]) -> None:
+        """Réécrit les fichiers sans les lignes des utilisateurs (après validation de la purge)."""
+        records = 0
+        with self._locked():
+            for path in paths:
+                try:
+                    records += self._rewrite_without(path, user_ids)
+                except (OSError, ValueError) as e:
+                    # La purge est validée : le fichier garde des lignes sans index à retirer à la main
+                    logger.error(f"Réécriture de l'archive {path} impossible pour {sorted(user_ids)}: {str(e)}")
+        logger.info(f"Archives purgées : {records} ligne(s) retirée(s) de {len(paths)} fichier(s)")
+
+    def _rewrite_without(self, path: str, user_ids: Set[str]) -> int:
+        """
+        Réécrit un fichier sans les lignes des utilisateurs ; renvoie le nombre de lignes retirées.
+
+        Le nouveau fichier est écrit à côté de l'ancien ; les décalages des
+        autres réponses sont mis à jour et le fichier remplacé dans une même
+        transaction, qui est annulée si le remplacement échoue.
+        """
+        from apps.response_management.models import ArchivedBackupSegment
+
+        source = self.directory / path
+        if not source.exists():
+            logger.warning(f"Fichier d'archive {path} introuvable : rien à purger")
+            return 0
+
+        temporary = source.with_name(source.name + ".tmp")
+        offsets: Dict[int, int] = {}
+        removed = 0
+        try:
+            with open(temporary, 'wb') as output:
+                for offset, lines in self._iter_members(source):
+                    kept = [line for line in lines if json.loads(line)['user_id'] not in user_ids]
+                    removed += len(lines) - len(kept)
+                    if kept:
+                        offsets[offset] = output.tell()
+                        output.write(gzip.compress(b"".join(line + b"\n" for line in kept)))
+                output.flush()
+                os.fsync(output.fileno())
+
+            with transaction.atomic():
+                segments = list(ArchivedBackupSegment.objects.select_for_update().filter(path=path))
+                for segment in segments:
+                    segment.offset = offsets.get(segment.offset, segment.offset)
+                ArchivedBackupSegment.objects.bulk_update(segments, ['offset'], batch_size=500)
+                os.replace(temporary, source)
+        finally:
+            temporary.unlink(missing_ok=True)
+        return removed
+
+    @staticmethod
+    def to_record(backup: Any, archived: bool = True) -> Dict[str, Any]:
+        """Ligne NDJSON d'un backup (contenu complet, déjà reconstruit)."""
+        return {
+            'id': backup.id,
+            'response_id': backup.response_id,
+            'user_id': str(backup.user_id),
+            'question_id': str(backup.question_id),
+            'version_index': backup.version_index,
+            'content': backup.full_content,
+            'is_complete': backup.is_complete,
+            'backup_at': backup.backup_at,
+            'connection_token': backup.connection_token,
+            'archived': archived
+        }
+
+    def iter_history(self, response_id: str) -> Iterator[Dict[str, Any]]:
+        """Historique complet : versions archivées puis backups encore en base."""
+        from apps.response_management.models import ResponsesBackup
+
+        yield from self.iter_archived(response_id)
+        backups = list(ResponsesBackup.objects.filter(response_id=response_id).order_by('version_index', 'backup_at'))
+        BackupHistory.materialize(backups)
+        for backup in backups:
+            yield self.to_record(backup, archived=False)
+
+    def iter_archived(self, response_id: str) -> Iterator[Dict[str, Any]]:
+        """Versions archivées d'une réponse, de la plus ancienne à la plus récente (lecture paresseuse)."""
+        from apps.response_management.models import ArchivedBackupSegment
+
+        segments = ArchivedBackupSegment.objects.filter(response_id=response_id).order_by('oldest_backup_at')
+        seen: Set[Any] = set()
+        for segment in segments.iterator():
+            path = self.directory / segment.path
+            try:
+                records = [
+                    record for record in map(json.loads, self._iter_member(path, segment.offset))
+                    if record['response_id'] == response_id
+                ]
+            except (zlib.error, ValueError):
+                records = []
+            if not records:
+                # Décalage périmé (purge interrompue après le remplacement du fichier) : relecture complète
+                logger.warning(f"Décalage {segment.offset} invalide dans {segment.path}, relecture du fichier")
+                records = [
+                    record for _, lines in self._iter_members(path)
+                    for record in map(json.loads, lines)
+                    if record['response_id'] == response_id
+                ]
+            for record in records:
+                if record['id'] not in seen:
+                    seen.add(record['id'])
+                    yield record
+
+    @staticmethod
+    def _iter_members(path: Path) -> Iterator[Tuple[int, List[bytes]]]:
+        """Membres successifs d'un fichier : (décalage, lignes)."""
+        with open(path, 'rb') as handle:
+            offset = 0
+            pending = handle.read(READ_CHUNK_SIZE)
+            while pending:
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                content = b""
+                consumed = 0
+                while True:
+                    content += decompressor.decompress(pending)
+                    consumed += len(pending)
+                    if decompressor.eof:
+                        break
+                    pending = handle.read(READ_CHUNK_SIZE)
+                    if not pending:
+                        raise ValueError(f"Membre gzip tronqué dans {path.name} (décalage {offset})")
+                pending = decompressor.unused_data
+                yield offset, [line for line in content.split(b"\n") if line]
+                offset += consumed - len(pending)
+                if not pending:
+                    pending = handle.read(READ_CHUNK_SIZE)
+
+    @staticmethod
+    def _iter_member(path: Path, offset: int) -> Iterator[bytes]:
+        """Lignes d'un seul membre gzip, décompressé par morceaux à partir de son décalage."""
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        pending = b""
+        with open(path, 'rb') as handle:
+            handle.seek(offset)
+            while not decompressor.eof:
+                chunk = handle.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                pending += decompressor.decompress(chunk)
+                *lines, pending = pending.split(b"\n")
+                yield from (line for line in lines if line)
+        pending += decompressor.flush()
+        if pending.strip():
+            yield pending
@@ -0,0 +1,185 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+from functools import reduce
+import json
+import logging
+import operator
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import json_delta
+
+logger = logging.getLogger(__name__)
+
+
+class BackupHistory:
+    """
+    Stockage des versions d'une réponse en deltas inverses.
+
+    Le backup de la version v contient les opérations JSON Patch qui
+    ramènent le contenu de la version v + 1 (backup suivant, ou réponse
+    courante pour le plus récent) à celui de la version v : à l'écriture,
+    les deux contenus sont déjà connus et aucune lecture n'est nécessaire.
+    Une version sur RESPONSE_BACKUP_SNAPSHOT_EVERY est stockée entière, ce
+    qui borne le nombre de deltas à appliquer pour reconstruire une version.
+    """
+
+    @staticmethod
+    def build(
+        response_id: str,
+        user_id: Any,
+        question_id: Any,
+        version_index: int,
+        content: Any,
+        next_content: Any,
+        is_complete: bool,
+        token: Optional[str] = None
+    ) -> 'ResponsesBackup':
+        """Backup (non enregistré) de la version `version_index` remplacée par `next_content`."""
+        from apps.response_management.models import ResponsesBackup
+
+        backup = ResponsesBackup(
+            response_id=response_id,
+            user_id=user_id,
+            question_id=question_id,
+            is_complete=is_complete,
+            connection_token=token,
+            version_index=version_index
+        )
+        BackupHistory.encode(
+            backup,
+            content,
+            next_content,
+            snapshot=version_index % settings.RESPONSE_BACKUP_SNAPSHOT_EVERY == 0
+        )
+        return backup
+
+    @staticmethod
+    def encode(backup: 'ResponsesBackup', content: Any, next_content: Any, snapshot: bool = False) -> None:
+        """Stocke `content` en delta depuis `next_content`, ou entier si le delta n'est pas plus court."""
+        if not snapshot:
+            delta = json_delta.diff(next_content, content)
+            if len(json.dumps(delta, default=str)) < len(json.dumps(content, default=str)):
+                backup.is_snapshot = False
+                backup.delta = delta
+                backup.content = None
+                return
+        backup.is_snapshot = True
+        backup.content = content
+        backup.delta = None
+
+    @classmethod
+    def materialize(cls, backups: Sequence['ResponsesBackup']) -> None:
+        """
+        Renseigne `full_content` sur chaque backup (contenu reconstruit).
+
+        Les versions nécessaires à la reconstruction des deltas sont lues en
+        une requête, les réponses courantes en une autre.
+        """
+        from apps.response_management.models import Responses, ResponsesBackup
+
+        pending: Dict[str, int] = {}
+        for backup in backups:
+            if backup.is_snapshot:
+                backup.full_content = backup.content
+            else:
+                pending[backup.response_id] = min(pending.get(backup.response_id, backup.version_index), backup.version_index)
+        if not pending:
+            return
+
+        chains: Dict[str, List[Dict[str, Any]]] = {response_id: [] for response_id in pending}
+        for row in ResponsesBackup.objects.filter(
+            reduce(operator.or_, (
+                Q(response_id=response_id, version_index__gte=version_index)
+                for response_id, version_index in pending.items()
+            ))
+        ).values('response_id', 'version_index', 'is_snapshot', 'content', 'delta'):
+            chains[row['response_id']].append(row)
+        live = dict(Responses.objects.filter(id__in=list(pending)).values_list('id', 'content'))
+
+        resolved: Dict[Tuple[str, int], Any] = {}
+        for response_id, rows in chains.items():
+            for row, content in cls._resolve_chain(rows, live.get(response_id)):
+                resolved[(response_id, row['version_index'])] = content
+
+        for backup in backups:
+            if not backup.is_snapshot:
+                backup.full_content = resolved.get((backup.response_id, backup.version_index))
+
+    @staticmethod
+    def _resolve_chain(rows: Iterable[Any], live_content: Any) -> List[Tuple[Any, Any]]:
+        """Couples (version, contenu) d'une réponse, de la plus récente à la plus ancienne."""
+        def field(row, name):
+            return row[name] if isinstance(row, dict) else getattr(row, name)
+
+        resolved = []
+        current = live_content
+        for row in sorted(rows, key=lambda row: field(row, 'version_index') or 0, reverse=True):
+            if field(row, 'is_snapshot'):
+                current = field(row, 'content')
+            else:
+                current = json_delta.apply(current, field(row, 'delta'))
+            resolved.append((row, current))
+        return resolved
+
+    @classmethod
+    def prune(
+        cls,
+        response_id: str,
+        keep_last: int,
+        daily_days: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Applique la politique de rétention aux backups d'une réponse.
+
+        Sont conservées les `keep_last` dernières versions et la dernière
+        version de chaque jour (des `daily_days` derniers jours seulement si
+        précisé). Les versions restantes sont réencodées en deltas inverses
+        les unes par rapport aux autres.
+
+        Returns:
+            Nombre de backups supprimés et réencodés
+        """
+        from apps.response_management.models import Responses, ResponsesBackup
+
+        now = now or timezone.now()
+        with transaction.atomic():
+            live_content = Responses.objects.select_for_update().filter(
+                pk=response_id
+            ).values_list('content', flat=True).first()
+            backups = list(ResponsesBackup.objects.filter(response_id=response_id).order_by('version_index', 'backup_at'))
+            for backup, content in cls._resolve_chain(backups, live_content):
+                backup.full_content = content
+
+            keep = {backup.id for backup in backups[-keep_last:]} if keep_last else set()
+            daily: Dict[Any, 'ResponsesBackup'] = {}
+            since = now - timedelta(days=daily_days) if daily_days else None
+            for backup in backups:
+                if since is None or backup.backup_at >= since:
+                    daily[timezone.localtime(backup.backup_at).date()] = backup
+            keep.update(backup.id for backup in daily.values())
+
+            removed = [backup.id for backup in backups if backup.id not in keep]
+            kept = [backup for backup in backups if backup.id in keep]
+            if removed:
+                ResponsesBackup.objects.filter(id__in=removed).delete()
+
+            # Réencodage du plus récent au plus ancien, une version entière toutes les N
+            next_content = live_content
+            distance = 0
+            for backup in reversed(kept):
+                distance += 1
+                cls.encode(
+                    backup,
+                    backup.full_content,
+                    next_content,
+                    snapshot=distance >= settings.RESPONSE_BACKUP_SNAPSHOT_EVERY
+                )
+                if backup.is_snapshot:
+                    distance = 0
+                next_content = backup.full_content
+            ResponsesBackup.objects.bulk_update(kept, ['content', 'delta', 'is_snapshot'], batch_size=500)
+
+        return {'deleted': len(removed), 'rewritten': len(kept)}
@@ -0,0 +1,162 @@
+from typing import Any, Dict, List, Optional
+import logging
+import uuid
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Champs écrasés lorsqu'une réponse existe déjà (mêmes champs que Responses.save)
+UPSERT_FIELDS = ['content', 'is_complete', 'draft_data', 'is_valid', 'updated_at', 'version']
+
+
+class BulkResponseService:
+    """
+    Enregistrement ensembliste de toutes les réponses d'un utilisateur.
+
+    Même sémantique que Responses.save appelé réponse par réponse (sauvegarde
+    de la version précédente, puis mise à jour ou création), mais en un
+    nombre fixe de requêtes quel que soit le nombre de questions : lecture
+    des questions, lecture verrouillée des réponses existantes, insertion
+    groupée des nouvelles réponses, puis insertion groupée des backups et
+    upsert groupé des réponses existantes sur (user, question).
+
+    Comme dans Responses.save, une réponse créée entre-temps par une
+    requête concurrente fait échouer l'insertion : les réponses sont alors
+    relues sous verrou et la nouvelle ligne est versionnée comme les autres.
+    """
+
+    @staticmethod
+    def normalize(answers: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Indexe les réponses par question (la dernière l'emporte).
+
+        Raises:
+            ValidationError: Si une réponse n'indique pas de question valide
+        """
+        normalized: Dict[str, Dict[str, Any]] = {}
+        for answer in answers:
+            try:
+                question_id = str(uuid.UUID(str(answer.get('question'))))
+            except (TypeError, ValueError, AttributeError):
+                raise ValidationError(f"Identifiant de question invalide : {answer.get('question')!r}")
+            normalized[question_id] = answer
+        return normalized
+
+    @classmethod
+    def upsert(cls, user, answers: List[Dict[str, Any]], token: Optional[str] = None) -> List['Responses']:
+        """
+        Enregistre les réponses d'un utilisateur en une seule transaction.
+
+        Args:
+            user: Utilisateur auteur des réponses
+            answers: Réponses ({"question", "content", "is_complete", "draft_data"})
+            token: Jeton de connexion reporté sur les backups
+
+        Returns:
+            Les réponses enregistrées, dans l'ordre des questions reçues
+
+        Raises:
+            ValidationError: Si une question est inconnue
+        """
+        from apps.question_handling.models import Questions
+        from apps.response_management.models import Responses, ResponsesBackup
+        from .backup_history import BackupHistory
+
+        answers_by_question = cls.normalize(answers)
+        if not answers_by_question:
+            return []
+
+        questions = Questions.objects.in_bulk(list(answers_by_question))
+        unknown = set(answers_by_question) - {str(question_id) for question_id in questions}
+        if unknown:
+            raise ValidationError(f"Questions inconnues : {', '.join(sorted(unknown))}")
+
+        with transaction.atomic():
+            existing = cls._lock_existing(user, list(questions))
+            try:
+                with transaction.atomic():
+                    created = cls._create_missing(user, questions, answers_by_question, existing)
+            except IntegrityError:
+                # Réponse créée entre-temps par une requête concurrente
+                existing = cls._lock_existing(user, list(questions))
+                created = cls._create_missing(user, questions, answers_by_question, existing)
+
+            backups = []
+            updated = []
+            for question_id, response in existing.items():
+                answer = answers_by_question[question_id]
+                backups.append(BackupHistory.build(
+                    response_id=response.pk,
+                    user_id=user.pk,
+                    question_id=response.question_id,
+                    version_index=response.version,
+                    content=response.content,
+                    next_content=answer.get('content'),
+                    is_complete=response.is_complete,
+                    token=token
+                ))
+                # Ligne verrouillée : l'incrément ne peut pas être perdu
+                response.version += 1
+                updated.append(cls._apply(response, answer))
+
+            ResponsesBackup.objects.bulk_create(backups)
+            Responses.objects.bulk_create(
+                updated,
+                update_conflicts=True,
+                # MySQL (ON DUPLICATE KEY UPDATE) ne désigne pas la clé en conflit
+                unique_fields=(
+                    ['user', 'question'] if connection.features.supports_update_conflicts_with_target else None
+                ),
+                update_fields=UPSERT_FIELDS
+            )
+
+        saved = {str(response.question_id): response for response in [*created, *updated]}
+        responses = [saved[question_id] for question_id in answers_by_question]
+        logger.info(
+            f"Soumission groupée de {user.id}: {len(created)} réponse(s) créée(s), "
+            f"{len(updated)} mise(s) à jour"
+        )
+        return responses
+
+    @staticmethod
+    def _lock_existing(user, question_ids: List[Any]) -> Dict[str, 'Responses']:
+        """Réponses existantes de l'utilisateur aux questions, verrouillées jusqu'à la fin de la transaction."""
+        from apps.response_management.models import Responses
+
+        return {
+            str(response.question_id): response
+            for response in Responses.objects.select_for_update().filter(user=user, question_id__in=question_ids)
+        }
+
+    @classmethod
+    def _create_missing(
+        cls,
+        user,
+        questions: Dict[Any, Any],
+        answers_by_question: Dict[str, Dict[str, Any]],
+        existing: Dict[str, 'Responses']
+    ) -> List['Responses']:
+        """
+        Insère les réponses aux questions encore sans réponse (version 1).
+
+        Raises:
+            IntegrityError: Si l'une d'elles a été créée entre-temps
+        """
+        from apps.response_management.models import Responses
+
+        created = [
+            cls._apply(Responses(user=user, question=questions[uuid.UUID(question_id)], is_original=True), answer)
+            for question_id, answer in answers_by_question.items()
+            if question_id not in existing
+        ]
+        Responses.objects.bulk_create(created)
+        return created
+
+    @staticmethod
+    def _apply(response: 'Responses', answer: Dict[str, Any]) -> 'Responses':
+        response.content = answer.get('content')
+        response.is_complete = answer.get('is_complete', False)
+        response.draft_data = answer.get('draft_data')
+        response.is_valid = False
+        return response
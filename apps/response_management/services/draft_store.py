@@ -0,0 +1,111 @@
+from typing import Any, Dict, List
+import logging
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import connection
+from apps.question_handling.questionnaire_cache import questionnaire_cache
+
+logger = logging.getLogger(__name__)
+
+
+class DraftStore:
+    """
+    Brouillons de réponses d'un utilisateur, hors de la session.
+
+    Une sauvegarde automatique n'écrit que la question modifiée : upsert
+    d'une ligne ResponseDraft sur (utilisateur, question), au lieu de
+    réécrire la session entière. Le brouillon est donc durable dès la
+    réponse HTTP, y compris pour une question encore sans réponse.
+
+    Le cache 'drafts' (partagé en production) en garde une copie par
+    (utilisateur, question) pour les lectures ; une entrée absente ou
+    évincée est relue en base. Une sauvegarde supprime l'entrée après
+    l'écriture en base plutôt que de la remplacer : deux sauvegardes
+    concurrentes ne peuvent pas y laisser la plus ancienne, la lecture
+    suivante recharge la valeur validée. Les clés d'un utilisateur sont
+    retrouvées à partir du questionnaire actif, sans index partagé à mettre
+    à jour.
+    """
+
+    @staticmethod
+    def cache():
+        return caches[settings.DRAFT_STORE_CACHE_ALIAS]
+
+    @staticmethod
+    def _key(user_id: Any, question_id: Any) -> str:
+        return f"draft:{user_id}:{question_id}"
+
+    @classmethod
+    async def _question_ids(cls) -> List[str]:
+        snapshot = await questionnaire_cache.aget()
+        return [str(question.id) for question in snapshot.questions]
+
+    @classmethod
+    async def asave(cls, user, question_id: Any, answer: Any) -> None:
+        """
+        Enregistre le brouillon d'une question.
+
+        Raises:
+            ValidationError: Si la question ne fait pas partie du questionnaire actif
+        """
+        from apps.response_management.models import ResponseDraft
+
+        question_id = str(question_id)
+        if question_id not in await cls._question_ids():
+            raise ValidationError(f"Question inconnue : {question_id}")
+
+        await ResponseDraft.objects.abulk_create(
+            [ResponseDraft(user=user, question_id=question_id, answer=answer)],
+            update_conflicts=True,
+            # MySQL (ON DUPLICATE KEY UPDATE) ne désigne pas la clé en conflit
+            unique_fields=(
+                ['user', 'question'] if connection.features.supports_update_conflicts_with_target else None
+            ),
+            update_fields=['answer', 'saved_at']
+        )
+        await cls.cache().adelete(cls._key(user.id, question_id))
+
+    @classmethod
+    async def acollect(cls, user) -> Dict[str, Dict[str, Any]]:
+        """
+        Brouillons de l'utilisateur pour le questionnaire actif.
+
+        Returns:
+            {question_id: {"answer", "user_id"}}, format attendu par la génération
+        """
+        from apps.response_management.models import ResponseDraft
+
+        question_ids = await cls._question_ids()
+        cached = await cls.cache().aget_many([cls._key(user.id, question_id) for question_id in question_ids])
+
+        drafts: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for question_id in question_ids:
+            draft = cached.get(cls._key(user.id, question_id))
+            if draft is None:
+                missing.append(question_id)
+            else:
+                drafts[question_id] = draft
+
+        if missing:
+            reloaded = {}
+            async for question_id, answer in ResponseDraft.objects.filter(
+                user=user,
+                question_id__in=missing
+            ).values_list('question_id', 'answer'):
+                drafts[str(question_id)] = {"answer": answer, "user_id": str(user.id)}
+                reloaded[cls._key(user.id, question_id)] = drafts[str(question_id)]
+            if reloaded:
+                await cls.cache().aset_many(reloaded, timeout=settings.DRAFT_STORE_TTL)
+        return drafts
+
+    @classmethod
+    async def aclear(cls, user) -> None:
+        """Supprime les brouillons de l'utilisateur (cache et base), après soumission."""
+        from apps.response_management.models import ResponseDraft
+
+        question_ids = await cls._question_ids()
+        await cls.cache().adelete_many([cls._key(user.id, question_id) for question_id in question_ids])
+        await ResponseDraft.objects.filter(user=user).adelete()
+        logger.info(f"Brouillons de {user.id} supprimés")
@@ -0,0 +1,59 @@
+from typing import Any, Dict, List
+import copy
+
+# Opérations JSON Patch (RFC 6902) produites et appliquées : add, remove, replace
+
+
+def _escape(key: str) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def diff(source: Any, target: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    Opérations JSON Patch transformant `source` en `target`.
+
+    Les objets sont comparés clé par clé ; les listes et valeurs scalaires
+    différentes sont remplacées d'un bloc.
+    """
+    if isinstance(source, dict) and isinstance(target, dict):
+        operations = []
+        for key in source:
+            if key not in target:
+                operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in target.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in source:
+                operations.append({"op": "add", "path": child, "value": value})
+            else:
+                operations.extend(diff(source[key], value, child))
+        return operations
+
+    if source == target and type(source) is type(target):
+        return []
+    return [{"op": "replace", "path": path, "value": target}]
+
+
+def apply(document: Any, operations: List[Dict[str, Any]]) -> Any:
+    """Applique des opérations produites par `diff` (le document n'est pas modifié)."""
+    result = copy.deepcopy(document)
+    for operation in operations:
+        if operation["path"] == "":
+            result = copy.deepcopy(operation.get("value"))
+            continue
+
+        *parents, last = [_unescape(token) for token in operation["path"].split('/')[1:]]
+        container = result
+        for token in parents:
+            container = container[int(token)] if isinstance(container, list) else container[token]
+        if isinstance(container, list):
+            last = int(last)
+
+        if operation["op"] == "remove":
+            del container[last]
+        else:
+            container[last] = copy.deepcopy(operation["value"])
+    return result
@@ -1,7 +1,10 @@
 from typing import Dict, Any, List, Optional
 import json
+import logging
 from django.core.exceptions import ValidationError
-from tiktoken import encoding_for_model
+from . import token_counter
+
+logger = logging.getLogger(__name__)
 
 class ResponseValidator:
     """Service de validation des réponses selon leur type"""
@@ -107,12 +110,24 @@ class ResponseValidator:
                     f"Type de données invalide pour {field_name}. Attendu : {expected_type}"
                 )
 
+    @staticmethod
+    def get_encoding(model: str = "gpt-4"):
+        """Encodage tiktoken partagé du modèle ; None s'il est indisponible"""
+        return token_counter.get_encoding(model)
+
     @staticmethod
     def estimate_tokens(content: str, model="gpt-4") -> int:
         """Estime le nombre de tokens pour une chaîne de caractères donnée"""
         try:
-            encoding = encoding_for_model(model)
-            return len(encoding.encode(content))
+            return token_counter.get_token_counter().count(content, model)
+        except Exception as e:
+            raise ValidationError(f"Erreur lors de l'estimation des tokens : {e}")
+
+    @staticmethod
+    def estimate_tokens_batch(contents: List[str], model="gpt-4") -> List[int]:
+        """Compte les tokens de plusieurs textes en un appel (voir TokenCounter)"""
+        try:
+            return token_counter.get_token_counter().count_batch(contents, model)
         except Exception as e:
             raise ValidationError(f"Erreur lors de l'estimation des tokens : {e}")
 
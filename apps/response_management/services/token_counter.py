@@ -0,0 +1,128 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+import time
+from tiktoken import encoding_for_model
+
+logger = logging.getLogger(__name__)
+
+# Approximation utilisée quand l'encodage tiktoken n'est pas disponible (hors ligne)
+CHARS_PER_TOKEN = 4
+# Délai avant de retenter le chargement d'un encodage après un échec, en secondes
+ENCODING_RETRY_DELAY = 60
+
+
+# Seuls les encodages chargés sont gardés : un échec (réseau) est retenté après ENCODING_RETRY_DELAY
+_encodings: Dict[str, object] = {}
+_failures: Dict[str, float] = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(model: str = "gpt-4"):
+    """Encodage tiktoken du modèle, chargé une fois par processus ; None s'il est indisponible"""
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    with _encodings_lock:
+        if model not in _encodings:
+            if time.monotonic() - _failures.get(model, float('-inf')) < ENCODING_RETRY_DELAY:
+                return None
+            try:
+                _encodings[model] = encoding_for_model(model)
+            except Exception as e:
+                # Fichier d'encodage non téléchargeable (machine sans réseau)
+                _failures[model] = time.monotonic()
+                logger.warning(f"Encodage tiktoken indisponible pour {model}, estimation approchée : {e}")
+                return None
+        return _encodings[model]
+
+
+def warm_up(models: Iterable[str]) -> None:
+    """Charge les encodages au démarrage pour que la première requête n'attende pas."""
+    for model in models:
+        get_encoding(model)
+
+
+def start_warm_up(models: Iterable[str]) -> None:
+    """
+    Lance warm_up dans un thread d'arrière-plan.
+
+    Appelé par les points d'entrée serveur (asgi, wsgi) : les commandes
+    manage.py (migrate, test...) ne téléchargent pas les encodages.
+    """
+    models = list(models)
+    if models:
+        threading.Thread(target=warm_up, args=(models,), name="tiktoken-warmup", daemon=True).start()
+
+
+class TokenCounter:
+    """
+    Comptage de tokens partagé par le processus.
+
+    Les textes sont encodés par lots (encode_batch) et les comptes gardés dans
+    un LRU borné indexé par l'empreinte du contenu : une réponse reprise d'un
+    brouillon à la soumission, puis à la génération, n'est encodée qu'une fois.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._counts: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(encoding_name: str, text: str) -> Tuple[str, str]:
+        return encoding_name, hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def count(self, text: str, model: str = "gpt-4") -> int:
+        return self.count_batch([text], model)[0]
+
+    def count_batch(self, texts: List[str], model: str = "gpt-4") -> List[int]:
+        """
+        Nombre de tokens de chaque texte, dans l'ordre.
+
+        Seuls les textes absents du LRU sont encodés, en un seul appel.
+        """
+        encoding = get_encoding(model)
+        if encoding is None:
+            return [len(text) // CHARS_PER_TOKEN + 1 for text in texts]
+
+        keys = [self._key(encoding.name, text) for text in texts]
+        counts: Dict[Tuple[str, str], int] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._counts:
+                    self._counts.move_to_end(key)
+                    counts[key] = self._counts[key]
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in counts}
+        if missing:
+            encoded = encoding.encode_batch(list(missing.values()), disallowed_special=())
+            fresh = {key: len(tokens) for key, tokens in zip(missing, encoded)}
+            counts.update(fresh)
+            self._store(fresh)
+
+        return [counts[key] for key in keys]
+
+    def _store(self, fresh: Dict[Tuple[str, str], int]) -> None:
+        with self._lock:
+            self._counts.update(fresh)
+            while len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+_token_counter: Optional[TokenCounter] = None
+
+
+def get_token_counter() -> TokenCounter:
+    """Compteur partagé, dimensionné par TOKEN_COUNT_CACHE_SIZE."""
+    global _token_counter
+    if _token_counter is None:
+        from django.conf import settings
+        _token_counter = TokenCounter(maxsize=settings.TOKEN_COUNT_CACHE_SIZE)
+    return _token_counter
@@ -0,0 +1,46 @@
+from typing import Dict, Iterable, List
+import logging
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class UserDataPurge:
+    """
+    Suppression ensembliste des réponses d'utilisateurs.
+
+    Chaque table est vidée par une requête DELETE filtrée sur les
+    utilisateurs (backups et index d'archives d'abord, réponses ensuite) :
+    le nombre de requêtes ne dépend pas du volume de réponses et la
+    transaction reste courte. Les fichiers d'archive contenant des versions
+    de ces utilisateurs sont réécrits sans elles une fois la transaction
+    validée (BackupArchive.purge_users).
+    La protection des réponses originales (Responses.delete) est
+    volontairement contournée, comme avec force_delete=True.
+    """
+
+    @staticmethod
+    def purge(user_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        Supprime les réponses, brouillons, backups et archives des utilisateurs.
+
+        Returns:
+            Nombre de lignes supprimées par table
+        """
+        from apps.response_management.models import ResponseDraft, Responses, ResponsesBackup
+        from .backup_archive import BackupArchive
+
+        user_ids = list(user_ids)
+        with transaction.atomic():
+            backups, _ = ResponsesBackup.objects.filter(user_id__in=user_ids).delete()
+            segments = BackupArchive().purge_users(user_ids)['segments']
+            ResponseDraft.objects.filter(user_id__in=user_ids).delete()
+            # Les dépendances restantes (déjà vidées) sont supprimées par lot, sans Responses.delete
+            _, deleted = Responses.objects.filter(user_id__in=user_ids).delete()
+            responses = deleted.get(Responses._meta.label, 0)
+        return {'responses': responses, 'backups': backups, 'archived_segments': segments}
+
+    @staticmethod
+    async def apurge(user_ids: List[str]) -> Dict[str, int]:
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(UserDataPurge.purge)(user_ids)
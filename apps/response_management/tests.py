@@ -1,3 +1,359 @@
-from django.test import TestCase
+from unittest import mock
+from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from apps.question_handling.models import Questions
+from apps.question_handling.questionnaire_cache import questionnaire_cache
+from apps.response_management.models import Responses, ResponsesBackup
+from apps.response_management.services.bulk_submission import BulkResponseService
+from apps.response_management.services import token_counter
+from apps.response_management.services.token_counter import TokenCounter
+from apps.user_management.models import Users
+
+
+class FakeEncoding:
+    name = "fake"
+
+    def __init__(self):
+        self.batches = []
+
+    def encode_batch(self, texts, **kwargs):
+        self.batches.append(list(texts))
+        return [text.split() for text in texts]
+
+
+class TokenCounterTest(SimpleTestCase):
+    def test_batch_encodes_only_unseen_texts_and_evicts_oldest(self):
+        encoding = FakeEncoding()
+        counter = TokenCounter(maxsize=2)
+
+        with mock.patch.object(token_counter, 'get_encoding', return_value=encoding):
+            self.assertEqual(counter.count_batch(["un deux", "trois"]), [2, 1])
+            self.assertEqual(counter.count_batch(["trois", "quatre cinq six"]), [1, 3])
+            self.assertEqual(counter.count("un deux"), 2)
+
+        self.assertEqual(encoding.batches, [["un deux", "trois"], ["quatre cinq six"], ["un deux"]])
+
+    def test_approximation_without_encoding(self):
+        with mock.patch.object(token_counter, 'get_encoding', return_value=None):
+            self.assertEqual(TokenCounter().count_batch(["a" * 40]), [11])
+
+    def test_failed_encoding_load_is_retried(self):
+        encoding = FakeEncoding()
+        with mock.patch.object(token_counter, '_encodings', {}), mock.patch.object(token_counter, '_failures', {}), \
+                mock.patch.object(token_counter, 'encoding_for_model', side_effect=[OSError("réseau"), encoding]):
+            self.assertIsNone(token_counter.get_encoding("gpt-4"))
+            # Pas de nouvelle tentative avant ENCODING_RETRY_DELAY
+            self.assertIsNone(token_counter.get_encoding("gpt-4"))
+            with mock.patch.object(token_counter, 'ENCODING_RETRY_DELAY', 0):
+                self.assertIs(token_counter.get_encoding("gpt-4"), encoding)
+            self.assertIs(token_counter.get_encoding("gpt-4"), encoding)
+
+
+class BulkResponseSubmissionTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(email="bulk@test.fr", username="bulk")
+        self.questions = [
+            Questions.objects.create(text=f"Question {i}", type="TEXT", configuration={}) for i in range(12)
+        ]
+
+    def _answers(self, questions, text):
+        return [{"question": str(question.id), "content": {"text": text}, "is_complete": True} for question in questions]
+
+    def test_fixed_query_count_and_backups_of_previous_versions(self):
+        # Sans réponse existante, ni backup ni upsert
+        with self.assertNumQueries(7):
+            BulkResponseService.upsert(self.user, self._answers(self.questions[:3], "v1"))
+        with self.assertNumQueries(9):
+            BulkResponseService.upsert(self.user, self._answers(self.questions, "v2"))
+
+        self.assertEqual(Responses.objects.filter(user=self.user).count(), 12)
+        self.assertEqual(Responses.objects.filter(user=self.user, content={"text": "v2"}).count(), 12)
+        backups = ResponsesBackup.objects.filter(user=self.user)
+        self.assertEqual(backups.count(), 3)
+        self.assertEqual({backup.content["text"] for backup in backups}, {"v1"})
+        self.assertEqual({backup.version_index for backup in backups}, {1})
+
+        with self.assertRaises(ValidationError):
+            BulkResponseService.upsert(self.user, [{"question": "inconnue"}])
+
+    def test_response_created_concurrently_is_versioned(self):
+        question = self.questions[0]
+        lock_existing = BulkResponseService._lock_existing
+        calls = []
+
+        def read_then_concurrent_insert(user, question_ids):
+            existing = lock_existing(user, question_ids)
+            if not calls:
+                # Réponse enregistrée par une autre requête juste après la lecture verrouillée
+                Responses(user=user, question=question, content={"text": "concurrente"}).save()
+            calls.append(question_ids)
+            return existing
+
+        with mock.patch.object(BulkResponseService, '_lock_existing', side_effect=read_then_concurrent_insert):
+            BulkResponseService.upsert(self.user, self._answers([question], "groupée"))
+
+        self.assertEqual(len(calls), 2)
+        response = Responses.objects.get(user=self.user, question=question)
+        self.assertEqual((response.content, response.version), ({"text": "groupée"}, 2))
+        backup = ResponsesBackup.objects.get(response=response)
+        self.assertEqual((backup.content, backup.version_index), ({"text": "concurrente"}, 1))
+
+
+class ResponseSaveTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(email="save@test.fr", username="save")
+        self.question = Questions.objects.create(text="Question", type="TEXT", configuration={})
+
+    def _save(self, text):
+        response = Responses(user=self.user, question=self.question, content={"text": text})
+        response.save(token="jeton")
+        return response
+
+    def test_constant_query_count_whatever_the_history(self):
+        first = self._save("v1")
+        for i in range(2, 6):
+            with self.assertNumQueries(5):
+                response = self._save(f"v{i}")
+
+        self.assertEqual((response.pk, response.version, response.is_original), (str(first.pk), 5, True))
+        stored = Responses.objects.get(user=self.user, question=self.question)
+        self.assertEqual((stored.content, stored.version), ({"text": "v5"}, 5))
+        self.assertEqual(
+            list(stored.backups.order_by('version_index').values_list('version_index', 'content')),
+            [(i, {"text": f"v{i}"}) for i in range(1, 5)]
+        )
+
+        # Mise à jour partielle : pas de nouvelle version
+        stored.is_valid = True
+        stored.save(update_fields=['is_valid', 'updated_at'])
+        self.assertEqual(stored.backups.count(), 4)
+
+
+class BackupHistoryTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(email="history@test.fr", username="history")
+        self.question = Questions.objects.create(text="Parcours", type="TABLE", configuration={})
+
+    @staticmethod
+    def _content(version):
+        return {"rows": [{"poste": f"Poste {i}", "durée": f"{i} ans"} for i in range(10)], "note": f"v{version}"}
+
+    def _backup_contents(self):
+        from apps.response_management.models import ResponsesBackup
+        from apps.response_management.serializers import ResponsesBackupSerializer
+
+        backups = ResponsesBackup.objects.filter(user=self.user).order_by('version_index')
+        return {item['version_index']: item['content'] for item in ResponsesBackupSerializer(backups, many=True).data}
+
+    def test_deltas_are_reconstructed_and_survive_retention(self):
+        from django.utils import timezone
+        from apps.response_management.models import ResponsesBackup
+        from apps.response_management.services.backup_history import BackupHistory
+
+        for version in range(1, 26):
+            Responses(user=self.user, question=self.question, content=self._content(version)).save()
+
+        backups = ResponsesBackup.objects.filter(user=self.user)
+        self.assertEqual(backups.count(), 24)
+        self.assertEqual(set(backups.filter(is_snapshot=True).values_list('version_index', flat=True)), {10, 20})
+        self.assertEqual(self._backup_contents(), {version: self._content(version) for version in range(1, 25)})
+
+        response = Responses.objects.get(user=self.user)
+        result = BackupHistory.prune(response.pk, keep_last=5, daily_days=1, now=timezone.now())
+        # Les 5 dernières versions, la version du jour étant la plus récente
+        self.assertEqual(result, {'deleted': 19, 'rewritten': 5})
+        self.assertEqual(self._backup_contents(), {version: self._content(version) for version in range(20, 25)})
+
+
+class BackupArchiveTest(TestCase):
+    def test_old_backups_move_to_compressed_files_and_stream_back(self):
+        import tempfile
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.response_management.models import ArchivedBackupSegment
+        from apps.response_management.services.backup_archive import BackupArchive
+
+        user = Users.objects.create(email="archive@test.fr", username="archive")
+        question = Questions.objects.create(text="Objectifs", type="TEXT", configuration={})
+        for version in range(1, 8):
+            Responses(user=user, question=question, content={"text": f"Objectif {version} " * 20}).save()
+        response = Responses.objects.get(user=user)
+        old = ResponsesBackup.objects.filter(response=response, version_index__lte=4)
+        old.filter(version_index__lte=2).update(backup_at=timezone.now() - timedelta(days=400))
+        old.filter(version_index__gt=2).update(backup_at=timezone.now() - timedelta(days=200))
+
+        with tempfile.TemporaryDirectory() as directory:
+            archive = BackupArchive(directory)
+            stats = archive.archive(timezone.now() - timedelta(days=180))
+
+            self.assertEqual(stats, {'responses': 1, 'backups': 4, 'members': 2})
+            self.assertEqual(ResponsesBackup.objects.filter(response=response).count(), 2)
+            self.assertEqual(ArchivedBackupSegment.objects.filter(response=response).count(), 2)
+
+            history = list(archive.iter_history(response.pk))
+            self.assertEqual([record['version_index'] for record in history], [1, 2, 3, 4, 5, 6])
+            self.assertEqual([record['archived'] for record in history], [True] * 4 + [False] * 2)
+            self.assertEqual(history[0]['content'], {"text": "Objectif 1 " * 20})
+
+
+class UserDataPurgeTest(TestCase):
+    def _user_with_history(self, name, questions, versions):
+        user = Users.objects.create(email=f"{name}@test.fr", username=name)
+        for question in questions:
+            for version in range(versions):
+                Responses(user=user, question=question, content={"text": f"{name} v{version}"}).save()
+        return user
+
+    def test_user_deletion_query_count_does_not_grow_with_history(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        questions = [Questions.objects.create(text=f"Q{i}", type="TEXT", configuration={}) for i in range(10)]
+        light = self._user_with_history("light", questions[:2], 2)
+        heavy = self._user_with_history("heavy", questions, 6)
+
+        counts = []
+        for user in (light, heavy):
+            with CaptureQueriesContext(connection) as queries:
+                user.delete()
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertFalse(Responses.objects.exists())
+        self.assertFalse(ResponsesBackup.objects.exists())
+
+    def test_purge_rewrites_archives_without_the_user_records(self):
+        import gzip
+        import tempfile
+        from datetime import timedelta
+        from pathlib import Path
+        from django.utils import timezone
+        from apps.response_management.services.backup_archive import BackupArchive
+        from apps.response_management.services.user_data import UserDataPurge
+
+        question = Questions.objects.create(text="Objectifs", type="TEXT", configuration={})
+        users = [self._user_with_history(name, [question], 3) for name in ("parti", "reste")]
+        ResponsesBackup.objects.update(backup_at=timezone.now() - timedelta(days=400))
+
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(RESPONSE_BACKUP_ARCHIVE_DIR=directory):
+            archive = BackupArchive()
+            archive.archive(timezone.now() - timedelta(days=180))
+            with self.captureOnCommitCallbacks(execute=True):
+                UserDataPurge.purge([users[0].pk])
+
+            content = b"".join(gzip.open(path).read() for path in Path(directory).glob("*.ndjson.gz"))
+            self.assertNotIn(str(users[0].pk).encode(), content)
+            kept = Responses.objects.get(user=users[1])
+            self.assertEqual(len(list(archive.iter_archived(kept.pk))), 2)
+
+    def test_rolled_back_purge_leaves_archives_untouched(self):
+        import tempfile
+        from datetime import timedelta
+        from pathlib import Path
+        from django.db import transaction
+        from django.utils import timezone
+        from apps.response_management.models import ArchivedBackupSegment
+        from apps.response_management.services.backup_archive import BackupArchive
+        from apps.response_management.services.user_data import UserDataPurge
+
+        question = Questions.objects.create(text="Objectifs", type="TEXT", configuration={})
+        users = [self._user_with_history(name, [question], 3) for name in ("parti", "reste")]
+        ResponsesBackup.objects.update(backup_at=timezone.now() - timedelta(days=400))
+
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(RESPONSE_BACKUP_ARCHIVE_DIR=directory):
+            archive = BackupArchive()
+            archive.archive(timezone.now() - timedelta(days=180))
+            files = {path: path.read_bytes() for path in Path(directory).glob("*.ndjson.gz")}
+            offsets = dict(ArchivedBackupSegment.objects.values_list('id', 'offset'))
+
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    UserDataPurge.purge([users[0].pk])
+                    raise RuntimeError("annulation")
+
+            self.assertEqual(callbacks, [])
+            self.assertEqual({path: path.read_bytes() for path in files}, files)
+            self.assertEqual(dict(ArchivedBackupSegment.objects.values_list('id', 'offset')), offsets)
+            for user in users:
+                response = Responses.objects.get(user=user)
+                self.assertEqual(len(list(archive.iter_archived(response.pk))), 2)
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'drafts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'drafts-tests'},
+})
+class DraftStoreTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(email="draft@test.fr", username="draft")
+        self.answered = Questions.objects.create(text="Objectif", type="TEXT", order_num=1, configuration={})
+        self.fresh = Questions.objects.create(text="Niveau", type="TEXT", order_num=2, configuration={})
+        Responses(user=self.user, question=self.answered, content={"text": "enregistrée"}).save()
+        # L'invalidation du questionnaire attend la validation de la transaction du test
+        questionnaire_cache.bump_version()
+
+    async def test_drafts_are_durable_and_survive_eviction(self):
+        from apps.response_management.services.draft_store import DraftStore
+
+        await DraftStore.asave(self.user, self.answered.id, "Devenir data engineer")
+        await DraftStore.asave(self.user, self.answered.id, "Devenir data architect")
+        await DraftStore.asave(self.user, self.fresh.id, "Débutant")
+        with self.assertRaises(ValidationError):
+            await DraftStore.asave(self.user, "00000000-0000-0000-0000-000000000000", "Inconnue")
+
+        # Entrées évincées : les deux brouillons, même sans réponse enregistrée, sont relus en base
+        await DraftStore.cache().aclear()
+        drafts = await DraftStore.acollect(self.user)
+        self.assertEqual(drafts, {
+            str(self.answered.id): {"answer": "Devenir data architect", "user_id": str(self.user.id)},
+            str(self.fresh.id): {"answer": "Débutant", "user_id": str(self.user.id)},
+        })
+
+        await DraftStore.aclear(self.user)
+        self.assertEqual(await DraftStore.acollect(self.user), {})
+
+    async def test_save_does_not_leave_a_stale_cache_entry(self):
+        from apps.response_management.services.draft_store import DraftStore
+
+        key = DraftStore._key(self.user.id, self.answered.id)
+        await DraftStore.asave(self.user, self.answered.id, "Devenir data engineer")
+        # Entrée écrite par une sauvegarde concurrente plus ancienne
+        await DraftStore.cache().aset(key, {"answer": "Devenir data engineer", "user_id": str(self.user.id)})
+        await DraftStore.asave(self.user, self.answered.id, "Devenir data architect")
+
+        self.assertIsNone(await DraftStore.cache().aget(key))
+        drafts = await DraftStore.acollect(self.user)
+        self.assertEqual(drafts[str(self.answered.id)]["answer"], "Devenir data architect")
+        # La lecture remplit le cache avec la valeur en base
+        self.assertEqual((await DraftStore.cache().aget(key))["answer"], "Devenir data architect")
+
+
+class SubmitFinalResponsesViewTest(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from apps.response_management.models import ResponseDraft
+
+        user = Users.objects.create(email="submit@test.fr", username="submit")
+        question = Questions.objects.create(text="Objectif", type="TEXT", order_num=1, configuration={})
+        ResponseDraft.objects.create(user=user, question=question, answer="Devenir data engineer")
+        questionnaire_cache.bump_version()
+        # Utilisateur relu en base, comme celui de l'authentification
+        self.user = Users.objects.get(pk=user.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_submission_enqueues_a_generation_job(self):
+        from django.urls import reverse
+        from apps.response_management.models import ResponseDraft
+        from apps.roadmap_management.models import GenerationJob
+
+        response = self.client.post(reverse('submit_final_responses'), {}, format='json')
+
+        self.assertEqual(response.status_code, 202, response.data)
+        job = GenerationJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual((job.roadmap_id, job.status), (str(response.data["roadmap_id"]), 'PENDING'))
+        self.assertFalse(ResponseDraft.objects.filter(user=self.user).exists())
 
-# Create your tests here.
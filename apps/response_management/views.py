@@ -6,14 +6,20 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from apps.response_management.serializers import ResponsesSerializer, ResponsesBackupSerializer
 from apps.response_management.models import Responses, ResponsesBackup
+from apps.response_management.services.backup_archive import BackupArchive
+from apps.response_management.services.bulk_submission import BulkResponseService
+from apps.response_management.services.draft_store import DraftStore
+from django.conf import settings
 from django.views import View
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.sessions.models import Session
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from asgiref.sync import async_to_sync
 
 import json
 import logging
@@ -43,20 +49,65 @@ class ResponsesViewSet(viewsets.ModelViewSet):
        token = self.request.auth.token if self.request.auth else None
        serializer.save(token=token)
 
+   @action(detail=False, methods=['post'], url_path='bulk')
+   def bulk(self, request):
+       """
+       Enregistre en une fois toutes les réponses de l'utilisateur connecté.
+
+       Corps attendu : {"responses": [{"question", "content", "is_complete", "draft_data"}, ...]}
+       """
+       answers = request.data.get('responses')
+       if not isinstance(answers, list) or not all(isinstance(answer, dict) for answer in answers):
+           return Response({"error": "Liste de réponses attendue"}, status=status.HTTP_400_BAD_REQUEST)
+
+       token = request.auth.token if request.auth else None
+       try:
+           responses = BulkResponseService.upsert(request.user, answers, token=token)
+       except ValidationError as e:
+           return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+       return Response(
+           ResponsesSerializer(responses, many=True).data,
+           status=status.HTTP_200_OK
+       )
+
 class ResponsesBackupViewSet(viewsets.ReadOnlyModelViewSet):
    queryset = ResponsesBackup.objects.all()
    serializer_class = ResponsesBackupSerializer
    permission_classes = [IsAuthenticated]
 
    def get_queryset(self):
+       # La réponse est sérialisée avec chaque backup
+       backups = ResponsesBackup.objects.select_related('response')
        if self.request.user.role in ['MANAGER', 'ADMIN']:
-           return ResponsesBackup.objects.all()
-       return ResponsesBackup.objects.filter(user=self.request.user)
+           return backups.all()
+       return backups.filter(user=self.request.user)
+
+   @action(detail=False, methods=['get'], url_path='history')
+   def history(self, request):
+       """
+       Historique complet d'une réponse (?response=<id>), archives comprises.
+
+       Les versions archivées sont décompressées au fil de l'envoi (NDJSON),
+       puis suivies des backups encore en base.
+       """
+       responses = Responses.objects.all()
+       if request.user.role not in ['MANAGER', 'ADMIN']:
+           responses = responses.filter(user=request.user)
+       response_id = request.query_params.get('response')
+       if not response_id or not responses.filter(pk=response_id).exists():
+           return Response({"error": "Réponse introuvable"}, status=status.HTTP_404_NOT_FOUND)
+
+       records = BackupArchive().iter_history(response_id)
+       return StreamingHttpResponse(
+           (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n" for record in records),
+           content_type='application/x-ndjson'
+       )
    
 @method_decorator(csrf_exempt, name='dispatch')
 class SaveTemporaryResponse(APIView):
     """
-    API View pour sauvegarder temporairement les réponses dans la session.
+    API View pour sauvegarder temporairement les réponses (DraftStore).
     Les réponses sont stockées jusqu'à la soumission finale.
     """
     permission_classes = [IsAuthenticated]
@@ -81,25 +132,20 @@ class SaveTemporaryResponse(APIView):
             if not question_id or not answer:
                 return Response({"error": "Données invalides"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Sauvegarder temporairement
-            if "temp_responses" not in request.session:
-                request.session["temp_responses"] = {}
-
-            request.session["temp_responses"][question_id] = {
-                "answer": answer,
-                "user_id": str(request.user.id),
-            }
-            request.session.modified = True
+            # Sauvegarder temporairement (seule la ligne de cette question est écrite)
+            async_to_sync(DraftStore.asave)(request.user, question_id, answer)
 
             return Response({"message": "Réponse sauvegardée temporairement"}, status=status.HTTP_200_OK)
 
+        except ValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Erreur lors de la sauvegarde temporaire : {e}")
             return Response({"error": "Erreur serveur"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def get(self, request, *args, **kwargs):
         """Récupère les réponses temporaires"""
-        temp_responses = request.session.get("temp_responses", {})
+        temp_responses = async_to_sync(DraftStore.acollect)(request.user)
         return Response(temp_responses, status=status.HTTP_200_OK)
 
 
@@ -107,32 +153,43 @@ class SaveTemporaryResponse(APIView):
 class SubmitFinalResponses(APIView):
     """
     API View pour soumettre les réponses finales.
-    Utilise les réponses temporaires stockées en session.
+    Utilise les réponses temporaires du DraftStore.
     """
     permission_classes = [IsAuthenticated]
 
-    async def post(self, request, *args, **kwargs):
+    def post(self, request, *args, **kwargs):
+        # Vue synchrone (DRF n'attend pas les coroutines) : le DraftStore passe par async_to_sync
         try:
-            temp_responses = request.session.get("temp_responses", {})
+            temp_responses = async_to_sync(DraftStore.acollect)(request.user)
 
             if not temp_responses:
                 return Response({"error": "Aucune réponse à soumettre"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Préparer les données pour OpenAI
-            from apps.roadmap_management.services.ai_service import RoadmapAIService
-            ai_service = RoadmapAIService()
-
-            prompt = f"Générer une roadmap basée sur ces réponses : {temp_responses}"
-            structured_data = {"responses": temp_responses}
-
-            # Envoi à OpenAI
-            generation_result = await ai_service.generate_roadmap(prompt, structured_data)
-
-            # Nettoyer les réponses temporaires
-            del request.session["temp_responses"]
-            request.session.modified = True
-
-            return Response({"message": "Réponses soumises avec succès", "result": generation_result}, status=status.HTTP_200_OK)
+            # La génération est confiée au worker : on répond immédiatement
+            from apps.roadmap_management.models import Roadmaps
+            from apps.roadmap_management.services.generation_jobs import GenerationJobService
+
+            roadmap = Roadmaps.objects.create(
+                user=request.user,
+                status='DRAFT',
+                version=1
+            )
+            job = GenerationJobService.enqueue(
+                roadmap,
+                request.user,
+                temp_responses,
+                mode='BATCH' if settings.AI_BATCH_SUBMISSIONS else 'INTERACTIVE'
+            )
+
+            # Nettoyer les réponses temporaires (elles sont portées par la tâche)
+            async_to_sync(DraftStore.aclear)(request.user)
+
+            return Response({
+                "message": "Réponses soumises avec succès",
+                "job_id": job.id,
+                "roadmap_id": roadmap.id,
+                "status": roadmap.status
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"Erreur lors de la soumission finale : {e}")
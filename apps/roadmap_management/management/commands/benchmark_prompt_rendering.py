@@ -0,0 +1,80 @@
+# apps/roadmap_management/management/commands/benchmark_prompt_rendering.py
+
+import timeit
+from django.core.management.base import BaseCommand
+from apps.roadmap_management.services.prompt_validation_service import PromptValidationService
+
+
+def replace_per_key(template, data):
+    """Rendu par str.replace successifs (implémentation précédente, pour comparaison)."""
+    PromptValidationService.validate_variables_data(PromptValidationService._extract_variables(template), data)
+    result = template
+    for var_name, var_data in data.items():
+        if isinstance(var_data, (list, tuple)):
+            for i, item in enumerate(var_data):
+                for key in item:
+                    result = result.replace(f"{{{var_name}[{i}].{key}}}", str(item[key]))
+        elif isinstance(var_data, dict):
+            for key in var_data:
+                result = result.replace(f"{{{var_name}.{key}}}", str(var_data[key]))
+        else:
+            result = result.replace(f"{{{var_name}}}", str(var_data))
+    return result
+
+
+class Command(BaseCommand):
+    help = "Compare le rendu compilé des templates de prompt au rendu par remplacements successifs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50, help="Nombre de questions du questionnaire")
+        parser.add_argument('--number', type=int, default=200, help="Rendus par mesure")
+        parser.add_argument('--repeat', type=int, default=5, help="Nombre de mesures (la meilleure est retenue)")
+
+    def handle(self, *args, **options):
+        template, data = self._payload(options['questions'])
+
+        expected = replace_per_key(template, data)
+        if PromptValidationService.substitute_variables(template, data) != expected:
+            self.stderr.write("Les deux rendus diffèrent")
+
+        timings = {}
+        for label, render in (
+            ("remplacements successifs", lambda: replace_per_key(template, data)),
+            ("template compilé", lambda: PromptValidationService.substitute_variables(template, data)),
+        ):
+            best = min(timeit.repeat(render, number=options['number'], repeat=options['repeat']))
+            timings[label] = best / options['number'] * 1000
+            self.stdout.write(f"{label:<26} {timings[label]:.3f} ms/rendu")
+
+        speedup = timings["remplacements successifs"] / timings["template compilé"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Gain : x{speedup:.1f} ({options['questions']} questions, template de {len(template)} caractères)"
+        ))
+
+    @staticmethod
+    def _payload(count):
+        """Template et données réalistes : une ligne par question et par réponse."""
+        lines = [
+            "Tu es un conseiller de carrière. Profil : {user.username} ({user.role}).",
+            "Questions posées : {questions.text} / {questions.type}.",
+            "Réponses : {responses.content} (validées : {responses.is_valid}).",
+            "Contexte : {context.objective}",
+        ]
+        for i in range(count):
+            lines.append(f"Q{i + 1}. {{questions[{i}].text}} ({{questions[{i}].type}})")
+            lines.append(f"R{i + 1}. {{responses[{i}].content}}")
+        lines.append("Propose une roadmap structurée par catégorie.")
+
+        data = {
+            'user': {'username': "alice", 'role': "USER"},
+            'questions': [
+                {'text': f"Question {i + 1} sur votre parcours et vos objectifs ?", 'type': "TEXT"}
+                for i in range(count)
+            ],
+            'responses': [
+                {'content': "Réponse détaillée de l'utilisateur. " * 8, 'is_valid': True}
+                for _ in range(count)
+            ],
+            'context': {'objective': "Reconversion vers le développement backend"},
+        }
+        return "\n".join(lines), data
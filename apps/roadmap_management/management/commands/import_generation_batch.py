@@ -0,0 +1,40 @@
+# apps/roadmap_management/management/commands/import_generation_batch.py
+
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.roadmap_management.services.batch_generation import BatchGenerationService, TERMINAL_FAILURE_STATUSES
+
+
+class Command(BaseCommand):
+    help = "Importe les résultats d'un lot de l'API Batch dans les roadmaps et l'historique"
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--batch-id', help="Identifiant du lot à télécharger puis importer")
+        source.add_argument('--file', type=Path, help="Fichier de résultats JSONL déjà téléchargé")
+
+    def handle(self, *args, **options):
+        service = BatchGenerationService()
+
+        if options['file']:
+            if not options['file'].exists():
+                raise CommandError(f"Fichier introuvable : {options['file']}")
+            paths = [options['file']]
+        else:
+            status, paths = service.download_results(options['batch_id'], Path(settings.AI_BATCH_DIR))
+            if not paths:
+                if status in TERMINAL_FAILURE_STATUSES:
+                    self.stdout.write(self.style.WARNING(
+                        f"Lot {options['batch_id']} : {status}, générations remises en file pour le worker"
+                    ))
+                else:
+                    self.stdout.write(f"Lot {options['batch_id']} : {status}, rien à importer")
+                return
+
+        for path in paths:
+            counts = service.import_results(path)
+            self.stdout.write(self.style.SUCCESS(
+                f"{path.name} : {counts['succeeded']} réussie(s), {counts['requeued']} remise(s) en file, "
+                f"{counts['failed']} en échec, {counts['skipped']} ignorée(s)"
+            ))
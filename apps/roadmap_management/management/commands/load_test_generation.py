@@ -0,0 +1,154 @@
+# apps/roadmap_management/management/commands/load_test_generation.py
+
+import secrets
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.question_handling.models import Questions
+from apps.roadmap_management.models import GenerationJob, Roadmaps
+from apps.roadmap_management.services.openai_client import STUB_API_TYPES
+from apps.user_management.models import Users
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Soumet des générations synthétiques par les vues de l'API et mesure leur "
+        "traitement par les workers (à lancer avec OPENAI_API_TYPE=stub ou replay)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Utilisateur pour lequel générer les roadmaps")
+        parser.add_argument('--jobs', type=int, default=50, help="Nombre de générations à soumettre")
+        parser.add_argument(
+            '--endpoint',
+            choices=['submit', 'generate'],
+            default='submit',
+            help="Vue utilisée : soumission finale des réponses ou action generate d'une roadmap"
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=600.0,
+            help="Délai maximal d'attente de la fin des générations, en secondes"
+        )
+        parser.add_argument(
+            '--allow-live',
+            action='store_true',
+            help="Autorise le test contre l'API réelle (facturée)"
+        )
+
+    def handle(self, *args, **options):
+        if settings.OPENAI_API_TYPE not in STUB_API_TYPES and not options['allow_live']:
+            raise CommandError(
+                f"OPENAI_API_TYPE={settings.OPENAI_API_TYPE} : utilisez stub/replay ou --allow-live"
+            )
+        try:
+            user = Users.objects.get(username=options['username'])
+        except Users.DoesNotExist:
+            raise CommandError(f"Utilisateur {options['username']} introuvable")
+
+        questions = list(Questions.objects.filter(is_active=True))
+        if not questions:
+            raise CommandError("Aucune question active : impossible de construire des réponses")
+        if settings.AI_COMPLETION_CACHE_ENABLED or settings.ROADMAP_PROFILE_REUSE:
+            # Les réponses varient d'une génération à l'autre, mais les caches du worker
+            # se règlent dans son propre environnement
+            self.stdout.write(self.style.WARNING(
+                "AI_COMPLETION_CACHE_ENABLED/ROADMAP_PROFILE_REUSE actifs : lancez le worker "
+                "avec ces réglages à False pour mesurer des générations complètes"
+            ))
+
+        client = APIClient(HTTP_HOST=self._host())
+        client.force_authenticate(user)
+        job_ids = []
+        submit_time = []
+        for _ in range(options['jobs']):
+            for question_id, answer in self._synthetic_responses(questions).items():
+                self._post(client, reverse('save_temporary_response'), {"question_id": question_id, "answer": answer})
+            started = time.monotonic()
+            if options['endpoint'] == 'submit':
+                data = self._post(client, reverse('submit_final_responses'), {})
+            else:
+                roadmap = Roadmaps.objects.create(user=user, status='DRAFT', version=1)
+                data = self._post(client, reverse('roadmaps-generate', args=[roadmap.id]), {})
+            submit_time.append(time.monotonic() - started)
+            job_ids.append(data['job_id'])
+        self.stdout.write(
+            f"{len(job_ids)} génération(s) soumise(s) : p50={percentile(submit_time, 0.5) * 1000:.0f}ms "
+            f"p95={percentile(submit_time, 0.95) * 1000:.0f}ms ; lancez run_generation_worker pour les traiter"
+        )
+
+        started = time.monotonic()
+        deadline = started + options['timeout']
+        while time.monotonic() < deadline:
+            pending = GenerationJob.objects.filter(
+                id__in=job_ids,
+                status__in=['PENDING', 'RUNNING']
+            ).count()
+            if not pending:
+                break
+            time.sleep(1)
+        elapsed = time.monotonic() - started
+
+        self._report(GenerationJob.objects.filter(id__in=job_ids), elapsed)
+
+    @staticmethod
+    def _host():
+        """Hôte accepté par ALLOWED_HOSTS pour les requêtes du client de test."""
+        return next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+
+    def _post(self, client, url, data):
+        response = client.post(url, data, format='json')
+        if response.status_code >= 300:
+            raise CommandError(f"{url} : HTTP {response.status_code} {getattr(response, 'data', '')}")
+        return response.data
+
+    @staticmethod
+    def _synthetic_responses(questions):
+        """
+        Réponses valides et propres à une génération, {question_id: answer}.
+
+        Les textes sont tirés au hasard à chaque appel : ni le cache des
+        complétions ni la réutilisation de profils ne peuvent servir une
+        génération à partir d'une précédente.
+        """
+        responses = {}
+        for question in questions:
+            config = question.configuration or {}
+            if question.type == 'MULTIPLE_CHOICE':
+                options = config.get('options', [])
+                answer = [secrets.choice(options)] if options else []
+            elif question.type == 'TABLE':
+                answer = [{column['name']: secrets.token_hex(4) for column in config.get('columns', [])}]
+            else:
+                answer = " ".join(secrets.token_hex(4) for _ in range(40))
+            if answer:
+                responses[str(question.id)] = answer
+        return responses
+
+    def _report(self, jobs, elapsed):
+        jobs = list(jobs)
+        finished = [job for job in jobs if job.finished_at and job.started_at]
+        queue_wait = [(job.started_at - job.created_at).total_seconds() for job in finished]
+        run_time = [(job.finished_at - job.started_at).total_seconds() for job in finished]
+        succeeded = sum(1 for job in jobs if job.status == 'SUCCEEDED')
+        failed = sum(1 for job in jobs if job.status == 'FAILED')
+        retries = sum((job.result or {}).get('retries', 0) for job in jobs)
+
+        self.stdout.write(f"Terminées : {succeeded} succès, {failed} échec(s), "
+                          f"{len(jobs) - succeeded - failed} non terminée(s)")
+        throughput = len(finished) / elapsed * 60 if elapsed else 0.0
+        self.stdout.write(f"Durée totale : {elapsed:.1f}s, débit : {throughput:.1f} générations/min")
+        self.stdout.write(f"Attente en file : p50={percentile(queue_wait, 0.5):.2f}s p95={percentile(queue_wait, 0.95):.2f}s")
+        self.stdout.write(f"Génération : p50={percentile(run_time, 0.5):.2f}s p95={percentile(run_time, 0.95):.2f}s "
+                          f"p99={percentile(run_time, 0.99):.2f}s")
+        self.stdout.write(f"Relances OpenAI : {retries}")
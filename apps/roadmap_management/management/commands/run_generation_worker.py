@@ -0,0 +1,103 @@
+# apps/roadmap_management/management/commands/run_generation_worker.py
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.roadmap_management.services.generation_jobs import GenerationJobService
+from apps.roadmap_management.services.openai_client import close_async_client
+from apps.response_management.services import token_counter
+from apps.roadmap_management.services.prompt_registry import prompt_registry
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Traite la file des générations de roadmaps (GenerationJob)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.GENERATION_WORKER_CONCURRENCY,
+            help="Nombre maximum de générations simultanées"
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.GENERATION_WORKER_POLL_INTERVAL,
+            help="Délai en secondes entre deux interrogations de la file vide"
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=settings.GENERATION_WORKER_STALE_AFTER,
+            help="Délai en secondes après lequel une tâche RUNNING est remise en file"
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Traite les tâches disponibles puis s'arrête"
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # Templates compilés avant la première génération
+        prompt_registry.warm_up()
+        token_counter.warm_up(settings.TOKEN_COUNTER_WARMUP_MODELS)
+        self.stdout.write(f"Worker {worker_id} démarré (concurrence {options['concurrency']})")
+        asyncio.run(self._run(worker_id, options))
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker_id} arrêté"))
+
+    async def _run(self, worker_id, options):
+        concurrency = max(1, options['concurrency'])
+        stop = asyncio.Event()
+        running = set()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        requeued = await sync_to_async(GenerationJobService.requeue_stale)(options['stale_after'])
+        if requeued:
+            logger.warning(f"{requeued} tâche(s) orpheline(s) remise(s) en file")
+
+        while not stop.is_set():
+            jobs = await sync_to_async(GenerationJobService.claim_jobs)(
+                worker_id,
+                concurrency - len(running)
+            )
+            for job in jobs:
+                task = asyncio.create_task(self._run_job(job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+            if options['once'] and not jobs and not running:
+                break
+
+            if len(running) >= concurrency:
+                # Concurrence maximale atteinte : on attend qu'une génération se libère
+                await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            elif not jobs:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=options['poll_interval'])
+                except asyncio.TimeoutError:
+                    pass
+
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        await close_async_client()
+
+    async def _run_job(self, job):
+        try:
+            await GenerationJobService.run_job(job)
+            self.stdout.write(f"Tâche {job.id}: {job.status}")
+        except Exception as e:
+            logger.error(f"Erreur inattendue sur la tâche {job.id}: {str(e)}")
@@ -0,0 +1,45 @@
+# apps/roadmap_management/management/commands/submit_generation_batch.py
+
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.roadmap_management.services.batch_generation import BatchGenerationService, MAX_REQUESTS_PER_BATCH
+
+
+class Command(BaseCommand):
+    help = "Regroupe les générations en attente en mode BATCH dans un fichier JSONL et le soumet à l'API Batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=MAX_REQUESTS_PER_BATCH,
+            help="Nombre maximum de générations dans le lot"
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help="Chemin du fichier JSONL d'entrée (par défaut dans AI_BATCH_DIR)"
+        )
+
+    def handle(self, *args, **options):
+        service = BatchGenerationService()
+        jobs = service.collect_jobs(options['limit'])
+        if not jobs:
+            self.stdout.write("Aucune génération en attente")
+            return
+
+        output = options['output'] or Path(settings.AI_BATCH_DIR) / f"input-{timezone.now():%Y%m%d-%H%M%S}.jsonl"
+        batch_id, submitted = service.submit_jobs(jobs, output)
+        if batch_id is None:
+            self.stdout.write(self.style.WARNING("Aucune requête n'a pu être préparée"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Lot {batch_id} soumis : {submitted} génération(s), fichier {output}"
+        ))
+        if submitted < len(jobs):
+            self.stdout.write(self.style.WARNING(
+                f"{len(jobs) - submitted} génération(s) remise(s) en file après un échec de préparation"
+            ))
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:26
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("roadmap_management", "0005_generation_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoadmapSection",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        max_length=36,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("category", models.CharField(max_length=50)),
+                ("position", models.IntegerField(default=0)),
+                ("content", models.TextField(blank=True, null=True)),
+                (
+                    "input_hash",
+                    models.CharField(
+                        help_text="Empreinte des réponses ayant servi à la génération",
+                        max_length=64,
+                    ),
+                ),
+                ("model", models.CharField(blank=True, max_length=50, null=True)),
+                ("token_count", models.IntegerField(blank=True, null=True)),
+                (
+                    "generated_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "roadmap",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sections",
+                        to="roadmap_management.roadmaps",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "roadmap_sections",
+                "ordering": ["position", "category"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="roadmapsection",
+            constraint=models.UniqueConstraint(
+                fields=("roadmap", "category"), name="unique_roadmap_section"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("roadmap_management", "0006_roadmap_sections"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="roadmaps",
+            name="generation_lease_expires_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Fin du bail de la génération en cours (statut GENERATING)",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("roadmap_management", "0007_roadmap_generation_lease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationhistory",
+            name="cached",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="generationhistory",
+            name="completion_tokens",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="generationhistory",
+            name="finish_reason",
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name="generationhistory",
+            name="model",
+            field=models.CharField(blank=True, default="", max_length=50),
+        ),
+        migrations.AddField(
+            model_name="generationhistory",
+            name="prompt_tokens",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="generationhistory",
+            name="retries",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="generationhistory",
+            index=models.Index(
+                fields=["created_at", "model"], name="generation_history_window_idx"
+            ),
+        ),
+    ]
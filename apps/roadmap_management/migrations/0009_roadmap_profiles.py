@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("roadmap_management", "0008_generation_history_telemetry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoadmapProfile",
+            fields=[
+                (
+                    "roadmap",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="profile",
+                        serialize=False,
+                        to="roadmap_management.roadmaps",
+                    ),
+                ),
+                (
+                    "vector",
+                    models.BinaryField(
+                        help_text="Vecteur float16 des réponses hachées"
+                    ),
+                ),
+                ("dimensions", models.IntegerField()),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "roadmap_profiles",
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("roadmap_management", "0009_roadmap_profiles"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationjob",
+            name="mode",
+            field=models.CharField(
+                choices=[("INTERACTIVE", "Interactive"), ("BATCH", "Batch")],
+                default="INTERACTIVE",
+                help_text="INTERACTIVE : traitée par run_generation_worker ; BATCH : réservée à submit_generation_batch",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="generationjob",
+            index=models.Index(
+                fields=["mode", "status", "created_at"], name="generation_job_mode_idx"
+            ),
+        ),
+    ]
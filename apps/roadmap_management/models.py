@@ -8,6 +8,9 @@ from django.utils import timezone
 from typing import Dict, Any
 from collections import Counter
 from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .services.ai_settings import AIConfigurationTemplate, GenerationHistory  # noqa: F401 (enregistrement des modèles)
 
 class Roadmaps(models.Model):
     STATUSES = [
@@ -24,6 +27,11 @@ class Roadmaps(models.Model):
     content = models.TextField(blank=True, null=True)
     version = models.IntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUSES, default='DRAFT')
+    generation_lease_expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Fin du bail de la génération en cours (statut GENERATING)"
+    )
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -36,7 +44,13 @@ class Roadmaps(models.Model):
 
     def can_generate(self) -> bool:
         """Vérifie si la roadmap peut être générée"""
-        return self.status not in ['GENERATING', 'ARCHIVED']
+        if self.status == 'ARCHIVED':
+            return False
+        # Un bail expiré signale une génération abandonnée (worker ou client disparu)
+        return self.status != 'GENERATING' or self.generation_lease_expired()
+
+    def generation_lease_expired(self) -> bool:
+        return self.generation_lease_expires_at is None or self.generation_lease_expires_at < timezone.now()
 
     def can_delete(self) -> bool:
         """Vérifie si la roadmap peut être supprimée"""
@@ -213,4 +227,125 @@ class PromptTemplate(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.name} (v{self.version})"
\ No newline at end of file
+        return f"{self.name} (v{self.version})"
+
+
+@receiver(post_save, sender=PromptTemplate)
+@receiver(post_delete, sender=PromptTemplate)
+def invalidate_prompt_registry(sender, instance, **kwargs):
+    """Les processus rechargent le template modifié à leur prochaine lecture."""
+    from .services.prompt_registry import prompt_registry
+    prompt_registry.invalidate()
+
+
+class GenerationJob(models.Model):
+    """Tâche de génération de roadmap traitée hors requête par le worker"""
+    STATUSES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed')
+    ]
+    KINDS = [
+        ('GENERATE', 'Generate'),
+        ('REGENERATE', 'Regenerate')
+    ]
+    MODES = [
+        ('INTERACTIVE', 'Interactive'),
+        ('BATCH', 'Batch')
+    ]
+
+    id = models.CharField(primary_key=True, max_length=36, default=uuid.uuid4, editable=False)
+    roadmap = models.ForeignKey(
+        'Roadmaps',
+        on_delete=models.CASCADE,
+        related_name='generation_jobs'
+    )
+    user = models.ForeignKey(
+        'user_management.Users',
+        on_delete=models.SET_NULL,
+        related_name='generation_jobs',
+        blank=True,
+        null=True
+    )
+    kind = models.CharField(max_length=20, choices=KINDS, default='GENERATE')
+    mode = models.CharField(
+        max_length=20,
+        choices=MODES,
+        default='INTERACTIVE',
+        help_text="INTERACTIVE : traitée par run_generation_worker ; BATCH : réservée à submit_generation_batch"
+    )
+    status = models.CharField(max_length=20, choices=STATUSES, default='PENDING')
+    payload = models.JSONField(default=dict, help_text="Réponses et configuration IA à utiliser")
+    result = models.JSONField(blank=True, null=True, help_text="Métadonnées de la génération")
+    error_message = models.TextField(blank=True, null=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'roadmap_generation_jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='generation_job_queue_idx'),
+            models.Index(fields=['mode', 'status', 'created_at'], name='generation_job_mode_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.kind}) - {self.status}"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ['SUCCEEDED', 'FAILED']
+
+
+class RoadmapSection(models.Model):
+    """Section d'une roadmap, générée à partir des réponses d'une catégorie de questions"""
+
+    id = models.CharField(primary_key=True, max_length=36, default=uuid.uuid4, editable=False)
+    roadmap = models.ForeignKey(
+        'Roadmaps',
+        on_delete=models.CASCADE,
+        related_name='sections'
+    )
+    category = models.CharField(max_length=50)
+    position = models.IntegerField(default=0)
+    content = models.TextField(blank=True, null=True)
+    input_hash = models.CharField(max_length=64, help_text="Empreinte des réponses ayant servi à la génération")
+    model = models.CharField(max_length=50, blank=True, null=True)
+    token_count = models.IntegerField(blank=True, null=True)
+    generated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'roadmap_sections'
+        ordering = ['position', 'category']
+        constraints = [
+            models.UniqueConstraint(fields=['roadmap', 'category'], name='unique_roadmap_section'),
+        ]
+
+    def __str__(self):
+        return f"{self.roadmap_id} - {self.category}"
+
+
+class RoadmapProfile(models.Model):
+    """Vecteur des réponses ayant produit une roadmap terminée (index de réutilisation)"""
+
+    roadmap = models.OneToOneField(
+        'Roadmaps',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='profile'
+    )
+    vector = models.BinaryField(help_text="Vecteur float16 des réponses hachées")
+    dimensions = models.IntegerField()
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'roadmap_profiles'
+
+    def __str__(self):
+        return f"Profil {self.roadmap_id} ({self.dimensions} dimensions)"
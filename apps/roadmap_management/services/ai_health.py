@@ -0,0 +1,261 @@
+# apps/roadmap_management/services/ai_health.py
+
+from __future__ import annotations
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+import asyncio
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from .openai_client import get_async_client
+from .resilience import CircuitBreaker, circuit_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Bornes (secondes) de l'histogramme partagé des latences ; au-delà : dernière case
+LATENCY_BOUNDS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, 90, 120, 180, 300)
+
+
+class CallStats:
+    """
+    Statistiques en mémoire des appels OpenAI du processus.
+
+    Conserve les `maxlen` derniers appels (horodatage, durée, succès) pour
+    calculer sans requête le taux de succès et la latence p95 récents.
+    """
+
+    def __init__(self, maxlen: int = 500):
+        self._calls: Deque[Tuple[float, float, bool]] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, duration: float, success: bool) -> None:
+        with self._lock:
+            self._calls.append((time.time(), duration, success))
+
+    def snapshot(self, window: float) -> Dict[str, Any]:
+        """Résumé des appels des `window` dernières secondes."""
+        since = time.time() - window
+        with self._lock:
+            calls = [call for call in self._calls if call[0] >= since]
+        durations = sorted(duration for _, duration, success in calls if success)
+        successes = len(durations)
+        return {
+            'window_seconds': window,
+            'calls': len(calls),
+            'success_rate': successes / len(calls) if calls else None,
+            'p50_latency': durations[int(0.5 * (successes - 1))] if durations else None,
+            'p95_latency': durations[int(0.95 * (successes - 1))] if durations else None
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._calls.clear()
+
+
+class SharedCallStats:
+    """
+    Statistiques des appels OpenAI partagées entre processus.
+
+    Les appels sont faits par run_generation_worker alors que /api/ai-health/
+    est servi par les processus web : chaque appel incrémente, dans le cache
+    partagé, un compteur par tranche de BUCKET secondes et par case de
+    latence (ou d'échec). La latence est donc la borne de sa case. Sans
+    incr atomique (DummyCache), les statistiques restent propres au processus.
+    """
+
+    BUCKET = 10
+    KEY_PREFIX = "ai_health:calls"
+
+    def __init__(self, alias: Optional[str] = None, maxlen: int = 500):
+        self.alias = alias
+        self.local = CallStats(maxlen=maxlen)
+        self._shared = True
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.AI_HEALTH_STATS_CACHE_ALIAS]
+
+    def _key(self, bucket: int, slot: Any) -> str:
+        return f"{self.KEY_PREFIX}:{bucket}:{slot}"
+
+    @staticmethod
+    def _slot(duration: float, success: bool) -> Any:
+        return min(bisect_left(LATENCY_BOUNDS, duration), len(LATENCY_BOUNDS) - 1) if success else 'err'
+
+    def _keys(self, window: float) -> List[Tuple[str, Any]]:
+        now = time.time()
+        last = int(now // self.BUCKET)
+        first = int((now - window) // self.BUCKET)
+        slots = list(range(len(LATENCY_BOUNDS))) + ['err']
+        return [(self._key(bucket, slot), slot) for bucket in range(first, last + 1) for slot in slots]
+
+    async def arecord(self, duration: float, success: bool) -> None:
+        self.local.record(duration, success)
+        if not self._shared:
+            return
+        key = self._key(int(time.time() // self.BUCKET), self._slot(duration, success))
+        try:
+            await self.cache.aadd(key, 0, timeout=int(settings.AI_HEALTH_STATS_WINDOW) + self.BUCKET)
+            await self.cache.aincr(key)
+        except ValueError:
+            self._disable()
+        except Exception as e:
+            logger.warning(f"Statistique d'appel OpenAI non publiée: {str(e)}")
+
+    async def asnapshot(self, window: float) -> Dict[str, Any]:
+        """Résumé des appels de tous les processus sur les `window` dernières secondes."""
+        if not self._shared:
+            return self.local.snapshot(window)
+        keys = self._keys(window)
+        try:
+            counts = await self.cache.aget_many([key for key, _ in keys])
+        except Exception as e:
+            logger.warning(f"Statistiques d'appels partagées indisponibles: {str(e)}")
+            return self.local.snapshot(window)
+
+        histogram = [0] * len(LATENCY_BOUNDS)
+        failures = 0
+        for key, slot in keys:
+            if slot == 'err':
+                failures += counts.get(key, 0)
+            else:
+                histogram[slot] += counts.get(key, 0)
+        successes = sum(histogram)
+        calls = successes + failures
+        return {
+            'window_seconds': window,
+            'calls': calls,
+            'success_rate': successes / calls if calls else None,
+            'p50_latency': self._percentile(histogram, successes, 0.5),
+            'p95_latency': self._percentile(histogram, successes, 0.95)
+        }
+
+    @staticmethod
+    def _percentile(histogram: List[int], total: int, quantile: float) -> Optional[float]:
+        if not total:
+            return None
+        rank = int(quantile * (total - 1))
+        seen = 0
+        for slot, count in enumerate(histogram):
+            seen += count
+            if seen > rank:
+                return float(LATENCY_BOUNDS[slot])
+        return float(LATENCY_BOUNDS[-1])
+
+    def _disable(self) -> None:
+        logger.warning("Cache sans incr atomique : statistiques d'appels OpenAI propres au processus")
+        self._shared = False
+
+    def clear(self) -> None:
+        self.local.clear()
+        self._shared = True
+        try:
+            self.cache.delete_many([key for key, _ in self._keys(settings.AI_HEALTH_STATS_WINDOW)])
+        except Exception:
+            pass
+
+
+call_stats = SharedCallStats(maxlen=settings.AI_HEALTH_STATS_MAX_CALLS)
+
+
+class AIHealthProbe:
+    """
+    Sonde de santé du fournisseur IA, sans consommation de tokens.
+
+    La vérification amont est un simple GET /models/{model}, dont le résultat
+    est partagé dans le cache Django. Au-delà de AI_HEALTH_CACHE_TTL le
+    résultat est servi tel quel pendant qu'une tâche le rafraîchit en
+    arrière-plan ; seul un cache vide déclenche un appel bloquant.
+
+    Un verrou à durée limitée dans le cache (et non l'état de la tâche)
+    garantit une seule vérification à la fois : une tâche perdue avec la
+    boucle d'événements de sa requête (async_to_sync sous WSGI) ne bloque
+    pas les rafraîchissements suivants au-delà de ce délai.
+    """
+
+    CACHE_KEY = "ai_health:probe"
+    LOCK_KEY = "ai_health:refreshing"
+
+    # Références des tâches en cours (évite leur collecte prématurée)
+    _tasks: Set[asyncio.Task] = set()
+
+    def __init__(self, alias: str = 'default'):
+        self.cache = caches[alias]
+        self.ttl = settings.AI_HEALTH_CACHE_TTL
+        self.timeout = settings.AI_HEALTH_PROBE_TIMEOUT
+
+    async def status(self) -> Dict[str, Any]:
+        """Dernier résultat de la sonde, rafraîchi en arrière-plan si périmé."""
+        result = await self.cache.aget(self.CACHE_KEY)
+        if result is None:
+            return {**await self.refresh(), 'cached': False}
+
+        if time.time() - result['checked_at'] > self.ttl and await self.cache.aadd(
+            self.LOCK_KEY, 1, timeout=int(self.timeout) + 1
+        ):
+            task = asyncio.create_task(self.refresh())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return {**result, 'cached': True}
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Interroge l'API et met le résultat en cache."""
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                get_async_client().models.retrieve(settings.OPENAI_MODEL),
+                timeout=self.timeout
+            )
+            result = {'api_connected': True, 'error': None}
+        except Exception as e:
+            logger.warning(f"Sonde de santé OpenAI en échec: {str(e) or type(e).__name__}")
+            result = {'api_connected': False, 'error': str(e) or type(e).__name__}
+
+        result.update({
+            'probe_latency': time.monotonic() - start,
+            'checked_at': time.time()
+        })
+        # Un résultat périmé reste servi jusqu'à 4 TTL si le rafraîchissement échoue
+        await self.cache.aset(self.CACHE_KEY, result, timeout=self.ttl * 4)
+        await self.cache.adelete(self.LOCK_KEY)
+        return result
+
+
+def health_report(probe_result: Dict[str, Any], stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Combine la sonde, les statistiques d'appels et l'état des disjoncteurs.
+
+    Returns:
+        Rapport dont `status` vaut healthy, degraded ou unhealthy
+    """
+    stats = stats or call_stats.local.snapshot(settings.AI_HEALTH_STATS_WINDOW)
+    circuits = circuit_snapshots()
+
+    if not probe_result['api_connected']:
+        status = 'unhealthy'
+    elif (
+        any(circuit['state'] != CircuitBreaker.CLOSED for circuit in circuits.values())
+        or (
+            stats['calls'] >= settings.AI_HEALTH_MIN_CALLS
+            and stats['success_rate'] < settings.AI_HEALTH_MIN_SUCCESS_RATE
+        )
+    ):
+        status = 'degraded'
+    else:
+        status = 'healthy'
+
+    return {
+        'status': status,
+        'api_connected': probe_result['api_connected'],
+        'error': probe_result.get('error'),
+        'probe_latency': probe_result.get('probe_latency'),
+        'checked_at': datetime.fromtimestamp(probe_result['checked_at']).isoformat(),
+        'cached': probe_result.get('cached', False),
+        'recent_calls': stats,
+        'circuits': circuits,
+        'timestamp': datetime.now().isoformat()
+    }
@@ -4,8 +4,11 @@ from typing import Dict, Any, List, Optional
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from apps.question_handling.models import Questions
+from apps.question_handling.questionnaire_cache import QuestionnaireSnapshot, questionnaire_cache
 from apps.user_management.models import Users
 from apps.response_management.services.response_validation import ResponseValidator
+from .prompt_registry import prompt_registry
+from .prompt_validation_service import PromptValidationService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,10 +40,12 @@ class AIDataPreparationService:
 
             # Construction du prompt validé
             prompt = await self._build_validated_prompt(structured_data, context_analysis)
+            template = await prompt_registry.aget()
 
             return {
                 "data": structured_data,
                 "prompt": prompt,
+                "prompt_version": template.fingerprint if template else None,
                 "context_analysis": context_analysis
             }
 
@@ -52,11 +57,12 @@ class AIDataPreparationService:
         """
         Prépare les données structurées nécessaires pour l'IA.
         """
-        questions = await self._get_all_questions()
+        questionnaire = await questionnaire_cache.aget()
+        questions = list(questionnaire.questions)
 
         structured_data = {
             "user_info": await self._prepare_user_info(user),
-            "questionnaire_context": self._prepare_questionnaire_context(questions),
+            "questionnaire_context": self._prepare_questionnaire_context(questionnaire),
             "user_responses": [],
             "unanswered_questions": [],
             "metadata": {
@@ -74,9 +80,9 @@ class AIDataPreparationService:
 
     async def _get_all_questions(self) -> List[Questions]:
         """
-        Récupère toutes les questions actives de manière asynchrone.
+        Récupère toutes les questions actives (cache du questionnaire).
         """
-        return await Questions.objects.filter(is_active=True).order_by('order_num').async_all()
+        return list((await questionnaire_cache.aget()).questions)
 
     async def _prepare_user_info(self, user: Users) -> Dict[str, Any]:
         """
@@ -87,7 +93,7 @@ class AIDataPreparationService:
         return {
             "username": user.username,
             "role": user.role,
-            "created_at": user.created_at.isoformat(),
+            "created_at": user.created_at.isoformat() if user.created_at else None,
             "profile": {
                 "roadmaps_generated": roadmaps_count,
                 "last_activity": user.last_login.isoformat() if user.last_login else None,
@@ -100,7 +106,7 @@ class AIDataPreparationService:
         Prépare le contexte utilisateur avancé.
         """
         return {
-            "experience_duration": self._calculate_experience_duration(user.created_at),
+            "experience_duration": self._calculate_experience_duration(user.created_at or user.date_joined),
             "activity_level": await self._calculate_activity_level(user)
         }
 
@@ -124,29 +130,50 @@ class AIDataPreparationService:
         else:
             return "Inactif"
 
-    def _prepare_questionnaire_context(self, questions: List[Questions]) -> Dict[str, Any]:
+    def _prepare_questionnaire_context(self, questionnaire: QuestionnaireSnapshot) -> Dict[str, Any]:
         """
         Prépare le contexte des questions.
         """
         return {
-            "total_questions": len(questions),
-            "categories": list({q.category for q in questions if q.category})
+            "total_questions": len(questionnaire.questions),
+            "categories": list(questionnaire.categories)
         }
 
     async def _process_questions_and_responses(self, questions: List[Questions], temp_responses: Dict[str, Any], structured_data: Dict[str, Any]) -> None:
         """
         Traite les questions et les réponses utilisateur.
         """
+        answers = {}
         for question in questions:
             response = temp_responses.get(str(question.id))
+            # Les réponses de session sont stockées sous la forme {"answer": ..., "user_id": ...}
+            if isinstance(response, dict) and "answer" in response:
+                response = response["answer"]
+            answers[question.id] = response
+
+        # Un seul encodage pour toutes les réponses texte ; la validation lit ensuite le cache
+        text_answers = [
+            answers[question.id] for question in questions
+            if question.type == 'TEXT' and answers[question.id] and isinstance(answers[question.id], str)
+        ]
+        if text_answers:
+            self.validator.estimate_tokens_batch(text_answers)
+
+        for question in questions:
+            response = answers[question.id]
             if response:
                 self.validator.validate_response(question.type, response, question.configuration)
                 structured_data["user_responses"].append({
                     "question_id": str(question.id),
+                    "type": question.type,
+                    "category": question.category,
                     "answer": response
                 })
             else:
-                structured_data["unanswered_questions"].append({"question_id": str(question.id)})
+                structured_data["unanswered_questions"].append({
+                    "question_id": str(question.id),
+                    "category": question.category
+                })
 
     def _finalize_preparation(self, structured_data: Dict[str, Any]) -> None:
         """
@@ -156,9 +183,33 @@ class AIDataPreparationService:
 
     async def _build_validated_prompt(self, structured_data: Dict[str, Any], context_analysis: Dict[str, Any]) -> str:
         """
-        Construit et valide le prompt final.
-        """
-        return f"Prompt basé sur {structured_data['user_info']['username']}."
+        Construit et valide le prompt final à partir du template actif (registre en mémoire).
+
+        generation_date est rendue vide : le prompt d'un même profil reste
+        identique d'un jour à l'autre (clé du cache des complétions).
+        """
+        template = await prompt_registry.aget()
+        if template is None:
+            return f"Prompt basé sur {structured_data['user_info']['username']}."
+
+        questionnaire = await questionnaire_cache.aget()
+        texts = {str(question.id): question.text for question in questionnaire.questions}
+        return PromptValidationService.render_compiled(template.compiled, {
+            "user": {
+                "username": structured_data["user_info"]["username"],
+                "role": structured_data["user_info"]["role"]
+            },
+            "questions": [
+                {"text": texts.get(response["question_id"], ""), "type": response["type"]}
+                for response in structured_data["user_responses"]
+            ],
+            "responses": [
+                {"content": response["answer"], "is_valid": True}
+                for response in structured_data["user_responses"]
+            ],
+            "context": context_analysis,
+            "generation_date": ""
+        })
 
     def _analyze_context(self, structured_data: Dict[str, Any]) -> Dict[str, Any]:
         """
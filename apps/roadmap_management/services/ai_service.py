@@ -1,12 +1,23 @@
 # backend/apps/roadmap_management/services/ai_service.py
 
-from openai import OpenAI, OpenAIError, AzureOpenAI
-from typing import Dict, Any, Optional, TYPE_CHECKING, List
+from openai import OpenAIError
+from typing import Dict, Any, Optional, TYPE_CHECKING, List, AsyncIterator
 import logging
 from django.conf import settings
+from asgiref.sync import sync_to_async
+import asyncio
+import json
 import time
 from datetime import datetime
 from .ai_preparation_service import AIDataPreparationService
+from .openai_client import AsyncClient, get_async_client
+from .openai_stub import record_completion
+from .completion_cache import CompletionCache
+from .resilience import CircuitOpenError, call_with_retries, get_circuit_breaker
+from .rate_limiter import OpenAIRateLimiter, RateLimitWaitTimeout
+from .prompt_budget import PromptBudgetExceeded, PromptBudgeter, TokenPlan
+from .model_router import ModelRouter, RoutingDecision
+from .ai_health import AIHealthProbe, call_stats, health_report
 from django.utils import timezone
 from django.core.exceptions import ValidationError 
 if TYPE_CHECKING:
@@ -22,49 +33,43 @@ class OpenAIClientError(Exception):
 
 class OpenAIRequestError(Exception):
     """Erreur lors de l'envoi d'une requête à l'API"""
-    pass
+
+    def __init__(self, message: str = "", retries: int = 0):
+        super().__init__(message)
+        self.retries = retries
+
+class OpenAICircuitOpenError(OpenAIRequestError):
+    """Requête refusée sans appel : le circuit du modèle est ouvert"""
+
+    def __init__(self, message: str = "", model: Optional[str] = None):
+        super().__init__(message)
+        self.model = model
 
 class AIService:
     """Service pour gérer les interactions avec l'API OpenAI."""
 
     def __init__(self, settings_service: Optional['AISettingsService'] = None):
-        """Initialise le service avec le bon client selon la configuration."""
+        """Initialise le service ; le client HTTP est partagé par le processus."""
         self.settings_service = settings_service
-        
+        self._completion_cache: Optional[CompletionCache] = None
+        self._rate_limiter: Optional[OpenAIRateLimiter] = None
+
+    @property
+    def client(self) -> AsyncClient:
+        """Client OpenAI asynchrone partagé (pool de connexions keep-alive)."""
         try:
-            if getattr(settings, 'OPENAI_API_TYPE', 'openai') == 'azure':
-                self.client = self._init_azure_client()
-            else:
-                self.client = self._init_openai_client()
+            return get_async_client()
         except Exception as e:
             logger.error(f"Erreur d'initialisation du client OpenAI: {str(e)}")
             raise OpenAIClientError(f"Impossible d'initialiser le client OpenAI: {str(e)}")
-        
-    def _init_openai_client(self) -> OpenAI:
-        """Initialise un client OpenAI standard."""
-        if not settings.OPENAI_API_KEY:
-            raise OpenAIClientError("Clé API OpenAI manquante")
-        return OpenAI(api_key=settings.OPENAI_API_KEY)
-    
-    def _init_azure_client(self) -> AzureOpenAI:
-        """Initialise un client Azure OpenAI."""
-        if not all([
-            settings.OPENAI_API_KEY,
-            settings.AZURE_OPENAI_ENDPOINT,
-            settings.AZURE_OPENAI_API_VERSION
-        ]):
-            raise OpenAIClientError("Configuration Azure OpenAI incomplète")
-            
-        return AzureOpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-            api_version=settings.AZURE_OPENAI_API_VERSION
-        )
 
     async def generate_completion(
         self,
         messages: list[dict[str, str]],
-        config: Dict[str, Any]
+        config: Dict[str, Any],
+        use_cache: bool = True,
+        cache_key: Optional[str] = None,
+        deadline: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Envoie une requête de complétion à l'API OpenAI.
@@ -72,26 +77,87 @@ class AIService:
         Args:
             messages: Liste de messages au format OpenAI
             config: Configuration de la requête (modèle, température, etc.)
+            use_cache: False pour forcer une nouvelle variante sans lire le cache
+            cache_key: Clé du cache de complétions, si elle ne doit pas porter
+                sur les messages tels quels (champs volatils exclus)
+            deadline: Délai de chaque tentative d'appel, hors attente du
+                limiteur de débit et pauses entre relances
             
         Returns:
             Dictionnaire contenant la réponse et les métadonnées
             
         Raises:
             OpenAIRequestError: En cas d'erreur lors de la requête
+            asyncio.TimeoutError: Si une tentative dépasse `deadline`
         """
+        cache = self.completion_cache if settings.AI_COMPLETION_CACHE_ENABLED else None
+        if cache and cache_key is None:
+            cache_key = CompletionCache.make_key(messages, config)
+
+        if cache and use_cache:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                return {**cached, 'cached': True}
+
+        result = await self._request_completion(messages, config, deadline)
+
+        if settings.OPENAI_STUB_RECORD_FILE:
+            # Le mode replay retrouve les complétions par les messages effectivement envoyés
+            await sync_to_async(record_completion)(
+                settings.OPENAI_STUB_RECORD_FILE,
+                CompletionCache.make_key(messages, config),
+                result
+            )
+
+        if cache:
+            # Même en mode bypass, la nouvelle variante remplace l'ancienne
+            await cache.set(cache_key, result)
+        return {**result, 'cached': False}
+
+    @property
+    def completion_cache(self) -> CompletionCache:
+        if self._completion_cache is None:
+            self._completion_cache = CompletionCache()
+        return self._completion_cache
+
+    @property
+    def rate_limiter(self) -> OpenAIRateLimiter:
+        if self._rate_limiter is None:
+            self._rate_limiter = OpenAIRateLimiter()
+        return self._rate_limiter
+
+    async def _acquire_capacity(self, messages: list[dict[str, str]], config: Dict[str, Any]) -> float:
+        """Attend la capacité RPM/TPM du modèle avant d'appeler l'API."""
+        tokens = OpenAIRateLimiter.estimate_request_tokens(messages, config['max_tokens'], config['model'])
+        return await self.rate_limiter.acquire(config['model'], tokens)
+
+    async def _request_completion(
+        self,
+        messages: list[dict[str, str]],
+        config: Dict[str, Any],
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Appelle l'API de complétion avec relances et disjoncteur (sans cache)."""
+        breaker = get_circuit_breaker(config['model'])
         try:
+            rate_limit_wait = await self._acquire_capacity(messages, config)
             start_time = time.time()
             
-            response = await self.client.chat.completions.create(
-                model=config['model'],
-                messages=messages,
-                temperature=config['temperature'],
-                max_tokens=config['max_tokens'],
-                presence_penalty=config.get('presence_penalty', 0),
-                frequency_penalty=config.get('frequency_penalty', 0)
+            response, retries = await call_with_retries(
+                lambda: self.client.chat.completions.create(
+                    model=config['model'],
+                    messages=messages,
+                    temperature=config['temperature'],
+                    max_tokens=config['max_tokens'],
+                    presence_penalty=config.get('presence_penalty', 0),
+                    frequency_penalty=config.get('frequency_penalty', 0)
+                ),
+                breaker,
+                timeout=deadline
             )
             
             generation_time = time.time() - start_time
+            await call_stats.arecord(generation_time, success=True)
             
             return {
                 'content': response.choices[0].message.content,
@@ -101,42 +167,133 @@ class AIService:
                 'model': config['model'],
                 'generation_time': generation_time,
                 'finish_reason': response.choices[0].finish_reason,
+                'retries': retries,
+                'rate_limit_wait': rate_limit_wait,
                 'timestamp': datetime.now().isoformat()
             }
             
+        except RateLimitWaitTimeout as e:
+            logger.warning(str(e))
+            raise OpenAIRequestError(str(e))
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+            raise OpenAICircuitOpenError(str(e), model=config['model'])
+        except asyncio.TimeoutError:
+            logger.warning(f"Délai de {deadline}s dépassé pour {config['model']}")
+            raise
         except OpenAIError as e:
+            await call_stats.arecord(time.time() - start_time, success=False)
             logger.error(f"Erreur API OpenAI: {str(e)}")
-            raise OpenAIRequestError(f"Erreur lors de la requête OpenAI: {str(e)}")
+            raise OpenAIRequestError(
+                f"Erreur lors de la requête OpenAI: {str(e)}",
+                retries=getattr(e, 'retries', 0)
+            )
         except Exception as e:
             logger.error(f"Erreur inattendue: {str(e)}")
             raise OpenAIRequestError(f"Erreur inattendue lors de la requête: {str(e)}")
 
-    async def health_check(self) -> Dict[str, Any]:
+    async def stream_completion(
+        self,
+        messages: list[dict[str, str]],
+        config: Dict[str, Any],
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
-        Vérifie l'état de la connexion à l'API.
+        Envoie une requête de complétion en mode streaming.
         
-        Returns:
-            Dict contenant le statut de la connexion
+        Args:
+            messages: Liste de messages au format OpenAI
+            config: Configuration de la requête (modèle, température, etc.)
+            deadline: Délai de chaque tentative d'ouverture du flux, hors
+                attente du limiteur de débit
+            
+        Yields:
+            Un événement {'type': 'token', 'content': ...} par fragment reçu,
+            puis un événement {'type': 'done', 'metadata': ...} final
             
         Raises:
-            OpenAIRequestError: En cas d'échec du test
+            OpenAIRequestError: En cas d'erreur lors de la requête
         """
         try:
-            await self.generate_completion(
-                messages=[{"role": "user", "content": "Test"}],
-                config={
-                    'model': 'gpt-3.5-turbo',
-                    'temperature': 0.7,
-                    'max_tokens': 5
-                }
+            rate_limit_wait = await self._acquire_capacity(messages, config)
+            start_time = time.time()
+            chunk_count = 0
+            finish_reason = None
+            
+            # Les relances ne portent que sur l'ouverture du flux
+            stream, retries = await call_with_retries(
+                lambda: self.client.chat.completions.create(
+                    model=config['model'],
+                    messages=messages,
+                    temperature=config['temperature'],
+                    max_tokens=config['max_tokens'],
+                    presence_penalty=config.get('presence_penalty', 0),
+                    frequency_penalty=config.get('frequency_penalty', 0),
+                    stream=True
+                ),
+                get_circuit_breaker(config['model']),
+                timeout=deadline
             )
             
-            return {
-                'status': 'healthy',
-                'api_connected': True,
-                'timestamp': datetime.now().isoformat()
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                if choice.delta and choice.delta.content:
+                    chunk_count += 1
+                    yield {'type': 'token', 'content': choice.delta.content}
+            
+            await call_stats.arecord(time.time() - start_time, success=True)
+            
+            # L'API ne renvoie pas l'usage en streaming : un fragment ~ un token
+            yield {
+                'type': 'done',
+                'metadata': {
+                    'model': config['model'],
+                    'completion_tokens': chunk_count,
+                    'generation_time': time.time() - start_time,
+                    'finish_reason': finish_reason,
+                    'retries': retries,
+                    'rate_limit_wait': rate_limit_wait,
+                    'timestamp': datetime.now().isoformat()
+                }
             }
             
+        except RateLimitWaitTimeout as e:
+            logger.warning(str(e))
+            raise OpenAIRequestError(str(e))
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+            raise OpenAICircuitOpenError(str(e), model=config['model'])
+        except asyncio.TimeoutError:
+            logger.warning(f"Délai de {deadline}s dépassé à l'ouverture du flux {config['model']}")
+            raise
+        except OpenAIError as e:
+            await call_stats.arecord(time.time() - start_time, success=False)
+            logger.error(f"Erreur API OpenAI (streaming): {str(e)}")
+            raise OpenAIRequestError(f"Erreur lors de la requête OpenAI: {str(e)}")
+        except Exception as e:
+            logger.error(f"Erreur inattendue (streaming): {str(e)}")
+            raise OpenAIRequestError(f"Erreur inattendue lors de la requête: {str(e)}")
+
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Vérifie l'état de la connexion à l'API sans consommer de tokens.
+        
+        La sonde amont (GET /models) est mise en cache et rafraîchie en
+        arrière-plan ; le rapport inclut le taux de succès et la latence p95
+        des appels récents du processus ainsi que l'état des disjoncteurs.
+        
+        Returns:
+            Dict contenant le statut (healthy, degraded ou unhealthy)
+        """
+        try:
+            return health_report(
+                await AIHealthProbe().status(),
+                await call_stats.asnapshot(settings.AI_HEALTH_STATS_WINDOW)
+            )
         except Exception as e:
             logger.error(f"Échec du health check: {str(e)}")
             return {
@@ -145,6 +302,7 @@ class AIService:
                 'error': str(e),
                 'timestamp': datetime.now().isoformat()
             }
+
 class RoadmapAIService:
     """Service pour la génération de roadmaps utilisant l'IA."""
 
@@ -154,14 +312,19 @@ class RoadmapAIService:
         settings_service: Optional['AISettingsService'] = None,
         data_service: Optional[AIDataPreparationService] = None
     ):
+        if settings_service is None:
+            from .ai_settings import AISettingsService
+            settings_service = AISettingsService()
         self.ai_service = ai_service or AIService(settings_service)
         self.settings_service = settings_service
         self.data_service = data_service or AIDataPreparationService()
+        self.router = ModelRouter()
 
     async def generate_roadmap(
         self,
         prompt: str,
         structured_data: Dict[str, Any],
+        reference: Optional[str] = None,
         **config_kwargs: Any
     ) -> Dict[str, Any]:
         """
@@ -170,41 +333,190 @@ class RoadmapAIService:
         Args:
             prompt: Prompt préparé
             structured_data: Données structurées
+            reference: Roadmap d'un profil similaire, à adapter plutôt qu'à
+                réécrire ; la génération passe alors par le modèle économique
+                sauf si un modèle est demandé explicitement
             **config_kwargs: Configuration optionnelle pour l'IA
+                (use_cache=False pour ignorer le cache de complétions)
             
         Returns:
             Dict contenant le contenu généré et les métadonnées
         """
         try:
+            use_cache = config_kwargs.pop('use_cache', True)
+            if reference:
+                config_kwargs.setdefault('model', settings.AI_ROUTING_SIMPLE_MODEL)
+
             # Préparation de la configuration
             config = await self._prepare_generation_config(
                 structured_data,
                 config_kwargs
             )
+            decision = await self._route(
+                structured_data,
+                config,
+                config_kwargs.get('model'),
+                settings.AI_ROUTING_DEADLINE
+            )
+            base_config = dict(config)
             
-            # Création des messages pour l'API
-            messages = self._create_messages(prompt)
+            # Création des messages pour l'API, ajustés à la fenêtre de contexte
+            messages, token_plan = self._fit_messages(prompt, structured_data, config, reference)
             
-            # Génération via l'API
-            start_time = time.time()
-            response = await self.ai_service.generate_completion(
-                messages=messages,
-                config=config
-            )
+            # Génération via l'API, avec bascule si le modèle principal est indisponible
+            # Le délai porte sur chaque tentative, pas sur l'attente du limiteur de débit
+            try:
+                response = await self.ai_service.generate_completion(
+                    messages=messages,
+                    config=config,
+                    use_cache=use_cache,
+                    cache_key=self._completion_key(prompt, structured_data, reference, base_config),
+                    deadline=decision.deadline or None
+                )
+            except (asyncio.TimeoutError, OpenAICircuitOpenError) as e:
+                if not decision.fallback_model:
+                    raise
+                config = {**base_config, 'model': decision.use_fallback(self._fallback_reason(e))}
+                cache_key = self._completion_key(prompt, structured_data, reference, config)
+                messages, token_plan = self._fit_messages(prompt, structured_data, config, reference)
+                response = await self.ai_service.generate_completion(
+                    messages=messages,
+                    config=config,
+                    use_cache=use_cache,
+                    cache_key=cache_key
+                )
             
             return {
                 "content": response["content"],
                 "metadata": {
                     "model": response["model"],
+                    "temperature": config["temperature"],
+                    "max_tokens": config["max_tokens"],
                     "token_count": response["token_count"],
+                    "prompt_tokens": response.get("prompt_tokens"),
+                    "completion_tokens": response.get("completion_tokens"),
                     "generation_time": response["generation_time"],
-                    "finish_reason": response["finish_reason"]
+                    "finish_reason": response["finish_reason"],
+                    "cached": response.get("cached", False),
+                    "retries": response.get("retries", 0),
+                    "token_plan": token_plan.to_dict(),
+                    "routing": decision.to_dict(),
+                    "adapted_from_reference": bool(reference) and 'reference' not in token_plan.trimmed
                 }
             }
 
         except Exception as e:
             logger.error(f"Erreur génération roadmap: {str(e)}")
-            raise ValidationError(f"Erreur génération roadmap: {str(e)}")
+            raise ValidationError(f"Erreur génération roadmap: {str(e)}") from e
+
+    async def stream_roadmap(
+        self,
+        prompt: str,
+        structured_data: Dict[str, Any],
+        **config_kwargs: Any
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Génère une roadmap en streaming.
+        
+        Args:
+            prompt: Prompt préparé
+            structured_data: Données structurées
+            **config_kwargs: Configuration optionnelle pour l'IA
+            
+        Yields:
+            Les événements de AIService.stream_completion
+        """
+        # Le streaming ne passe pas par le cache de complétions
+        config_kwargs.pop('use_cache', None)
+        config = await self._prepare_generation_config(
+            structured_data,
+            config_kwargs
+        )
+        # En streaming, le délai porte sur l'ouverture du flux : on ne bascule
+        # plus une fois que des tokens ont été envoyés au client
+        decision = await self._route(
+            structured_data,
+            config,
+            config_kwargs.get('model'),
+            settings.AI_ROUTING_FIRST_TOKEN_DEADLINE
+        )
+        base_config = dict(config)
+        messages, token_plan = self._fit_messages(prompt, structured_data, config)
+        
+        events = self.ai_service.stream_completion(
+            messages=messages,
+            config=config,
+            deadline=decision.deadline or None
+        )
+        try:
+            first_event = await events.__anext__()
+        except (asyncio.TimeoutError, OpenAICircuitOpenError) as e:
+            if not decision.fallback_model:
+                raise
+            await events.aclose()
+            config = {**base_config, 'model': decision.use_fallback(self._fallback_reason(e))}
+            messages, token_plan = self._fit_messages(prompt, structured_data, config)
+            events = self.ai_service.stream_completion(messages=messages, config=config)
+            first_event = await events.__anext__()
+        
+        yield self._annotate_event(first_event, token_plan, decision)
+        async for event in events:
+            yield self._annotate_event(event, token_plan, decision)
+
+    @staticmethod
+    def _annotate_event(event: Dict[str, Any], token_plan: TokenPlan, decision: RoutingDecision) -> Dict[str, Any]:
+        if event['type'] == 'done':
+            # Usage non fourni en streaming : le prompt est compté avant l'envoi
+            event['metadata']['prompt_tokens'] = token_plan.prompt_tokens
+            event['metadata']['token_count'] = token_plan.prompt_tokens + event['metadata']['completion_tokens']
+            event['metadata']['token_plan'] = token_plan.to_dict()
+            event['metadata']['routing'] = decision.to_dict()
+        return event
+
+    async def prepare_request(
+        self,
+        prompt: str,
+        structured_data: Dict[str, Any],
+        **config_kwargs: Any
+    ) -> Dict[str, Any]:
+        """
+        Prépare une requête sans l'envoyer (API Batch).
+        
+        Returns:
+            Dict contenant les messages, la configuration finale et les
+            métadonnées de préparation (plan de tokens, routage)
+        """
+        config_kwargs.pop('use_cache', None)
+        config = await self._prepare_generation_config(structured_data, config_kwargs)
+        # Pas de délai ni de bascule : la requête est traitée de façon différée
+        decision = await self._route(structured_data, config, config_kwargs.get('model'), None)
+        decision.fallback_model = None
+        messages, token_plan = self._fit_messages(prompt, structured_data, config)
+        return {
+            "messages": messages,
+            "config": config,
+            "metadata": {
+                "token_plan": token_plan.to_dict(),
+                "routing": decision.to_dict()
+            }
+        }
+
+    async def _route(
+        self,
+        structured_data: Dict[str, Any],
+        config: Dict[str, Any],
+        requested_model: Optional[str],
+        deadline: Optional[float]
+    ) -> RoutingDecision:
+        """Choisit le modèle selon l'analyse du contexte et l'applique à `config`."""
+        context_analysis = await self.analyze_context(structured_data)
+        decision = self.router.route(context_analysis, config['model'], requested_model, deadline)
+        config['model'] = decision.model
+        return decision
+
+    @staticmethod
+    def _fallback_reason(error: Exception) -> str:
+        return 'circuit_open' if isinstance(error, OpenAICircuitOpenError) else 'deadline'
 
     async def _prepare_generation_config(
         self,
@@ -222,7 +534,7 @@ class RoadmapAIService:
             Configuration finale
         """
         # Configuration de base
-        base_config = self.settings_service.get_default_configuration()
+        base_config = await sync_to_async(self.settings_service.get_default_configuration)()
         
         # Ajustements basés sur l'analyse technique
         technical_score = structured_data.get("technical_score", 0.5)
@@ -234,17 +546,90 @@ class RoadmapAIService:
         # Validation
         return self.settings_service.validate_configuration(final_config)
 
-    def _create_messages(self, prompt: str) -> List[Dict[str, str]]:
+    def _completion_key(
+        self,
+        prompt: str,
+        structured_data: Dict[str, Any],
+        reference: Optional[str],
+        config: Dict[str, Any]
+    ) -> str:
+        """
+        Clé du cache de complétions d'une génération.
+
+        Calculée sur les messages complets (avant condensation, déterministe
+        pour un modèle donné), sans les champs volatils des données : la même
+        demande retrouve sa complétion malgré une nouvelle connexion.
+        """
+        return CompletionCache.make_key(
+            self._create_messages(
+                prompt,
+                CompletionCache.stable_data(structured_data),
+                reference
+            ),
+            config
+        )
+
+    def _fit_messages(
+        self,
+        prompt: str,
+        structured_data: Dict[str, Any],
+        config: Dict[str, Any],
+        reference: Optional[str] = None
+    ) -> tuple[List[Dict[str, str]], TokenPlan]:
+        """
+        Construit les messages dans le budget de tokens du modèle.
+        
+        Les données structurées sont condensées si nécessaire et max_tokens
+        est ajusté dans `config` lorsque le plan réduit la réservation. La
+        roadmap de référence est abandonnée en premier : elle n'est jointe
+        que si les messages tiennent sans rien condenser.
+        
+        Raises:
+            PromptBudgetExceeded: Si le prompt ne tient pas dans la fenêtre
+        """
+        budgeter = PromptBudgeter(
+            config['model'],
+            config['max_tokens'],
+            config.pop('context_window', None)
+        )
+        if reference:
+            try:
+                messages, token_plan = budgeter.fit(
+                    structured_data,
+                    lambda data: self._create_messages(prompt, data, reference)
+                )
+                if not token_plan.trimmed:
+                    return messages, token_plan
+            except PromptBudgetExceeded:
+                pass
+
+        messages, token_plan = budgeter.fit(
+            structured_data,
+            lambda data: self._create_messages(prompt, data)
+        )
+        if reference:
+            token_plan.trimmed.insert(0, 'reference')
+        config['max_tokens'] = token_plan.max_tokens
+        return messages, token_plan
+
+    def _create_messages(
+        self,
+        prompt: str,
+        structured_data: Optional[Dict[str, Any]] = None,
+        reference: Optional[str] = None
+    ) -> List[Dict[str, str]]:
         """
         Crée la liste des messages pour l'API.
         
         Args:
             prompt: Prompt principal
+            structured_data: Données du questionnaire jointes au prompt
+            reference: Roadmap d'un profil similaire servant de point de départ
             
         Returns:
             Liste de messages formatés pour l'API
         """
-        return [
+        messages = [
             {
                 "role": "system",
                 "content": "Tu es un expert en création de roadmaps personnalisées..."
@@ -254,6 +639,25 @@ class RoadmapAIService:
                 "content": prompt
             }
         ]
+        if structured_data:
+            messages.append({
+                "role": "user",
+                "content": "Données du questionnaire :\n" + json.dumps(
+                    structured_data,
+                    ensure_ascii=False,
+                    default=lambda value: sorted(value) if isinstance(value, set) else str(value)
+                )
+            })
+        if reference:
+            messages.append({
+                "role": "user",
+                "content": (
+                    "Roadmap rédigée pour un profil très proche. Adapte-la aux réponses "
+                    "ci-dessus sans repartir de zéro : conserve ce qui s'applique, corrige "
+                    "ce qui diffère.\n\n" + reference
+                )
+            })
+        return messages
 
     async def analyze_context(
         self,
@@ -302,9 +706,10 @@ class RoadmapAIService:
         self,
         roadmap: 'Roadmaps',
         prompt: str,
-        response: Dict[str, Any],
+        response: Optional[Dict[str, Any]],
         config: Dict[str, Any],
-        start_time: float
+        start_time: float,
+        error: Optional[str] = None
     ) -> None:
         """
         Enregistre les détails de la génération.
@@ -312,16 +717,20 @@ class RoadmapAIService:
         Args:
             roadmap: Instance de la roadmap
             prompt: Prompt utilisé
-            response: Réponse de l'API
+            response: Métadonnées de la génération (None en cas d'échec)
             config: Configuration utilisée
             start_time: Timestamp de début
+            error: Message d'erreur si la génération a échoué
         """
         if self.settings_service:
+            response = response or {}
             await self.settings_service.log_generation(
                 roadmap=roadmap,
                 configuration=config,
                 prompt=prompt,
-                token_count=response["token_count"],
+                token_count=response.get("token_count") or 0,
                 start_time=start_time,
-                success=True
-            )
\ No newline at end of file
+                success=error is None,
+                error=error,
+                metadata=response
+            )
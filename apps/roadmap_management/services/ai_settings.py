@@ -24,15 +24,27 @@ class AIModelConfig:
     max_tokens: int
     min_temperature: Decimal
     max_temperature: Decimal
+    requests_per_minute: int = 0  # Limite RPM du compte (0 = illimité)
+    tokens_per_minute: int = 0  # Limite TPM du compte (0 = illimité)
+    cost_per_1k_tokens: float = 0.0  # Coût en dollars (tokens de sortie)
+
+    def rate_limits(self, model: str) -> Dict[str, int]:
+        """Limites RPM/TPM, surchargeables via settings.OPENAI_RATE_LIMITS[model]"""
+        override = getattr(settings, 'OPENAI_RATE_LIMITS', {}).get(model, {})
+        return {
+            'rpm': int(override.get('rpm', self.requests_per_minute)),
+            'tpm': int(override.get('tpm', self.tokens_per_minute))
+        }
 
 class AIConfigurationTemplate(models.Model):
     """Templates de configuration IA réutilisables"""
     
     # Constantes de classe
     SUPPORTED_MODELS = {
-        "gpt-4": AIModelConfig("GPT-4", 8192, Decimal("0.0"), Decimal("1.0")),
-        "gpt-4-turbo": AIModelConfig("GPT-4 Turbo", 32768, Decimal("0.0"), Decimal("1.0")),
-        "gpt-3.5-turbo": AIModelConfig("GPT-3.5 Turbo", 4096, Decimal("0.0"), Decimal("1.0"))
+        # Limites RPM/TPM du compte : illimitées sauf configuration (settings.OPENAI_RATE_LIMITS)
+        "gpt-4": AIModelConfig("GPT-4", 8192, Decimal("0.0"), Decimal("1.0"), cost_per_1k_tokens=0.06),
+        "gpt-4-turbo": AIModelConfig("GPT-4 Turbo", 32768, Decimal("0.0"), Decimal("1.0"), cost_per_1k_tokens=0.03),
+        "gpt-3.5-turbo": AIModelConfig("GPT-3.5 Turbo", 4096, Decimal("0.0"), Decimal("1.0"), cost_per_1k_tokens=0.002)
     }
     
     id = models.CharField(primary_key=True, max_length=36, default=uuid.uuid4, editable=False)
@@ -102,8 +114,14 @@ class GenerationHistory(models.Model):
     )
     configuration_used = models.JSONField()
     prompt_used = models.TextField()
+    model = models.CharField(max_length=50, blank=True, default='')
     token_count = models.IntegerField()
+    prompt_tokens = models.IntegerField(blank=True, null=True)
+    completion_tokens = models.IntegerField(blank=True, null=True)
     generation_time = models.FloatField(help_text="Temps de génération en secondes")
+    retries = models.IntegerField(default=0)
+    finish_reason = models.CharField(max_length=20, blank=True, null=True)
+    cached = models.BooleanField(default=False)
     success = models.BooleanField(default=True)
     error_message = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -111,6 +129,10 @@ class GenerationHistory(models.Model):
     class Meta:
         db_table = 'generation_history'
         ordering = ['-created_at']
+        indexes = [
+            # Agrégats de latence par modèle sur une fenêtre de temps
+            models.Index(fields=['created_at', 'model'], name='generation_history_window_idx')
+        ]
 
 class AISettingsService:
     """Service de gestion des paramètres IA"""
@@ -168,30 +190,72 @@ class AISettingsService:
             else:
                 raise ValidationError("max_tokens doit être entre 1000 et 32000")
 
+        if config.get('context_window'):
+            window = int(config['context_window'])
+            if window < 1000:
+                raise ValidationError("context_window doit être d'au moins 1000 tokens")
+            validated['context_window'] = window
+
         return validated
 
     @staticmethod
+    def history_fields(
+        configuration: Dict[str, Any],
+        prompt: str,
+        metadata: Optional[Dict[str, Any]],
+        generation_time: float,
+        success: bool = True,
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Champs d'une ligne GenerationHistory à partir des métadonnées de génération.
+
+        Args:
+            configuration: Configuration IA utilisée
+            prompt: Prompt utilisé
+            metadata: Métadonnées renvoyées par la génération (vides en cas d'échec)
+            generation_time: Durée mesurée, si les métadonnées n'en donnent pas
+            success: Succès de la génération
+            error: Message d'erreur éventuel
+        """
+        metadata = metadata or {}
+        return {
+            'configuration_used': configuration,
+            'prompt_used': prompt,
+            'model': metadata.get('model') or configuration.get('model') or '',
+            'token_count': metadata.get('token_count') or 0,
+            'prompt_tokens': metadata.get('prompt_tokens'),
+            'completion_tokens': metadata.get('completion_tokens'),
+            'generation_time': metadata.get('generation_time') or generation_time,
+            'retries': metadata.get('retries') or 0,
+            'finish_reason': metadata.get('finish_reason'),
+            'cached': bool(metadata.get('cached')),
+            'success': success,
+            'error_message': error
+        }
+
+    @classmethod
     async def log_generation(
+        cls,
         roadmap: 'Roadmaps',
         configuration: Dict[str, Any],
         prompt: str,
         token_count: int,
         start_time: float,
         success: bool = True,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
     ) -> None:
         """Enregistre les détails d'une génération"""
         try:
-            generation_time = time.time() - start_time
-            
-            await GenerationHistory.objects.acreate(
-                roadmap=roadmap,
-                configuration_used=configuration,
-                prompt_used=prompt,
-                token_count=token_count,
-                generation_time=generation_time,
-                success=success,
-                error_message=error
+            fields = cls.history_fields(
+                configuration,
+                prompt,
+                {'token_count': token_count, **(metadata or {})},
+                time.time() - start_time,
+                success,
+                error
             )
+            await GenerationHistory.objects.acreate(roadmap=roadmap, **fields)
         except Exception as e:
-            logger.error(f"Erreur lors de l'enregistrement de l'historique: {e}")
\ No newline at end of file
+            logger.error(f"Erreur lors de l'enregistrement de l'historique: {e}")
@@ -0,0 +1,383 @@
+# apps/roadmap_management/services/batch_generation.py
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+from abc import ABC, abstractmethod
+from pathlib import Path
+import asyncio
+import json
+import logging
+import shutil
+import uuid
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .ai_preparation_service import AIDataPreparationService
+from .ai_service import RoadmapAIService
+from .ai_settings import AISettingsService
+from .generation_jobs import BATCH_LOCK_PREFIX, GenerationJobService
+if TYPE_CHECKING:
+    from apps.roadmap_management.models import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Limite de l'API Batch par fichier d'entrée
+MAX_REQUESTS_PER_BATCH = 50000
+# Statuts finaux d'un lot sans fichier de résultats à importer
+TERMINAL_FAILURE_STATUSES = ('failed', 'expired', 'cancelled')
+
+
+class BatchBackend(ABC):
+    """Interface commune des backends de traitement par lots"""
+
+    @abstractmethod
+    def submit(self, input_path: Path, metadata: Dict[str, str]) -> str:
+        """Soumet le fichier d'entrée et retourne l'identifiant du lot."""
+
+    @abstractmethod
+    def retrieve(self, batch_id: str) -> Dict[str, Optional[str]]:
+        """Retourne status, output_file_id et error_file_id du lot."""
+
+    @abstractmethod
+    def download(self, file_id: str, destination: Path) -> Path:
+        """Télécharge un fichier de résultats vers `destination`."""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """API Batch d'OpenAI : tarif réduit, résultats sous 24 h"""
+
+    def __init__(self):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    def submit(self, input_path: Path, metadata: Dict[str, str]) -> str:
+        with open(input_path, 'rb') as handle:
+            input_file = self.client.files.create(file=handle, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=settings.AI_BATCH_COMPLETION_WINDOW,
+            metadata=metadata
+        )
+        return batch.id
+
+    def retrieve(self, batch_id: str) -> Dict[str, Optional[str]]:
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            'status': batch.status,
+            'output_file_id': batch.output_file_id,
+            'error_file_id': batch.error_file_id
+        }
+
+    def download(self, file_id: str, destination: Path) -> Path:
+        self.client.files.content(file_id).write_to_file(destination)
+        return destination
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    Substitut hors ligne de l'API Batch.
+
+    Le lot est traité immédiatement par le client simulé (openai_stub) et les
+    résultats sont écrits dans AI_BATCH_DIR au format de sortie de l'API Batch,
+    ce qui permet de tester l'import sans réseau.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory or settings.AI_BATCH_DIR) / "local"
+
+    def submit(self, input_path: Path, metadata: Dict[str, str]) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex}"
+        batch_dir = self.directory / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy(input_path, batch_dir / "input.jsonl")
+
+        with open(input_path, encoding='utf-8') as handle:
+            requests = [json.loads(line) for line in handle if line.strip()]
+        results = asyncio.run(self._process(requests))
+
+        with open(batch_dir / "output.jsonl", 'w', encoding='utf-8') as handle:
+            for result in results:
+                handle.write(json.dumps(result, ensure_ascii=False) + "\n")
+        status = {'status': 'completed', 'output_file_id': f"{batch_id}/output.jsonl", 'error_file_id': None}
+        (batch_dir / "status.json").write_text(json.dumps(status), encoding='utf-8')
+        return batch_id
+
+    async def _process(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        from openai import APIStatusError
+        from .openai_stub import StubAsyncOpenAI, StubProfile
+
+        client = StubAsyncOpenAI(mode='batch', profile=StubProfile(latency_median=0))
+        results = []
+        for index, request in enumerate(requests):
+            result = {'id': f"batch_req_{index}", 'custom_id': request['custom_id'], 'error': None}
+            try:
+                completion = await client.chat.completions.create(**request['body'])
+                result['response'] = {'status_code': 200, 'body': completion.model_dump()}
+            except APIStatusError as e:
+                result['response'] = {
+                    'status_code': e.status_code,
+                    'body': {'error': {'message': str(e)}}
+                }
+            results.append(result)
+        return results
+
+    def retrieve(self, batch_id: str) -> Dict[str, Optional[str]]:
+        status_path = self.directory / batch_id / "status.json"
+        if not status_path.exists():
+            return {'status': 'not_found', 'output_file_id': None, 'error_file_id': None}
+        return json.loads(status_path.read_text(encoding='utf-8'))
+
+    def download(self, file_id: str, destination: Path) -> Path:
+        shutil.copy(self.directory / file_id, destination)
+        return destination
+
+
+def get_batch_backend() -> BatchBackend:
+    """Backend selon AI_BATCH_BACKEND (openai ou local)."""
+    if settings.AI_BATCH_BACKEND == 'local':
+        return LocalBatchBackend()
+    return OpenAIBatchBackend()
+
+
+class BatchGenerationService:
+    """
+    Génération des roadmaps d'une cohorte via l'API Batch.
+
+    Seules les tâches PENDING en mode BATCH sont réclamées (les générations
+    interactives restent au worker) ; leurs requêtes sont préparées
+    comme pour une génération interactive (budget de tokens, routage) puis
+    écrites dans un fichier JSONL au format Batch (custom_id = id de la tâche).
+    L'import des résultats clôt chaque tâche comme le ferait le worker.
+    """
+
+    def __init__(self, backend: Optional[BatchBackend] = None):
+        self.backend = backend or get_batch_backend()
+
+    def collect_jobs(self, limit: int) -> List['GenerationJob']:
+        """
+        Réclame jusqu'à `limit` tâches BATCH en attente pour un lot.
+
+        Le bail des roadmaps couvre la fenêtre de traitement du lot
+        (AI_BATCH_LEASE) : une génération en streaming ne peut pas démarrer
+        puis être écrasée par l'import des résultats.
+        """
+        # Verrou propre à cette réclamation : release_jobs ne libère qu'elle
+        return GenerationJobService.claim_jobs(
+            f"{BATCH_LOCK_PREFIX}pending:{uuid.uuid4().hex}",
+            min(limit, MAX_REQUESTS_PER_BATCH),
+            mode='BATCH',
+            lease=settings.AI_BATCH_LEASE
+        )
+
+    async def build_requests(
+        self,
+        jobs: List['GenerationJob'],
+        ai_service: Optional[RoadmapAIService] = None,
+        preparation_service: Optional[AIDataPreparationService] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Prépare une ligne Batch par tâche ; les tâches en échec repartent en file.
+
+        La requête préparée (prompt, configuration, métadonnées) est conservée
+        dans le payload de la tâche pour l'import des résultats.
+        """
+        from apps.roadmap_management.models import Roadmaps
+        from apps.user_management.models import Users
+
+        ai_service = ai_service or RoadmapAIService()
+        preparation_service = preparation_service or AIDataPreparationService()
+        lines = []
+
+        for job in jobs:
+            roadmap = await Roadmaps.objects.aget(pk=job.roadmap_id)
+            try:
+                user = await Users.objects.aget(pk=job.user_id) if job.user_id else None
+                generation_data = await preparation_service.prepare_complete_generation_data(
+                    job.payload.get('temp_responses', {}),
+                    user
+                )
+                request = await ai_service.prepare_request(
+                    generation_data["prompt"],
+                    generation_data["data"],
+                    **job.payload.get('ai_config', {})
+                )
+            except Exception as e:
+                logger.error(f"Préparation de la tâche {job.id} pour le lot impossible: {str(e)}")
+                await sync_to_async(GenerationJobService.fail_job)(job, roadmap, str(e))
+                continue
+
+            config = request["config"]
+            job.payload = {
+                **job.payload,
+                'batch_request': {
+                    'prompt': generation_data["prompt"],
+                    'config': config,
+                    'metadata': request["metadata"]
+                }
+            }
+            await sync_to_async(job.save)(update_fields=['payload'])
+
+            lines.append({
+                'custom_id': str(job.id),
+                'method': 'POST',
+                'url': BATCH_ENDPOINT,
+                'body': {
+                    'model': config['model'],
+                    'messages': request["messages"],
+                    'temperature': config['temperature'],
+                    'max_tokens': config['max_tokens']
+                }
+            })
+        return lines
+
+    @staticmethod
+    def write_input(lines: List[Dict[str, Any]], path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as handle:
+            for line in lines:
+                handle.write(json.dumps(line, ensure_ascii=False) + "\n")
+        return path
+
+    def submit_jobs(
+        self,
+        jobs: List['GenerationJob'],
+        input_path: Path,
+        ai_service: Optional[RoadmapAIService] = None,
+        preparation_service: Optional[AIDataPreparationService] = None
+    ) -> Tuple[Optional[str], int]:
+        """
+        Prépare, écrit et soumet le lot des tâches réclamées par collect_jobs.
+
+        Si la préparation, l'écriture du fichier ou la soumission lève une
+        exception, les tâches encore réclamées sont remises en file (leur
+        verrou batch: les soustrait à requeue_stale) avant de propager l'erreur.
+
+        Returns:
+            L'identifiant du lot (None si aucune requête n'a pu être préparée)
+            et le nombre de générations soumises
+        """
+        if not jobs:
+            return None, 0
+        locked_by = jobs[0].locked_by
+        try:
+            lines = async_to_sync(self.build_requests)(jobs, ai_service, preparation_service)
+            if not lines:
+                return None, 0
+            self.write_input(lines, input_path)
+            return self.submit(input_path, [line['custom_id'] for line in lines]), len(lines)
+        except Exception as e:
+            logger.error(f"Soumission du lot impossible: {str(e)}")
+            GenerationJobService.release_jobs(locked_by)
+            raise
+
+    def submit(self, input_path: Path, job_ids: List[str]) -> str:
+        """Soumet le fichier et rattache les tâches au lot."""
+        from apps.roadmap_management.models import GenerationJob
+
+        batch_id = self.backend.submit(input_path, {'source': 'roadmap_generation', 'jobs': str(len(job_ids))})
+        GenerationJob.objects.filter(id__in=job_ids).update(
+            locked_by=f"{BATCH_LOCK_PREFIX}{batch_id}",
+            locked_at=timezone.now()
+        )
+        logger.info(f"Lot {batch_id} soumis ({len(job_ids)} génération(s))")
+        return batch_id
+
+    def download_results(self, batch_id: str, directory: Path) -> Tuple[str, List[Path]]:
+        """
+        Télécharge les fichiers de résultats d'un lot terminé.
+
+        Un lot échoué, expiré ou annulé ne produit pas de résultats à importer :
+        ses tâches repartent en mode INTERACTIVE pour que le worker les génère.
+
+        Returns:
+            Le statut du lot et les fichiers téléchargés (vide si non terminé)
+        """
+        batch = self.backend.retrieve(batch_id)
+        if batch['status'] in TERMINAL_FAILURE_STATUSES:
+            requeued = GenerationJobService.release_jobs(f"{BATCH_LOCK_PREFIX}{batch_id}", mode='INTERACTIVE')
+            logger.warning(f"Lot {batch_id} {batch['status']} : {requeued} génération(s) confiée(s) au worker")
+            return batch['status'], []
+        if batch['status'] != 'completed':
+            return batch['status'], []
+
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for kind in ('output_file_id', 'error_file_id'):
+            if batch.get(kind):
+                paths.append(self.backend.download(batch[kind], directory / f"{batch_id}-{kind}.jsonl"))
+        return batch['status'], paths
+
+    def import_results(self, path: Path) -> Dict[str, int]:
+        """
+        Écrit les résultats d'un fichier de sortie Batch dans les roadmaps.
+
+        Returns:
+            Compteurs succeeded / requeued / failed / skipped
+        """
+        counts = {'succeeded': 0, 'requeued': 0, 'failed': 0, 'skipped': 0}
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if line.strip():
+                    counts[self._import_line(json.loads(line))] += 1
+        logger.info(f"Import du lot {path.name}: {counts}")
+        return counts
+
+    def _import_line(self, result: Dict[str, Any]) -> str:
+        from apps.roadmap_management.models import GenerationJob, GenerationHistory, RoadmapSection
+
+        job = GenerationJob.objects.select_related('roadmap').filter(pk=result.get('custom_id')).first()
+        if job is None or job.is_finished:
+            return 'skipped'
+
+        roadmap = job.roadmap
+        request = job.payload.get('batch_request', {})
+        prompt = request.get('prompt', "")
+        elapsed = (timezone.now() - job.started_at).total_seconds() if job.started_at else 0.0
+        batch_id = (job.locked_by or "").removeprefix(BATCH_LOCK_PREFIX)
+        response = result.get('response') or {}
+
+        if response.get('status_code') == 200:
+            body = response['body']
+            choice = body['choices'][0]
+            usage = body.get('usage') or {}
+            metadata = {
+                **request.get('metadata', {}),
+                'model': body.get('model', request.get('config', {}).get('model')),
+                'temperature': request.get('config', {}).get('temperature'),
+                'max_tokens': request.get('config', {}).get('max_tokens'),
+                'token_count': usage.get('total_tokens'),
+                'prompt_tokens': usage.get('prompt_tokens'),
+                'completion_tokens': usage.get('completion_tokens'),
+                'generation_time': elapsed,
+                'finish_reason': choice.get('finish_reason'),
+                'cached': False,
+                'retries': 0,
+                'batch_id': batch_id
+            }
+            GenerationJobService.complete_job(job, roadmap, choice['message']['content'], metadata, prompt)
+            # Le lot génère la roadmap d'un seul tenant : les sections sont périmées
+            RoadmapSection.objects.filter(roadmap=roadmap).delete()
+            GenerationHistory.objects.create(
+                roadmap=roadmap,
+                **AISettingsService.history_fields(request.get('config', {}), prompt, metadata, elapsed)
+            )
+            return 'succeeded'
+
+        error = result.get('error') or (response.get('body') or {}).get('error') or {}
+        message = f"Lot {batch_id}: {error.get('message', 'erreur inconnue')}"
+        GenerationHistory.objects.create(
+            roadmap=roadmap,
+            **AISettingsService.history_fields(
+                request.get('config', {}),
+                prompt,
+                {'batch_id': batch_id},
+                elapsed,
+                success=False,
+                error=message
+            )
+        )
+        if GenerationJobService.fail_job(job, roadmap, message, prompt):
+            return 'requeued'
+        return 'failed'
@@ -0,0 +1,125 @@
+# apps/roadmap_management/services/completion_cache.py
+
+from __future__ import annotations
+from typing import Dict, Any, List, Optional
+import copy
+import hashlib
+import json
+import logging
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+    """
+    Cache adressé par contenu des complétions OpenAI.
+
+    La clé est une empreinte stable des messages et des paramètres qui
+    influencent la réponse ; deux requêtes identiques partagent donc le même
+    résultat. Le stockage passe par l'alias de cache Django
+    AI_COMPLETION_CACHE_ALIAS, dont le backend borne le nombre d'entrées
+    (MAX_ENTRIES en mémoire locale, maxmemory-policy côté Redis).
+    """
+
+    KEY_PREFIX = "ai_completion"
+    KEY_FIELDS = ('model', 'temperature', 'max_tokens', 'presence_penalty', 'frequency_penalty')
+    # Données qui changent d'une génération à l'autre sans que la demande change
+    # (activité de l'utilisateur) : exclues de la clé. Le prompt n'a pas de
+    # partie volatile (generation_date n'y est pas injectée) et reste tel quel.
+    VOLATILE_FIELDS = (
+        ('user_info', 'profile', 'roadmaps_generated'),
+        ('user_info', 'profile', 'last_activity'),
+        ('metadata', 'user_context'),
+    )
+
+    def __init__(
+        self,
+        alias: Optional[str] = None,
+        ttl: Optional[int] = None,
+        max_entry_bytes: Optional[int] = None
+    ):
+        self.cache = caches[alias or settings.AI_COMPLETION_CACHE_ALIAS]
+        self.ttl = ttl if ttl is not None else settings.AI_COMPLETION_CACHE_TTL
+        self.max_entry_bytes = (
+            max_entry_bytes if max_entry_bytes is not None
+            else settings.AI_COMPLETION_CACHE_MAX_ENTRY_BYTES
+        )
+
+    @classmethod
+    def make_key(cls, messages: List[Dict[str, str]], config: Dict[str, Any]) -> str:
+        """
+        Calcule la clé de cache d'une requête.
+
+        Args:
+            messages: Messages au format OpenAI
+            config: Configuration de la requête
+
+        Returns:
+            Clé de la forme ai_completion:<sha256>
+        """
+        payload = {
+            'messages': messages,
+            **{field: config.get(field, 0) for field in cls.KEY_FIELDS}
+        }
+        serialized = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        digest = hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+        return f"{cls.KEY_PREFIX}:{digest}"
+
+    @classmethod
+    def stable_data(cls, structured_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Copie des données structurées sans les champs volatils (VOLATILE_FIELDS)."""
+        data = copy.deepcopy(structured_data)
+        for *parents, field in cls.VOLATILE_FIELDS:
+            node = data
+            for parent in parents:
+                node = node.get(parent) if isinstance(node, dict) else None
+            if isinstance(node, dict):
+                node.pop(field, None)
+        return data
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retourne la complétion en cache et met à jour les compteurs."""
+        try:
+            value = await self.cache.aget(key)
+        except Exception as e:
+            logger.warning(f"Lecture du cache de complétions impossible: {e}")
+            return None
+
+        await self._incr('hits' if value is not None else 'misses')
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Stocke une complétion, sauf si elle dépasse max_entry_bytes."""
+        size = len(json.dumps(value, default=str).encode('utf-8'))
+        if size > self.max_entry_bytes:
+            logger.debug(f"Complétion trop volumineuse pour le cache ({size} octets)")
+            return
+        try:
+            await self.cache.aset(key, value, timeout=self.ttl)
+        except Exception as e:
+            logger.warning(f"Écriture du cache de complétions impossible: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        """Compteurs de hits/misses partagés par les workers."""
+        hits = await self.cache.aget(self._counter_key('hits'), 0)
+        misses = await self.cache.aget(self._counter_key('misses'), 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0
+        }
+
+    def _counter_key(self, name: str) -> str:
+        return f"{self.KEY_PREFIX}:stats:{name}"
+
+    async def _incr(self, name: str) -> None:
+        key = self._counter_key(name)
+        try:
+            if not await self.cache.aadd(key, 1, timeout=None):
+                await self.cache.aincr(key)
+        except Exception:
+            # Les compteurs sont indicatifs : on ne bloque jamais une génération
+            pass
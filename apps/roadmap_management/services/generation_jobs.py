@@ -0,0 +1,463 @@
+# apps/roadmap_management/services/generation_jobs.py
+
+from __future__ import annotations
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from datetime import timedelta
+import logging
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .ai_preparation_service import AIDataPreparationService
+from .ai_service import RoadmapAIService
+from .ai_settings import AISettingsService
+from .profile_index import ProfileMatch, profile_index
+from .section_generation import SectionedRoadmapService
+if TYPE_CHECKING:
+    from apps.roadmap_management.models import GenerationJob, Roadmaps
+    from apps.user_management.models import Users
+
+logger = logging.getLogger(__name__)
+
+# Préfixe de locked_by des tâches soumises à l'API Batch (batch:<batch_id>)
+BATCH_LOCK_PREFIX = "batch:"
+ACTIVE_JOB_STATUSES = ('PENDING', 'RUNNING')
+
+
+class GenerationInProgress(ValidationError):
+    """Une génération sans tâche en file (streaming) détient déjà le bail de la roadmap"""
+    pass
+
+
+class GenerationJobService:
+    """
+    File d'attente des générations de roadmaps, stockée en base.
+    Les vues enregistrent une tâche et répondent immédiatement ; la commande
+    run_generation_worker réclame les tâches et appelle l'API OpenAI.
+    """
+
+    @classmethod
+    def enqueue(
+        cls,
+        roadmap: 'Roadmaps',
+        user: Optional['Users'],
+        temp_responses: Dict[str, Any],
+        ai_config: Optional[Dict[str, Any]] = None,
+        kind: str = 'GENERATE',
+        mode: str = 'INTERACTIVE'
+    ) -> 'GenerationJob':
+        """Enregistre une tâche de génération (voir enqueue_or_attach)."""
+        return cls.enqueue_or_attach(roadmap, user, temp_responses, ai_config, kind, mode)[0]
+
+    @classmethod
+    def enqueue_or_attach(
+        cls,
+        roadmap: 'Roadmaps',
+        user: Optional['Users'],
+        temp_responses: Dict[str, Any],
+        ai_config: Optional[Dict[str, Any]] = None,
+        kind: str = 'GENERATE',
+        mode: str = 'INTERACTIVE'
+    ) -> Tuple['GenerationJob', bool]:
+        """
+        Enregistre une tâche de génération et passe la roadmap en GENERATING.
+
+        La ligne de la roadmap est verrouillée (SELECT ... FOR UPDATE) : si une
+        tâche est déjà en file ou en cours pour cette roadmap, elle est
+        renvoyée au lieu d'en créer une seconde (double clic, relance client).
+
+        Args:
+            roadmap: Roadmap à générer
+            user: Utilisateur ayant demandé la génération
+            temp_responses: Réponses à utiliser pour la génération
+            ai_config: Configuration IA validée
+            kind: GENERATE ou REGENERATE
+            mode: INTERACTIVE (worker) ou BATCH (prochain lot de l'API Batch)
+
+        Returns:
+            La tâche et True si elle vient d'être créée, False si l'appelant
+            est rattaché à une tâche existante
+
+        Raises:
+            GenerationInProgress: Si une génération en streaming détient le bail
+        """
+        from apps.roadmap_management.models import GenerationJob, Roadmaps
+
+        with transaction.atomic():
+            Roadmaps.objects.select_for_update().filter(pk=roadmap.pk).first()
+            active = GenerationJob.objects.filter(
+                roadmap=roadmap,
+                status__in=ACTIVE_JOB_STATUSES
+            ).order_by('-created_at').first()
+            if active is not None:
+                logger.info(f"Génération de la roadmap {roadmap.id} déjà en file : rattachement à la tâche {active.id}")
+                return active, False
+
+            if not cls.acquire_lease(roadmap):
+                raise GenerationInProgress(f"Génération de la roadmap {roadmap.id} déjà en cours")
+
+            job = GenerationJob.objects.create(
+                roadmap=roadmap,
+                user=user,
+                kind=kind,
+                mode=mode,
+                payload={
+                    'temp_responses': temp_responses,
+                    'ai_config': ai_config or {}
+                }
+            )
+        return job, True
+
+    @staticmethod
+    def acquire_lease(roadmap: 'Roadmaps', duration: Optional[int] = None) -> bool:
+        """
+        Passe la roadmap en GENERATING par une mise à jour conditionnelle.
+
+        Seul l'appelant dont l'UPDATE modifie la ligne obtient le bail ; un bail
+        expiré (génération abandonnée) peut être repris.
+
+        Returns:
+            True si le bail est obtenu
+        """
+        from apps.roadmap_management.models import Roadmaps
+
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=duration or settings.ROADMAP_GENERATION_LEASE)
+        acquired = Roadmaps.objects.filter(pk=roadmap.pk).exclude(status='ARCHIVED').filter(
+            ~Q(status='GENERATING')
+            | Q(generation_lease_expires_at__isnull=True)
+            | Q(generation_lease_expires_at__lt=now)
+        ).update(status='GENERATING', generation_lease_expires_at=expires_at, updated_at=now)
+
+        if acquired:
+            roadmap.status = 'GENERATING'
+            roadmap.generation_lease_expires_at = expires_at
+        return bool(acquired)
+
+    @staticmethod
+    def latest_for(roadmap: 'Roadmaps') -> Optional['GenerationJob']:
+        """Dernière tâche enregistrée pour une roadmap."""
+        return roadmap.generation_jobs.order_by('-created_at').first()
+
+    @staticmethod
+    def claim_jobs(
+        worker_id: str,
+        limit: int,
+        mode: str = 'INTERACTIVE',
+        lease: Optional[int] = None
+    ) -> List['GenerationJob']:
+        """
+        Réclame jusqu'à `limit` tâches en attente du mode donné.
+
+        Les lignes sont verrouillées avec SELECT ... FOR UPDATE SKIP LOCKED :
+        plusieurs workers peuvent interroger la file sans se marcher dessus.
+        Le bail des roadmaps est prolongé de `lease` secondes
+        (ROADMAP_GENERATION_LEASE par défaut).
+        """
+        from apps.roadmap_management.models import GenerationJob, Roadmaps
+
+        if limit <= 0:
+            return []
+
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                GenerationJob.objects.select_for_update(skip_locked=True)
+                .filter(status='PENDING', mode=mode)
+                .order_by('created_at')
+                .values_list('id', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            GenerationJob.objects.filter(id__in=ids).update(
+                status='RUNNING',
+                locked_by=worker_id,
+                locked_at=now,
+                started_at=now,
+                attempts=F('attempts') + 1
+            )
+            # Le bail de la roadmap court à partir de la prise en charge
+            Roadmaps.objects.filter(
+                generation_jobs__id__in=ids,
+                status='GENERATING'
+            ).update(generation_lease_expires_at=now + timedelta(seconds=lease or settings.ROADMAP_GENERATION_LEASE))
+        return list(GenerationJob.objects.filter(id__in=ids).order_by('created_at'))
+
+    @staticmethod
+    def requeue_stale(stale_after: int) -> int:
+        """
+        Remet en attente les tâches RUNNING dont le worker a disparu.
+
+        Args:
+            stale_after: Durée en secondes au-delà de laquelle un verrou est périmé
+
+        Returns:
+            Nombre de tâches remises en attente
+        """
+        from apps.roadmap_management.models import GenerationJob
+
+        cutoff = timezone.now() - timedelta(seconds=stale_after)
+        # Les tâches confiées à l'API Batch peuvent légitimement durer 24 h
+        return GenerationJob.objects.filter(
+            status='RUNNING',
+            locked_at__lt=cutoff
+        ).exclude(
+            locked_by__startswith=BATCH_LOCK_PREFIX
+        ).update(status='PENDING', locked_by=None, locked_at=None)
+
+    @staticmethod
+    def release_jobs(locked_by: str, mode: Optional[str] = None) -> int:
+        """
+        Remet en attente les tâches RUNNING détenues par `locked_by`.
+
+        Utilisé quand un lot n'a pas pu être soumis ou s'est terminé sans
+        résultats : la réclamation ne compte pas comme une tentative et le
+        bail des roadmaps, prolongé pour la fenêtre du lot, revient à
+        ROADMAP_GENERATION_LEASE.
+
+        Args:
+            locked_by: Verrou des tâches à libérer (batch:<batch_id>)
+            mode: Nouveau mode des tâches (INTERACTIVE pour les confier au worker)
+
+        Returns:
+            Nombre de tâches remises en attente
+        """
+        from apps.roadmap_management.models import GenerationJob, Roadmaps
+
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                GenerationJob.objects.select_for_update()
+                .filter(status='RUNNING', locked_by=locked_by)
+                .values_list('id', flat=True)
+            )
+            if not ids:
+                return 0
+            fields = {'status': 'PENDING', 'locked_by': None, 'locked_at': None, 'attempts': F('attempts') - 1}
+            if mode:
+                fields['mode'] = mode
+            GenerationJob.objects.filter(id__in=ids).update(**fields)
+            Roadmaps.objects.filter(
+                generation_jobs__id__in=ids,
+                status='GENERATING'
+            ).update(generation_lease_expires_at=now + timedelta(seconds=settings.ROADMAP_GENERATION_LEASE))
+        logger.info(f"{len(ids)} tâche(s) {locked_by} remise(s) en file")
+        return len(ids)
+
+    @classmethod
+    async def run_job(
+        cls,
+        job: 'GenerationJob',
+        ai_service: Optional[RoadmapAIService] = None,
+        preparation_service: Optional[AIDataPreparationService] = None
+    ) -> None:
+        """
+        Exécute une tâche réclamée et enregistre son résultat.
+
+        En cas d'échec, la tâche repart en file tant que max_attempts n'est
+        pas atteint ; sinon elle passe en FAILED et la roadmap en ERROR.
+        Chaque tentative, réussie ou non, est consignée dans GenerationHistory.
+        """
+        from apps.roadmap_management.models import Roadmaps
+        from apps.user_management.models import Users
+
+        roadmap = await Roadmaps.objects.aget(pk=job.roadmap_id)
+        user = await Users.objects.aget(pk=job.user_id) if job.user_id else None
+        temp_responses = job.payload.get('temp_responses', {})
+        ai_config = job.payload.get('ai_config', {})
+        prompt = ""
+        start_time = time.time()
+
+        try:
+            preparation_service = preparation_service or AIDataPreparationService()
+            ai_service = ai_service or RoadmapAIService()
+
+            generation_data = await preparation_service.prepare_complete_generation_data(
+                temp_responses,
+                user
+            )
+            prompt = generation_data["prompt"]
+            reference = await cls.find_reference(roadmap, generation_data["data"])
+
+            if settings.ROADMAP_SECTIONED_GENERATION:
+                generation_result = await SectionedRoadmapService(ai_service).generate(
+                    roadmap,
+                    prompt,
+                    generation_data["data"],
+                    reference=reference,
+                    prompt_version=generation_data.get("prompt_version"),
+                    **ai_config
+                )
+            else:
+                generation_result = await ai_service.generate_roadmap(
+                    prompt,
+                    generation_data["data"],
+                    reference=reference.reference_for() if reference else None,
+                    **ai_config
+                )
+            if reference:
+                generation_result["metadata"]["reference"] = reference.to_dict()
+            await sync_to_async(cls.complete_job)(
+                job,
+                roadmap,
+                generation_result["content"],
+                generation_result["metadata"],
+                prompt
+            )
+            await cls.record_profile(roadmap, generation_data["data"])
+            await AISettingsService.log_generation(
+                roadmap=roadmap,
+                configuration=ai_config,
+                prompt=prompt,
+                token_count=generation_result["metadata"].get("token_count") or 0,
+                start_time=start_time,
+                metadata=generation_result["metadata"]
+            )
+
+        except Exception as e:
+            logger.error(f"Échec de la tâche de génération {job.id} (tentative {job.attempts}): {str(e)}")
+            await sync_to_async(cls.fail_job)(job, roadmap, str(e), prompt)
+            await AISettingsService.log_generation(
+                roadmap=roadmap,
+                configuration=ai_config,
+                prompt=prompt,
+                token_count=0,
+                start_time=start_time,
+                success=False,
+                error=str(e),
+                metadata={'retries': getattr(e.__cause__, 'retries', 0)}
+            )
+
+    @staticmethod
+    async def find_reference(roadmap: 'Roadmaps', structured_data: Dict[str, Any]) -> Optional[ProfileMatch]:
+        """Roadmap terminée d'un profil similaire à adapter, si la réutilisation est active."""
+        if not settings.ROADMAP_PROFILE_REUSE:
+            return None
+        try:
+            reference = await profile_index.afind(structured_data, exclude=[roadmap.id])
+        except Exception as e:
+            # L'index n'est qu'une optimisation : la génération complète reste possible
+            logger.warning(f"Recherche de profil similaire impossible pour {roadmap.id}: {str(e)}")
+            return None
+        if reference:
+            logger.info(
+                f"Roadmap {roadmap.id} adaptée de {reference.roadmap_id} "
+                f"(similarité {reference.similarity:.3f})"
+            )
+        return reference
+
+    @staticmethod
+    async def record_profile(roadmap: 'Roadmaps', structured_data: Dict[str, Any], index: bool = True) -> None:
+        """
+        Ajoute le profil d'une roadmap terminée à l'index de réutilisation.
+
+        index=False (génération en streaming, côté serveur web) ne persiste que
+        RoadmapProfile : seuls les workers interrogent l'index en mémoire.
+        """
+        if not settings.ROADMAP_PROFILE_REUSE:
+            return
+        try:
+            await profile_index.arecord(roadmap, structured_data, index)
+        except Exception as e:
+            logger.warning(f"Profil de la roadmap {roadmap.id} non indexé: {str(e)}")
+
+    @staticmethod
+    def complete_job(
+        job: 'GenerationJob',
+        roadmap: 'Roadmaps',
+        content: str,
+        metadata: Dict[str, Any],
+        prompt: str
+    ) -> None:
+        """Enregistre le contenu généré, la configuration utilisée et clôt la tâche."""
+        from apps.roadmap_management.models import AIConfiguration
+
+        with transaction.atomic():
+            roadmap.content = content
+            roadmap.status = 'COMPLETED'
+            roadmap.generation_lease_expires_at = None
+            roadmap.increment_version()
+            roadmap.updated_at = timezone.now()
+            roadmap.save()
+
+            AIConfiguration.objects.create(
+                roadmap=roadmap,
+                model=metadata["model"],
+                temperature=metadata.get("temperature", 0.7),
+                max_tokens=metadata.get("max_tokens", 4096),
+                prompt_template=prompt,
+                token_count=metadata.get("token_count"),
+                generation_time=metadata.get("generation_time"),
+                is_successful=True
+            )
+
+            job.status = 'SUCCEEDED'
+            job.result = metadata
+            job.error_message = None
+            job.finished_at = timezone.now()
+            job.save()
+
+    @staticmethod
+    def fail_job(
+        job: 'GenerationJob',
+        roadmap: 'Roadmaps',
+        error: str,
+        prompt: str = ""
+    ) -> bool:
+        """
+        Enregistre l'échec d'une tentative.
+
+        Returns:
+            True si la tâche est remise en file, False si elle est abandonnée
+        """
+        from apps.roadmap_management.models import AIConfiguration
+
+        ai_config = job.payload.get('ai_config', {})
+        job.error_message = error
+        job.locked_by = None
+        job.locked_at = None
+
+        if job.attempts < job.max_attempts:
+            job.status = 'PENDING'
+            job.save()
+            return True
+
+        with transaction.atomic():
+            job.status = 'FAILED'
+            job.finished_at = timezone.now()
+            job.save()
+
+            roadmap.status = 'ERROR'
+            roadmap.generation_lease_expires_at = None
+            roadmap.save()
+
+            AIConfiguration.objects.create(
+                roadmap=roadmap,
+                model=ai_config.get("model", "gpt-4"),
+                temperature=ai_config.get("temperature", 0.7),
+                max_tokens=ai_config.get("max_tokens", 4096),
+                prompt_template=prompt,
+                is_successful=False,
+                error_message=error
+            )
+        return False
+
+    @staticmethod
+    def describe(job: Optional['GenerationJob']) -> Optional[Dict[str, Any]]:
+        """Représentation d'une tâche pour l'API de suivi."""
+        if job is None:
+            return None
+        return {
+            "job_id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "attempts": job.attempts,
+            "error": job.error_message,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "result": job.result
+        }
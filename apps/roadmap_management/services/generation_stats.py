@@ -0,0 +1,112 @@
+# apps/roadmap_management/services/generation_stats.py
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+from collections import defaultdict
+from datetime import datetime, timedelta
+import re
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+DEFAULT_WINDOWS = ('1h', '24h', '7d')
+WINDOW_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+WINDOW_PATTERN = re.compile(r'^(\d+)([mhd])$')
+# Au-delà, les agrégats deviennent trop coûteux à calculer en mémoire
+MAX_WINDOW_SECONDS = 90 * 86400
+
+
+def parse_window(value: str) -> int:
+    """Convertit une fenêtre du type 15m, 24h ou 7d en secondes."""
+    match = WINDOW_PATTERN.match(value.strip())
+    if not match:
+        raise ValidationError(f"Fenêtre invalide : {value} (attendu : 15m, 24h, 7d...)")
+    seconds = int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+    if not 0 < seconds <= MAX_WINDOW_SECONDS:
+        raise ValidationError(f"Fenêtre hors limites : {value}")
+    return seconds
+
+
+def percentile(ordered: Sequence[float], ratio: float) -> Optional[float]:
+    """Percentile par rang le plus proche d'une liste déjà triée."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+class GenerationStatsService:
+    """
+    Agrégats de GenerationHistory par modèle pour le dimensionnement.
+
+    Les percentiles sont calculés en Python : MySQL n'a pas de PERCENTILE_CONT
+    et seules quatre colonnes sont lues par ligne.
+    """
+
+    @classmethod
+    def window_stats(cls, window: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Latences p50/p95/p99 et tokens par modèle sur une fenêtre glissante.
+
+        Les générations servies par le cache sont comptées mais exclues des
+        latences, qui ne reflètent alors que les appels à l'API.
+        """
+        from apps.roadmap_management.models import GenerationHistory
+
+        seconds = parse_window(window)
+        since = (now or timezone.now()) - timedelta(seconds=seconds)
+        rows = GenerationHistory.objects.filter(created_at__gte=since).values_list(
+            'model', 'success', 'cached', 'generation_time',
+            'token_count', 'prompt_tokens', 'completion_tokens', 'retries'
+        )
+
+        grouped: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            'calls': 0, 'failures': 0, 'cached': 0, 'retries': 0,
+            'latencies': [], 'tokens': 0, 'prompt_tokens': 0, 'completion_tokens': 0
+        })
+        for model, success, cached, generation_time, tokens, prompt_tokens, completion_tokens, retries in rows.iterator():
+            stats = grouped[model or 'unknown']
+            stats['calls'] += 1
+            stats['retries'] += retries or 0
+            if not success:
+                stats['failures'] += 1
+                continue
+            if cached:
+                stats['cached'] += 1
+            else:
+                stats['latencies'].append(generation_time)
+            stats['tokens'] += tokens or 0
+            stats['prompt_tokens'] += prompt_tokens or 0
+            stats['completion_tokens'] += completion_tokens or 0
+
+        return {
+            'window': window,
+            'since': since.isoformat(),
+            'models': {model: cls._summarize(stats, seconds) for model, stats in sorted(grouped.items())}
+        }
+
+    @classmethod
+    def report(cls, windows: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        now = timezone.now()
+        return [cls.window_stats(window, now) for window in (windows or DEFAULT_WINDOWS)]
+
+    @staticmethod
+    def _summarize(stats: Dict[str, Any], seconds: int) -> Dict[str, Any]:
+        latencies = sorted(stats['latencies'])
+        return {
+            'calls': stats['calls'],
+            'failures': stats['failures'],
+            'success_rate': (stats['calls'] - stats['failures']) / stats['calls'],
+            'cached': stats['cached'],
+            'retries': stats['retries'],
+            'latency': {
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None
+            },
+            'tokens': {
+                'total': stats['tokens'],
+                'prompt': stats['prompt_tokens'],
+                'completion': stats['completion_tokens'],
+                'per_minute': stats['tokens'] / (seconds / 60)
+            }
+        }
@@ -0,0 +1,109 @@
+# apps/roadmap_management/services/model_router.py
+
+from __future__ import annotations
+from typing import Any, Dict, Optional
+from dataclasses import asdict, dataclass
+import logging
+from django.conf import settings
+from .ai_settings import AIConfigurationTemplate
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RoutingDecision:
+    """Choix du modèle pour une génération, rapporté dans les métadonnées"""
+    model: str
+    reason: str
+    fallback_model: Optional[str] = None
+    deadline: Optional[float] = None
+    technical_precision: float = 0.0
+    response_complexity: int = 0
+    fallback_used: bool = False
+    fallback_reason: Optional[str] = None
+
+    def use_fallback(self, reason: str) -> str:
+        logger.warning(f"Bascule de {self.model} vers {self.fallback_model} ({reason})")
+        self.fallback_used = True
+        self.fallback_reason = reason
+        return self.fallback_model
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ModelRouter:
+    """
+    Choisit le modèle d'une génération à partir de l'analyse du contexte.
+
+    Les questionnaires simples (peu de réponses, peu de vocabulaire technique)
+    partent vers AI_ROUTING_SIMPLE_MODEL, les autres vers
+    AI_ROUTING_COMPLEX_MODEL, dans la limite du coût cible. Un modèle demandé
+    explicitement est toujours respecté ; seule la bascule reste possible.
+    """
+
+    def __init__(self):
+        self.enabled = settings.AI_ROUTING_ENABLED
+        self.simple_model = settings.AI_ROUTING_SIMPLE_MODEL
+        self.complex_model = settings.AI_ROUTING_COMPLEX_MODEL
+        self.fallback_model = settings.AI_ROUTING_FALLBACK_MODEL
+        self.min_technical_precision = settings.AI_ROUTING_MIN_TECHNICAL_PRECISION
+        self.min_responses = settings.AI_ROUTING_MIN_RESPONSES
+        self.max_cost_per_1k_tokens = settings.AI_ROUTING_MAX_COST_PER_1K_TOKENS
+
+    def route(
+        self,
+        context_analysis: Dict[str, Any],
+        default_model: str,
+        requested_model: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> RoutingDecision:
+        """
+        Args:
+            context_analysis: Résultat de RoadmapAIService.analyze_context
+            default_model: Modèle de la configuration par défaut
+            requested_model: Modèle demandé explicitement par l'utilisateur
+            deadline: Délai au-delà duquel basculer vers le modèle de repli
+        """
+        precision = float(context_analysis.get('technical_precision', 0.0))
+        complexity = int(context_analysis.get('response_complexity', 0))
+
+        if requested_model:
+            model, reason = requested_model, 'requested'
+        elif not self.enabled:
+            model, reason = default_model, 'default'
+        elif precision >= self.min_technical_precision or complexity >= self.min_responses:
+            model, reason = self.complex_model, 'complex_context'
+        else:
+            model, reason = self.simple_model, 'simple_context'
+
+        if reason != 'requested' and not self._within_cost_target(model):
+            cheaper = self._cheapest_model()
+            if cheaper != model:
+                model, reason = cheaper, f'{reason}+cost_target'
+
+        decision = RoutingDecision(
+            model=model,
+            reason=reason,
+            fallback_model=self.fallback_model if self.fallback_model != model else None,
+            deadline=deadline,
+            technical_precision=precision,
+            response_complexity=complexity
+        )
+        logger.info(
+            f"Routage vers {model} ({reason}, précision={precision:.2f}, réponses={complexity})"
+        )
+        return decision
+
+    def _within_cost_target(self, model: str) -> bool:
+        if not self.max_cost_per_1k_tokens:
+            return True
+        model_config = AIConfigurationTemplate.SUPPORTED_MODELS.get(model)
+        return model_config is None or model_config.cost_per_1k_tokens <= self.max_cost_per_1k_tokens
+
+    @staticmethod
+    def _cheapest_model() -> str:
+        return min(
+            AIConfigurationTemplate.SUPPORTED_MODELS.items(),
+            key=lambda item: item[1].cost_per_1k_tokens
+        )[0]
@@ -0,0 +1,126 @@
+# apps/roadmap_management/services/openai_client.py
+
+from __future__ import annotations
+from typing import Dict, Union
+import asyncio
+import logging
+import threading
+import httpx
+from django.conf import settings
+from openai import AsyncOpenAI, AsyncAzureOpenAI
+from .openai_stub import StubAsyncOpenAI, build_stub_client
+
+logger = logging.getLogger(__name__)
+
+AsyncClient = Union[AsyncOpenAI, AsyncAzureOpenAI, StubAsyncOpenAI]
+
+# Backends hors ligne (tests de charge, benchmarks) : aucune requête réseau
+STUB_API_TYPES = ('stub', 'replay')
+
+# Un client par boucle d'événements : les connexions httpx sont liées à la
+# boucle qui les a ouvertes. Le pool n'est donc partagé que là où la boucle
+# dure : sous ASGI (une boucle par processus) et dans run_generation_worker.
+# Sous WSGI, chaque appel async_to_sync a sa propre boucle, donc son propre
+# client, libéré au premier appel suivant la fermeture de cette boucle.
+# Dictionnaire ordinaire : les connexions ouvertes référencent leur boucle,
+# une clé faible ne serait jamais libérée.
+_clients: Dict[asyncio.AbstractEventLoop, AsyncClient] = {}
+_clients_lock = threading.Lock()
+
+
+class OpenAIClientConfigurationError(Exception):
+    """Configuration du client OpenAI incomplète"""
+    pass
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Construit le client httpx partagé avec son pool de connexions."""
+    limits = httpx.Limits(
+        max_connections=settings.OPENAI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENAI_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.OPENAI_HTTP_TIMEOUT,
+        connect=settings.OPENAI_HTTP_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def _build_client() -> AsyncClient:
+    """Construit le client asynchrone selon OPENAI_API_TYPE."""
+    api_type = settings.OPENAI_API_TYPE
+    if api_type in STUB_API_TYPES:
+        return build_stub_client(api_type)
+
+    if not settings.OPENAI_API_KEY:
+        raise OpenAIClientConfigurationError("Clé API OpenAI manquante")
+
+    http_client = _build_http_client()
+
+    if api_type == 'azure':
+        endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
+        api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', None)
+        if not all([endpoint, api_version]):
+            raise OpenAIClientConfigurationError("Configuration Azure OpenAI incomplète")
+        return AsyncAzureOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            azure_endpoint=endpoint,
+            api_version=api_version,
+            http_client=http_client,
+            max_retries=0
+        )
+
+    # Les relances sont gérées par services/resilience.py (backoff + disjoncteur)
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client, max_retries=0)
+
+
+def get_async_client() -> AsyncClient:
+    """
+    Retourne le client OpenAI asynchrone de la boucle d'événements courante.
+
+    Le client est créé au premier appel pour la boucle d'événements courante
+    puis réutilisé, ce qui permet aux générations concurrentes de partager
+    les connexions TLS déjà ouvertes (sous ASGI et dans le worker, où la
+    boucle dure le temps du processus). Doit être appelé depuis du code async.
+
+    Raises:
+        OpenAIClientConfigurationError: Si la configuration est incomplète
+        RuntimeError: Si aucune boucle d'événements n'est active
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        _release_closed_loops()
+        client = _clients.get(loop)
+        if client is None:
+            client = _build_client()
+            _clients[loop] = client
+            logger.info("Client OpenAI asynchrone initialisé (pool de connexions partagé)")
+    return client
+
+
+def _release_closed_loops() -> None:
+    """
+    Oublie les clients des boucles fermées (appelé sous verrou).
+
+    Ils ne peuvent plus être fermés proprement, leur boucle étant arrêtée :
+    sans référence, leurs connexions sont fermées par le ramasse-miettes.
+    """
+    closed = [loop for loop in _clients if loop.is_closed()]
+    for loop in closed:
+        del _clients[loop]
+    if closed:
+        logger.debug(f"{len(closed)} client(s) OpenAI de boucles fermées libéré(s)")
+
+
+async def close_async_client() -> None:
+    """Ferme le client de la boucle courante et libère son pool de connexions."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.pop(loop, None)
+    if client is not None:
+        await client.close()
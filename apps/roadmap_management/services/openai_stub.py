@@ -0,0 +1,249 @@
+# apps/roadmap_management/services/openai_stub.py
+
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+import uuid
+import httpx
+from django.conf import settings
+from openai import InternalServerError, RateLimitError
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from .completion_cache import CompletionCache
+
+logger = logging.getLogger(__name__)
+
+STUB_WORDS = (
+    "apprendre", "pratiquer", "projet", "semaine", "objectif", "compétence",
+    "ressource", "module", "exercice", "révision", "bases", "avancé"
+)
+
+
+class StubProfile:
+    """
+    Comportement simulé de l'API, lu depuis les settings OPENAI_STUB_*.
+
+    La latence suit une loi log-normale (médiane et dispersion), les tokens
+    de complétion une loi normale bornée par max_tokens ; une fraction des
+    requêtes échoue en 429 ou en 500 pour exercer relances et disjoncteur.
+    """
+
+    def __init__(self, **overrides: Any):
+        values = {
+            'latency_median': settings.OPENAI_STUB_LATENCY_MEDIAN,
+            'latency_sigma': settings.OPENAI_STUB_LATENCY_SIGMA,
+            'tokens_per_second': settings.OPENAI_STUB_TOKENS_PER_SECOND,
+            'completion_tokens': settings.OPENAI_STUB_COMPLETION_TOKENS,
+            'rate_limit_rate': settings.OPENAI_STUB_RATE_LIMIT_RATE,
+            'error_rate': settings.OPENAI_STUB_ERROR_RATE,
+            'seed': settings.OPENAI_STUB_SEED,
+            **overrides
+        }
+        self.latency_median = float(values['latency_median'])
+        self.latency_sigma = float(values['latency_sigma'])
+        self.tokens_per_second = float(values['tokens_per_second'])
+        self.completion_tokens = int(values['completion_tokens'])
+        self.rate_limit_rate = float(values['rate_limit_rate'])
+        self.error_rate = float(values['error_rate'])
+        self.random = random.Random(values['seed'])
+
+    def latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self.random.lognormvariate(0, self.latency_sigma) * self.latency_median
+
+    def token_count(self, max_tokens: int) -> int:
+        count = int(self.random.gauss(self.completion_tokens, self.completion_tokens / 4))
+        return max(1, min(count, max_tokens))
+
+    def maybe_fail(self) -> None:
+        """Lève une erreur API simulée selon les taux configurés."""
+        draw = self.random.random()
+        if draw < self.rate_limit_rate:
+            raise RateLimitError(
+                "Rate limit simulé",
+                response=_fake_response(429, {'retry-after': '1'}),
+                body=None
+            )
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise InternalServerError(
+                "Erreur serveur simulée",
+                response=_fake_response(500),
+                body=None
+            )
+
+
+def _fake_response(status_code: int, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    request = httpx.Request("POST", "https://stub.invalid/v1/chat/completions")
+    return httpx.Response(status_code, headers=headers or {}, request=request)
+
+
+class ReplayStore:
+    """
+    Complétions enregistrées (fichier JSONL produit via OPENAI_STUB_RECORD_FILE).
+
+    Chaque ligne contient `content` et, optionnellement, `key` (empreinte
+    CompletionCache des messages), `completion_tokens` et `generation_time`.
+    Une requête dont l'empreinte est connue reçoit sa réponse enregistrée ;
+    les autres reçoivent les enregistrements à tour de rôle.
+    """
+
+    def __init__(self, path: str):
+        self.by_key: Dict[str, Dict[str, Any]] = {}
+        records: List[Dict[str, Any]] = []
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                records.append(record)
+                if record.get('key'):
+                    self.by_key[record['key']] = record
+        if not records:
+            raise ValueError(f"Aucune complétion enregistrée dans {path}")
+        self._cycle = itertools.cycle(records)
+        logger.info(f"{len(records)} complétion(s) chargée(s) depuis {path}")
+
+    def lookup(self, messages: List[Dict[str, str]], config: Dict[str, Any]) -> Dict[str, Any]:
+        return self.by_key.get(CompletionCache.make_key(messages, config)) or next(self._cycle)
+
+
+class _StubCompletions:
+    def __init__(self, client: 'StubAsyncOpenAI'):
+        self._client = client
+
+    async def create(self, *, model: str, messages: List[Dict[str, str]], max_tokens: int = 4096,
+                     stream: bool = False, **kwargs: Any):
+        return await self._client._complete(model, messages, max_tokens, stream, kwargs)
+
+
+class _StubChat:
+    def __init__(self, client: 'StubAsyncOpenAI'):
+        self.completions = _StubCompletions(client)
+
+
+class _StubModels:
+    def __init__(self, client: 'StubAsyncOpenAI'):
+        self._client = client
+
+    async def retrieve(self, model: str, **kwargs: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self._client.profile.latency() / 10)
+        self._client.profile.maybe_fail()
+        return {'id': model, 'object': 'model', 'owned_by': self._client.mode}
+
+
+class StubAsyncOpenAI:
+    """
+    Remplaçant hors ligne d'AsyncOpenAI (OPENAI_API_TYPE = stub ou replay).
+
+    Expose la même surface que le client réel utilisée par AIService
+    (chat.completions.create, streaming compris, models.retrieve, close) et
+    renvoie de vrais objets ChatCompletion / ChatCompletionChunk.
+    """
+
+    def __init__(self, mode: str = 'stub', profile: Optional[StubProfile] = None,
+                 replay_store: Optional[ReplayStore] = None):
+        self.mode = mode
+        self.profile = profile or StubProfile()
+        self.replay_store = replay_store
+        self.chat = _StubChat(self)
+        self.models = _StubModels(self)
+
+    async def close(self) -> None:
+        return None
+
+    async def _complete(self, model: str, messages: List[Dict[str, str]], max_tokens: int,
+                        stream: bool, params: Dict[str, Any]):
+        record = None
+        if self.replay_store is not None:
+            record = self.replay_store.lookup(messages, {'model': model, 'max_tokens': max_tokens, **params})
+
+        if record:
+            content = record['content']
+            completion_tokens = int(record.get('completion_tokens') or max(1, len(content) // 4))
+            latency = float(record.get('generation_time') or self.profile.latency())
+        else:
+            completion_tokens = self.profile.token_count(max_tokens)
+            content = " ".join(self.profile.random.choice(STUB_WORDS) for _ in range(completion_tokens))
+            latency = self.profile.latency()
+
+        prompt_tokens = sum(len(message.get('content') or '') // 4 + 4 for message in messages)
+        finish_reason = 'length' if completion_tokens >= max_tokens else 'stop'
+
+        if stream:
+            # L'erreur éventuelle survient à l'ouverture du flux, comme avec l'API
+            await asyncio.sleep(min(latency, 1.0) / 4)
+            self.profile.maybe_fail()
+            return self._stream(model, content, completion_tokens, finish_reason)
+
+        await asyncio.sleep(latency)
+        self.profile.maybe_fail()
+        return ChatCompletion.model_validate({
+            'id': f"chatcmpl-{self.mode}-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': finish_reason
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    async def _stream(self, model: str, content: str, completion_tokens: int,
+                      finish_reason: str) -> AsyncIterator[ChatCompletionChunk]:
+        completion_id = f"chatcmpl-{self.mode}-{uuid.uuid4().hex}"
+        words = content.split(" ")
+        delay = 1 / self.profile.tokens_per_second if self.profile.tokens_per_second > 0 else 0
+        for index, word in enumerate(words):
+            await asyncio.sleep(delay)
+            yield self._chunk(completion_id, model, word if index == 0 else f" {word}", None)
+        yield self._chunk(completion_id, model, None, finish_reason)
+
+    @staticmethod
+    def _chunk(completion_id: str, model: str, content: Optional[str],
+               finish_reason: Optional[str]) -> ChatCompletionChunk:
+        return ChatCompletionChunk.model_validate({
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'delta': {'content': content} if content is not None else {},
+                'finish_reason': finish_reason
+            }]
+        })
+
+
+def build_stub_client(mode: str) -> StubAsyncOpenAI:
+    """Client simulé (stub) ou rejouant OPENAI_STUB_REPLAY_FILE (replay)."""
+    replay_store = None
+    if mode == 'replay':
+        if not settings.OPENAI_STUB_REPLAY_FILE:
+            raise ValueError("OPENAI_STUB_REPLAY_FILE est requis en mode replay")
+        replay_store = ReplayStore(settings.OPENAI_STUB_REPLAY_FILE)
+    logger.warning(f"Client OpenAI simulé actif (mode {mode}) : aucune requête n'atteint l'API")
+    return StubAsyncOpenAI(mode=mode, replay_store=replay_store)
+
+
+def record_completion(path: str, key: str, result: Dict[str, Any]) -> None:
+    """Ajoute une complétion réelle au fichier de rejeu (OPENAI_STUB_RECORD_FILE)."""
+    record = {
+        'key': key,
+        'model': result.get('model'),
+        'content': result.get('content'),
+        'completion_tokens': result.get('completion_tokens'),
+        'generation_time': result.get('generation_time')
+    }
+    with open(path, 'a', encoding='utf-8') as handle:
+        handle.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,338 @@
+# apps/roadmap_management/services/profile_index.py
+
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import logging
+import math
+import re
+import threading
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+if TYPE_CHECKING:
+    from apps.roadmap_management.models import Roadmaps
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w{3,}")
+# Lignes comparées par bloc : borne la mémoire temporaire des calculs en float32
+SCORE_CHUNK_ROWS = 8192
+# Candidats vérifiés en base au-delà du seuil (roadmaps supprimées ou en cours de génération)
+CANDIDATES = 5
+
+
+@dataclass(frozen=True)
+class ProfileMatch:
+    """Roadmap terminée dont les réponses sont proches du profil recherché"""
+    roadmap_id: str
+    similarity: float
+    content: str
+    sections: Dict[str, str] = field(default_factory=dict)
+
+    def reference_for(self, category: Optional[str] = None) -> Optional[str]:
+        """Contenu de référence d'une section (ou de la roadmap entière)."""
+        if category is None:
+            return self.content or None
+        return self.sections.get(category)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"roadmap_id": self.roadmap_id, "similarity": round(self.similarity, 4)}
+
+
+def _flatten(answer: Any) -> List[str]:
+    if answer is None:
+        return []
+    if isinstance(answer, dict):
+        return [item for value in answer.values() for item in _flatten(value)]
+    if isinstance(answer, (list, tuple, set)):
+        return [item for value in answer for item in _flatten(value)]
+    return [str(answer)]
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value).lower().split())
+
+
+class ProfileVectorizer:
+    """
+    Projection des réponses au questionnaire dans un espace de dimension fixe.
+
+    Hachage des caractéristiques (avec signe, pour compenser les collisions) :
+    une caractéristique par option cochée (MULTIPLE_CHOICE), par cellule
+    (TABLE) et par terme des réponses libres (TEXT, pondéré 1 + log(tf)).
+    Chaque réponse est normalisée séparément pour que les textes longs ne
+    dominent pas les choix multiples ; l'IDF est appliquée à la comparaison.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def vectorize(self, structured_data: Dict[str, Any]) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for response in structured_data.get("user_responses", []):
+            features = self.features(response)
+            if not features:
+                continue
+            part = np.zeros(self.dimensions, dtype=np.float32)
+            for feature, weight in features.items():
+                index, sign = self._hash(feature)
+                part[index] += sign * weight
+            norm = np.linalg.norm(part)
+            if norm:
+                vector += part / norm
+        return vector
+
+    @staticmethod
+    def features(response: Dict[str, Any]) -> Dict[str, float]:
+        """Caractéristiques pondérées d'une réponse, préfixées par sa question."""
+        question_id = response.get("question_id")
+        answer = response.get("answer")
+        kind = response.get("type")
+
+        if kind == 'MULTIPLE_CHOICE':
+            return {f"{question_id}={_normalize(option)}": 1.0 for option in _flatten(answer)}
+
+        if kind == 'TABLE':
+            rows = answer.get('rows', []) if isinstance(answer, dict) else answer
+            return {
+                f"{question_id}:{column}={_normalize(value)}": 1.0
+                for row in (rows if isinstance(rows, list) else [])
+                if isinstance(row, dict)
+                for column, value in row.items()
+            }
+
+        terms = Counter(TOKEN_PATTERN.findall(" ".join(_flatten(answer)).lower()))
+        return {f"{question_id}~{term}": 1 + math.log(count) for term, count in terms.items()}
+
+    def _hash(self, feature: str) -> Tuple[int, int]:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        return digest % self.dimensions, 1 if digest >> 63 else -1
+
+
+class ProfileIndex:
+    """
+    Index en mémoire des profils ayant produit une roadmap terminée.
+
+    Les vecteurs sont persistés dans RoadmapProfile à chaque roadmap terminée
+    et chaque processus ne relit que les profils enregistrés depuis son
+    dernier chargement. Stockés en float16, 100 000 profils de 512
+    dimensions occupent environ 100 Mo.
+
+    La similarité est un cosinus pondéré par l'IDF de chaque dimension
+    (fréquence documentaire tenue à jour à l'ajout) : une option choisie par
+    tous les profils compte peu, une réponse rare rapproche fortement.
+    """
+
+    def __init__(self, dimensions: Optional[int] = None):
+        self._dimensions = dimensions
+        self._matrix: Optional[np.ndarray] = None
+        self._document_frequency: Optional[np.ndarray] = None
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._since: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    @property
+    def dimensions(self) -> int:
+        return self._dimensions or settings.ROADMAP_PROFILE_DIMENSIONS
+
+    @property
+    def vectorizer(self) -> ProfileVectorizer:
+        return ProfileVectorizer(self.dimensions)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def record(self, roadmap: 'Roadmaps', structured_data: Dict[str, Any], index: bool = True) -> None:
+        """
+        Enregistre le profil d'une roadmap terminée et l'ajoute à l'index.
+
+        Args:
+            roadmap: Roadmap terminée
+            structured_data: Données structurées ayant servi à la générer
+            index: False pour ne persister que RoadmapProfile, dans un processus
+                qui n'interroge pas l'index (serveur web) ; les workers le relisent
+        """
+        from apps.roadmap_management.models import RoadmapProfile
+
+        vector = self.vectorizer.vectorize(structured_data)
+        if not vector.any():
+            return
+        stored = vector.astype(np.float16)
+        RoadmapProfile.objects.update_or_create(
+            roadmap=roadmap,
+            defaults={
+                "vector": stored.tobytes(),
+                "dimensions": self.dimensions,
+                "updated_at": timezone.now()
+            }
+        )
+        if not index:
+            return
+        with self._lock:
+            self._put(str(roadmap.id), stored)
+
+    async def arecord(self, roadmap: 'Roadmaps', structured_data: Dict[str, Any], index: bool = True) -> None:
+        await sync_to_async(self.record)(roadmap, structured_data, index)
+
+    def find(
+        self,
+        structured_data: Dict[str, Any],
+        exclude: Iterable[str] = (),
+        threshold: Optional[float] = None
+    ) -> Optional[ProfileMatch]:
+        """
+        Roadmap terminée la plus proche du profil, au-delà du seuil.
+
+        Args:
+            structured_data: Données structurées du profil recherché
+            exclude: Roadmaps à ignorer (la roadmap en cours de génération)
+            threshold: Similarité minimale (ROADMAP_PROFILE_REUSE_THRESHOLD par défaut)
+
+        Returns:
+            La correspondance, ou None si aucun profil n'est assez proche
+        """
+        from apps.roadmap_management.models import RoadmapSection, Roadmaps
+
+        threshold = settings.ROADMAP_PROFILE_REUSE_THRESHOLD if threshold is None else threshold
+        self.refresh()
+        excluded = {str(roadmap_id) for roadmap_id in exclude}
+        candidates = [
+            (roadmap_id, score) for roadmap_id, score in self.nearest(
+                self.vectorizer.vectorize(structured_data),
+                limit=CANDIDATES + len(excluded)
+            )
+            if score >= threshold and roadmap_id not in excluded
+        ]
+        if not candidates:
+            return None
+
+        roadmaps = {
+            roadmap_id: (status, content)
+            for roadmap_id, status, content in Roadmaps.objects.filter(
+                id__in=[roadmap_id for roadmap_id, _ in candidates]
+            ).values_list('id', 'status', 'content')
+        }
+        for roadmap_id, score in candidates:
+            if roadmap_id not in roadmaps:
+                # Roadmap supprimée depuis son indexation
+                self.discard(roadmap_id)
+                continue
+            status, content = roadmaps[roadmap_id]
+            if status != 'COMPLETED' or not content:
+                continue
+            sections = dict(
+                RoadmapSection.objects.filter(roadmap_id=roadmap_id).values_list('category', 'content')
+            )
+            return ProfileMatch(roadmap_id, score, content, sections)
+        return None
+
+    async def afind(
+        self,
+        structured_data: Dict[str, Any],
+        exclude: Iterable[str] = (),
+        threshold: Optional[float] = None
+    ) -> Optional[ProfileMatch]:
+        return await sync_to_async(self.find)(structured_data, exclude, threshold)
+
+    def nearest(self, vector: np.ndarray, limit: int = CANDIDATES) -> List[Tuple[str, float]]:
+        """Profils les plus similaires au vecteur, par similarité décroissante."""
+        with self._lock:
+            if not self._rows:
+                return []
+            size = len(self._ids)
+            weights = np.log((1 + len(self._rows)) / (1 + self._document_frequency)).astype(np.float32) + 1
+            squared_weights = weights * weights
+            query_norm = float(np.linalg.norm(vector * weights))
+            if not query_norm:
+                return []
+
+            weighted_query = (vector * squared_weights).astype(np.float32)
+            scores = np.zeros(size, dtype=np.float32)
+            for start in range(0, size, SCORE_CHUNK_ROWS):
+                block = self._matrix[start:min(start + SCORE_CHUNK_ROWS, size)].astype(np.float32)
+                norms = np.sqrt((block * block) @ squared_weights)
+                scores[start:start + len(block)] = (block @ weighted_query) / np.maximum(norms * query_norm, 1e-12)
+
+            limit = min(limit, size)
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            return [
+                (self._ids[row], float(scores[row]))
+                for row in top[np.argsort(-scores[top])]
+                if self._ids[row] is not None
+            ]
+
+    def refresh(self) -> None:
+        """Charge les profils enregistrés depuis le dernier chargement (tous au premier appel)."""
+        from apps.roadmap_management.models import RoadmapProfile
+
+        profiles = RoadmapProfile.objects.filter(dimensions=self.dimensions)
+        if self._since is not None:
+            profiles = profiles.filter(updated_at__gte=self._since)
+
+        loaded = 0
+        since = self._since
+        for roadmap_id, vector, updated_at in profiles.values_list(
+            'roadmap_id', 'vector', 'updated_at'
+        ).iterator(chunk_size=2000):
+            with self._lock:
+                self._put(roadmap_id, np.frombuffer(bytes(vector), dtype=np.float16))
+            since = max(since, updated_at) if since else updated_at
+            loaded += 1
+
+        if self._since is None and loaded:
+            logger.info(f"Index des profils chargé ({loaded} profils, {self.dimensions} dimensions)")
+        self._since = since
+
+    def discard(self, roadmap_id: str) -> None:
+        with self._lock:
+            row = self._rows.pop(roadmap_id, None)
+            if row is None:
+                return
+            self._document_frequency -= self._matrix[row] != 0
+            self._matrix[row] = 0
+            self._ids[row] = None
+            self._free.append(row)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._matrix = None
+            self._document_frequency = None
+            self._ids = []
+            self._rows = {}
+            self._free = []
+            self._since = None
+
+    def _put(self, roadmap_id: str, vector: np.ndarray) -> None:
+        """Ajoute ou remplace un profil (appelé sous verrou)."""
+        if self._matrix is None:
+            self._matrix = np.zeros((1024, self.dimensions), dtype=np.float16)
+            self._document_frequency = np.zeros(self.dimensions, dtype=np.int32)
+
+        row = self._rows.get(roadmap_id)
+        if row is not None:
+            self._document_frequency -= self._matrix[row] != 0
+        elif self._free:
+            row = self._free.pop()
+        else:
+            row = len(self._ids)
+            self._ids.append(None)
+            if row >= len(self._matrix):
+                # Capacité doublée : ajout amorti en O(1)
+                grown = np.zeros((len(self._matrix) * 2, self.dimensions), dtype=np.float16)
+                grown[:len(self._matrix)] = self._matrix
+                self._matrix = grown
+
+        self._matrix[row] = vector
+        self._document_frequency += self._matrix[row] != 0
+        self._ids[row] = roadmap_id
+        self._rows[roadmap_id] = row
+
+
+profile_index = ProfileIndex()
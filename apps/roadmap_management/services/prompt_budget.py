@@ -0,0 +1,154 @@
+# apps/roadmap_management/services/prompt_budget.py
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import asdict, dataclass, field
+import copy
+import logging
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from apps.response_management.services.response_validation import ResponseValidator
+from .ai_settings import AIConfigurationTemplate
+from .rate_limiter import OpenAIRateLimiter
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARK = " […]"
+
+
+class PromptBudgetExceeded(ValidationError):
+    """Le prompt ne tient pas dans la fenêtre de contexte, même condensé"""
+    pass
+
+
+@dataclass
+class TokenPlan:
+    """Répartition des tokens d'une requête, rapportée dans les métadonnées"""
+    context_window: int
+    max_tokens: int
+    prompt_tokens: int = 0
+    original_prompt_tokens: int = 0
+    trimmed: List[str] = field(default_factory=list)
+
+    @property
+    def prompt_budget(self) -> int:
+        return self.context_window - self.max_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'prompt_budget': self.prompt_budget}
+
+
+class PromptBudgeter:
+    """
+    Fait tenir les messages dans la fenêtre de contexte du modèle avant l'envoi.
+
+    Les parties les moins prioritaires des données structurées sont réduites
+    dans l'ordre : réponses TEXT longues (tronquées par paliers), liste des
+    questions sans réponse (remplacée par un compteur), puis réservation de
+    complétion (max_tokens) jusqu'à PROMPT_BUDGET_MIN_COMPLETION_TOKENS.
+    """
+
+    TEXT_ANSWER_LIMITS = (512, 256, 128, 64)
+
+    def __init__(self, model: str, max_tokens: int, context_window: Optional[int] = None):
+        self.model = model
+        model_config = AIConfigurationTemplate.SUPPORTED_MODELS.get(model)
+        model_window = model_config.max_tokens if model_config else max_tokens * 2
+        self.context_window = min(context_window, model_window) if context_window else model_window
+        self.max_tokens = max_tokens
+        self.min_completion_tokens = settings.PROMPT_BUDGET_MIN_COMPLETION_TOKENS
+        self._encoding = ResponseValidator.get_encoding(model)
+
+    def count(self, messages: List[Dict[str, str]]) -> int:
+        return OpenAIRateLimiter.estimate_request_tokens(messages, 0, self.model)
+
+    def fit(
+        self,
+        structured_data: Dict[str, Any],
+        build_messages: Callable[[Dict[str, Any]], List[Dict[str, str]]]
+    ) -> Tuple[List[Dict[str, str]], TokenPlan]:
+        """
+        Construit les messages en condensant les données si nécessaire.
+
+        Args:
+            structured_data: Données structurées (non modifiées)
+            build_messages: Construit les messages à partir des données
+
+        Returns:
+            Les messages à envoyer et le plan de tokens
+
+        Raises:
+            PromptBudgetExceeded: Si le prompt dépasse encore la fenêtre
+        """
+        plan = TokenPlan(context_window=self.context_window, max_tokens=self.max_tokens)
+        data = structured_data
+        messages = build_messages(data)
+        plan.prompt_tokens = plan.original_prompt_tokens = self.count(messages)
+
+        if plan.prompt_tokens <= plan.prompt_budget:
+            return messages, plan
+
+        data = copy.deepcopy(structured_data)
+        for limit in self.TEXT_ANSWER_LIMITS:
+            if not self._truncate_text_answers(data, limit):
+                continue
+            messages = build_messages(data)
+            plan.prompt_tokens = self.count(messages)
+            plan.trimmed.append(f"text_answers:{limit}")
+            if plan.prompt_tokens <= plan.prompt_budget:
+                return messages, self._report(plan)
+
+        unanswered = data.get("unanswered_questions") or []
+        if unanswered:
+            data["unanswered_questions"] = []
+            data.setdefault("metadata", {})["unanswered_count"] = len(unanswered)
+            messages = build_messages(data)
+            plan.prompt_tokens = self.count(messages)
+            plan.trimmed.append("unanswered_questions")
+            if plan.prompt_tokens <= plan.prompt_budget:
+                return messages, self._report(plan)
+
+        available = self.context_window - plan.prompt_tokens
+        if available >= self.min_completion_tokens:
+            plan.max_tokens = available
+            plan.trimmed.append(f"max_tokens:{available}")
+            return messages, self._report(plan)
+
+        raise PromptBudgetExceeded(
+            f"Prompt de {plan.prompt_tokens} tokens trop long pour la fenêtre de "
+            f"{self.context_window} tokens de {self.model}"
+        )
+
+    def _report(self, plan: TokenPlan) -> TokenPlan:
+        logger.info(
+            f"Prompt condensé de {plan.original_prompt_tokens} à {plan.prompt_tokens} tokens "
+            f"({', '.join(plan.trimmed)})"
+        )
+        return plan
+
+    def _truncate_text_answers(self, data: Dict[str, Any], limit: int) -> bool:
+        """Tronque les réponses TEXT à `limit` tokens ; indique si une réponse a changé."""
+        changed = False
+        for response in data.get("user_responses", []):
+            if response.get("type") != "TEXT":
+                continue
+            answer = response.get("answer")
+            if isinstance(answer, dict):
+                for key, value in answer.items():
+                    if isinstance(value, str):
+                        truncated = self._truncate(value, limit)
+                        changed = changed or truncated != value
+                        answer[key] = truncated
+            elif isinstance(answer, str):
+                truncated = self._truncate(answer, limit)
+                changed = changed or truncated != answer
+                response["answer"] = truncated
+        return changed
+
+    def _truncate(self, text: str, limit: int) -> str:
+        if self._encoding is None:
+            return text if len(text) <= limit * 4 else text[:limit * 4] + TRUNCATION_MARK
+        tokens = self._encoding.encode(text)
+        if len(tokens) <= limit:
+            return text
+        return self._encoding.decode(tokens[:limit]) + TRUNCATION_MARK
@@ -0,0 +1,170 @@
+# apps/roadmap_management/services/prompt_registry.py
+
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import threading
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from apps.question_handling.questionnaire_cache import shared_cache
+from .prompt_validation_service import CompiledTemplate, PromptValidationError, PromptValidationService
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "prompt_templates:version"
+
+
+@dataclass(frozen=True)
+class RegisteredTemplate:
+    """Template actif compilé et validé, servi depuis la mémoire"""
+    id: int
+    name: str
+    version: int
+    updated_at: datetime
+    compiled: CompiledTemplate
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifie le contenu du template, y compris modifié sans changer de version"""
+        return f"{self.name}:v{self.version}:{self.updated_at.isoformat()}"
+
+
+class PromptTemplateRegistry:
+    """
+    Registre en mémoire des PromptTemplate actifs.
+
+    Les templates sont chargés, compilés et validés une seule fois ; la
+    génération les lit ensuite par nom (et version) sans requête. Comme pour
+    le questionnaire, une version partagée dans le cache Django est remplacée
+    à chaque enregistrement : les processus ne relisent alors que les
+    templates dont la date de mise à jour a changé. Sans cache partagé
+    (LocMemCache, DummyCache), le registre est revérifié après
+    PROMPT_REGISTRY_CACHE_TTL secondes.
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+        self._templates: Dict[Tuple[str, int], RegisteredTemplate] = {}
+        self._active: Dict[str, RegisteredTemplate] = {}
+        self._version: Optional[str] = None
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._stale = False
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return shared_cache(self.alias)
+
+    def _version_stamp(self) -> Optional[str]:
+        cache = self.cache
+        return cache.get(VERSION_KEY) if cache is not None else None
+
+    async def _aversion_stamp(self) -> Optional[str]:
+        cache = self.cache
+        return await cache.aget(VERSION_KEY) if cache is not None else None
+
+    def get(self, name: Optional[str] = None, version: Optional[int] = None) -> Optional[RegisteredTemplate]:
+        """
+        Template par nom et version (par défaut : version active).
+
+        Sans nom, renvoie PROMPT_TEMPLATE_NAME ou, à défaut, le dernier
+        template actif mis à jour.
+        """
+        self._ensure_current(self._version_stamp())
+        return self._lookup(name, version)
+
+    async def aget(self, name: Optional[str] = None, version: Optional[int] = None) -> Optional[RegisteredTemplate]:
+        version_stamp = await self._aversion_stamp()
+        if not self._is_current(version_stamp):
+            await sync_to_async(self._ensure_current)(version_stamp)
+        return self._lookup(name, version)
+
+    def warm_up(self) -> None:
+        """Charge le registre (démarrage d'un worker)."""
+        self._ensure_current(self._version_stamp())
+
+    def invalidate(self) -> None:
+        """Signale une modification à tous les processus."""
+        cache = self.cache
+        if cache is not None:
+            try:
+                cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            except Exception as e:
+                logger.warning(f"Version des templates non publiée: {str(e)}")
+        with self._lock:
+            self._stale = True
+
+    def _lookup(self, name: Optional[str], version: Optional[int]) -> Optional[RegisteredTemplate]:
+        name = name or settings.PROMPT_TEMPLATE_NAME
+        if name is None:
+            return max(self._active.values(), key=lambda template: template.updated_at, default=None)
+        if version is None:
+            return self._active.get(name)
+        return self._templates.get((name, version))
+
+    def _is_current(self, version_stamp: Optional[str]) -> bool:
+        if not self._loaded or self._stale:
+            return False
+        if version_stamp is None:
+            # Sans cache partagé, les autres processus ne sont jamais prévenus
+            return time.monotonic() - self._loaded_at < settings.PROMPT_REGISTRY_CACHE_TTL
+        return version_stamp == self._version
+
+    def _ensure_current(self, version_stamp: Optional[str]) -> None:
+        with self._lock:
+            if self._is_current(version_stamp):
+                return
+            self._refresh()
+            self._version = version_stamp
+            self._stale = False
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+    def _refresh(self) -> None:
+        """Recompile uniquement les templates actifs ajoutés ou modifiés."""
+        from apps.roadmap_management.models import PromptTemplate
+
+        current = {
+            template_id: (name, version, updated_at)
+            for template_id, name, version, updated_at in PromptTemplate.objects.filter(
+                is_active=True
+            ).values_list('id', 'name', 'version', 'updated_at')
+        }
+        known = {template.id: template for template in self._active.values()}
+        changed = [
+            template_id for template_id, (name, version, updated_at) in current.items()
+            if template_id not in known or known[template_id].updated_at != updated_at
+        ]
+
+        active = {
+            template.name: template for template in self._active.values()
+            if template.id in current and template.id not in changed
+        }
+        for template in PromptTemplate.objects.filter(id__in=changed):
+            try:
+                compiled = PromptValidationService.compile_template(template.template_content)
+                PromptValidationService.validate_prompt_template(template.template_content)
+            except PromptValidationError as e:
+                logger.error(f"Template de prompt {template.name} v{template.version} ignoré: {str(e)}")
+                continue
+            registered = RegisteredTemplate(
+                id=template.id,
+                name=template.name,
+                version=template.version,
+                updated_at=template.updated_at,
+                compiled=compiled
+            )
+            active[template.name] = registered
+            self._templates[(template.name, template.version)] = registered
+
+        self._active = active
+        if changed or len(active) != len(known):
+            logger.info(f"Templates de prompt rechargés ({len(changed)} modifié(s), {len(active)} actif(s))")
+
+
+prompt_registry = PromptTemplateRegistry()
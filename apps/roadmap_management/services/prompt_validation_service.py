@@ -1,8 +1,10 @@
 # apps/roadmap_management/services/prompt_validation_service.py
 
 from __future__ import annotations
-from typing import Dict, Any, Set, Optional, List, TYPE_CHECKING
+from typing import Dict, Any, FrozenSet, Set, Optional, List, Tuple, Union, TYPE_CHECKING
 from django.core.exceptions import ValidationError
+from functools import lru_cache
+import hashlib
 import logging
 import re
 from dataclasses import dataclass
@@ -10,6 +12,10 @@ from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# {var}, {var.champ} et {var[i].champ}
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)(?:\[(\d+)\])?(?:\.(\w+))?\}')
+_MISSING = object()
+
 class VariableType(Enum):
     """Types de variables supportés dans les templates"""
     STRING = "string"
@@ -32,6 +38,48 @@ class PromptValidationError(ValidationError):
     """Exception personnalisée pour les erreurs de validation de prompt"""
     pass
 
+@dataclass(frozen=True)
+class Placeholder:
+    """Emplacement d'une variable dans un template compilé"""
+    raw: str
+    name: str
+    index: Optional[int] = None
+    field: Optional[str] = None
+
+    def resolve(self, data: Dict[str, Any]) -> str:
+        """Valeur de la variable, ou le texte d'origine si elle n'est pas fournie."""
+        value = data.get(self.name, _MISSING)
+        if self.index is not None:
+            if self.field is None or not isinstance(value, (list, tuple)) or self.index >= len(value):
+                return self.raw
+            value = value[self.index]
+            return str(value[self.field]) if isinstance(value, dict) and self.field in value else self.raw
+        if self.field is not None:
+            return str(value[self.field]) if isinstance(value, dict) and self.field in value else self.raw
+        if value is _MISSING or isinstance(value, (list, tuple, dict)):
+            return self.raw
+        return str(value)
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    Template découpé une fois pour toutes en texte littéral et emplacements.
+
+    Le rendu parcourt les segments en une passe ; une valeur substituée n'est
+    jamais réinterprétée comme un emplacement.
+    """
+    hash: str
+    segments: Tuple[Union[str, Placeholder], ...]
+    variables: Dict[str, FrozenSet[str]]
+
+    def render(self, data: Dict[str, Any]) -> str:
+        return ''.join(
+            segment if isinstance(segment, str) else segment.resolve(data)
+            for segment in self.segments
+        )
+
+
 class PromptValidationService:
     """Service de validation des prompts et leurs variables"""
 
@@ -69,6 +117,13 @@ class PromptValidationService:
             type=VariableType.OBJECT,
             required=False,
             description='Métadonnées de génération'
+        ),
+        # Exigée par PromptTemplate.clean
+        'generation_date': VariableDefinition(
+            name='generation_date',
+            type=VariableType.STRING,
+            required=False,
+            description='Date de génération'
         )
     }
 
@@ -87,11 +142,11 @@ class PromptValidationService:
             PromptValidationError si le template n'est pas valide
         """
         try:
-            # Extraction des variables
-            variables = cls._extract_variables(template_content)
-            
-            # Validation des variables trouvées
-            cls._validate_variables(variables)
+            # Extraction et validation des variables (une fois par contenu, voir compile_template)
+            variables = {
+                name: set(fields)
+                for name, fields in cls.compile_template(template_content).variables.items()
+            }
             
             # Vérification des champs requis
             cls._validate_required_fields(variables)
@@ -163,28 +218,67 @@ class PromptValidationService:
         Raises:
             PromptValidationError en cas d'erreur
         """
-        try:
-            if safe_mode:
-                variables = cls._extract_variables(template)
-                cls.validate_variables_data(variables, data)
-
-            result = template
+        return cls.render_compiled(cls.compile_template(template), data, safe_mode)
 
-            # Substitution des variables
-            for var_name, var_data in data.items():
-                if isinstance(var_data, (list, tuple)):
-                    result = cls._substitute_array(result, var_name, var_data)
-                elif isinstance(var_data, dict):
-                    result = cls._substitute_object(result, var_name, var_data)
-                else:
-                    result = cls._substitute_simple(result, var_name, var_data)
+    @classmethod
+    def render_compiled(
+        cls,
+        compiled: CompiledTemplate,
+        data: Dict[str, Any],
+        safe_mode: bool = True
+    ) -> str:
+        """
+        Rend un template déjà compilé (voir compile_template).
 
-            return result
+        Raises:
+            PromptValidationError en cas d'erreur
+        """
+        try:
+            if safe_mode:
+                cls.validate_variables_data(
+                    {name: set(fields) for name, fields in compiled.variables.items()},
+                    data
+                )
+            return compiled.render(data)
 
         except Exception as e:
             logger.error(f"Erreur substitution: {str(e)}")
             raise PromptValidationError(f"Erreur substitution: {str(e)}")
 
+    @classmethod
+    @lru_cache(maxsize=256)
+    def compile_template(cls, template: str) -> CompiledTemplate:
+        """
+        Compile un template (mis en cache par contenu).
+
+        Les variables sont extraites et vérifiées ici, une seule fois par template.
+
+        Raises:
+            PromptValidationError si une variable n'est pas autorisée
+        """
+        variables = cls._extract_variables(template)
+        segments: List[Union[str, Placeholder]] = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            if match.start() > position:
+                segments.append(template[position:match.start()])
+            name, index, field = match.groups()
+            segments.append(Placeholder(
+                raw=match.group(0),
+                name=name,
+                index=int(index) if index is not None else None,
+                field=field
+            ))
+            position = match.end()
+        if position < len(template):
+            segments.append(template[position:])
+
+        return CompiledTemplate(
+            hash=hashlib.sha256(template.encode('utf-8')).hexdigest(),
+            segments=tuple(segments),
+            variables={name: frozenset(fields) for name, fields in variables.items()}
+        )
+
     @classmethod
     def _extract_variables(cls, content: str) -> Dict[str, Set[str]]:
         """Extrait les variables et leurs champs du contenu"""
@@ -274,31 +368,6 @@ class PromptValidationService:
                         f"Champ {field} manquant dans {var_name}"
                     )
 
-    @classmethod
-    def _substitute_array(cls, template: str, var_name: str, values: List[Any]) -> str:
-        """Remplace les variables de type tableau"""
-        result = template
-        for i, item in enumerate(values):
-            for key in item:
-                placeholder = f"{{{var_name}[{i}].{key}}}"
-                result = result.replace(placeholder, str(item[key]))
-        return result
-
-    @classmethod
-    def _substitute_object(cls, template: str, var_name: str, value: Dict[str, Any]) -> str:
-        """Remplace les variables de type objet"""
-        result = template
-        for key in value:
-            placeholder = f"{{{var_name}.{key}}}"
-            result = result.replace(placeholder, str(value[key]))
-        return result
-
-    @classmethod
-    def _substitute_simple(cls, template: str, var_name: str, value: Any) -> str:
-        """Remplace les variables simples"""
-        placeholder = f"{{{var_name}}}"
-        return template.replace(placeholder, str(value))
-
     @classmethod
     def get_template_info(cls) -> Dict[str, Dict[str, Any]]:
         """
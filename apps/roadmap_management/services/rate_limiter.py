@@ -0,0 +1,114 @@
+# apps/roadmap_management/services/rate_limiter.py
+
+from __future__ import annotations
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import random
+import time
+from django.conf import settings
+from django.core.cache import caches
+from apps.response_management.services.response_validation import ResponseValidator
+from .ai_settings import AIConfigurationTemplate
+
+logger = logging.getLogger(__name__)
+
+# Surcoût approximatif du format chat par message (rôle, séparateurs)
+TOKENS_PER_MESSAGE = 4
+
+
+class RateLimitWaitTimeout(Exception):
+    """La capacité RPM/TPM ne s'est pas libérée dans le délai d'attente maximal"""
+    pass
+
+
+class OpenAIRateLimiter:
+    """
+    Limiteur de débit RPM/TPM partagé par tous les workers.
+
+    Chaque modèle dispose de deux seaux (requêtes et tokens) stockés dans le
+    cache Django partagé et remplis à chaque début de minute. Une requête
+    réserve 1 requête et ses tokens estimés (prompt + max_tokens, comme le
+    compte OpenAI) ; s'il n'y a plus de capacité, l'appelant attend la minute
+    suivante au lieu d'envoyer une requête vouée au 429.
+    """
+
+    WINDOW = 60
+
+    def __init__(self, alias: Optional[str] = None, max_wait: Optional[float] = None):
+        self.cache = caches[alias or settings.OPENAI_RATE_LIMIT_CACHE_ALIAS]
+        self.max_wait = max_wait if max_wait is not None else settings.OPENAI_RATE_LIMIT_MAX_WAIT
+        self._disabled = False
+
+    @staticmethod
+    def limits_for(model: str) -> Dict[str, int]:
+        model_config = AIConfigurationTemplate.SUPPORTED_MODELS.get(model)
+        if model_config is None:
+            return {'rpm': 0, 'tpm': 0}
+        return model_config.rate_limits(model)
+
+    @staticmethod
+    def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int, model: str) -> int:
+        """Tokens décomptés par OpenAI pour une requête : messages + max_tokens."""
+        contents = [message.get('content') or '' for message in messages]
+        try:
+            prompt_tokens = sum(ResponseValidator.estimate_tokens_batch(contents, model))
+        except Exception:
+            prompt_tokens = sum(len(content) // 4 for content in contents)
+        return prompt_tokens + TOKENS_PER_MESSAGE * len(messages) + int(max_tokens or 0)
+
+    async def acquire(self, model: str, tokens: int) -> float:
+        """
+        Réserve la capacité d'une requête, en attendant si nécessaire.
+
+        Args:
+            model: Modèle appelé
+            tokens: Tokens estimés de la requête
+
+        Returns:
+            Temps d'attente en secondes
+
+        Raises:
+            RateLimitWaitTimeout: Si l'attente dépasse max_wait
+        """
+        limits = self.limits_for(model)
+        if self._disabled or (not limits['rpm'] and not limits['tpm']):
+            return 0.0
+
+        started = time.monotonic()
+        while True:
+            window = int(time.time() // self.WINDOW)
+            try:
+                if await self._reserve(model, window, tokens, limits):
+                    return time.monotonic() - started
+            except ValueError as e:
+                # Backend sans incr atomique (DummyCache) : on ne limite pas
+                logger.warning(f"Limiteur de débit désactivé, cache {self.cache.__class__.__name__} inadapté ({e})")
+                self._disabled = True
+                return 0.0
+
+            wait = (window + 1) * self.WINDOW - time.time() + random.uniform(0, 1)
+            if time.monotonic() - started + wait > self.max_wait:
+                raise RateLimitWaitTimeout(
+                    f"Capacité {model} indisponible après {self.max_wait:.0f}s d'attente"
+                )
+            logger.info(f"Limite de débit {model} atteinte, attente de {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    async def _reserve(self, model: str, window: int, tokens: int, limits: Dict[str, int]) -> bool:
+        requests_key = f"ai_ratelimit:{model}:rpm:{window}"
+        tokens_key = f"ai_ratelimit:{model}:tpm:{window}"
+
+        await self.cache.aadd(requests_key, 0, timeout=self.WINDOW * 2)
+        await self.cache.aadd(tokens_key, 0, timeout=self.WINDOW * 2)
+        used_requests = await self.cache.aincr(requests_key, 1)
+        used_tokens = await self.cache.aincr(tokens_key, tokens)
+
+        over_rpm = limits['rpm'] and used_requests > limits['rpm']
+        # Une requête seule plus grosse que le seau passe dans une minute vide
+        over_tpm = limits['tpm'] and used_tokens > limits['tpm'] and used_tokens != tokens
+        if over_rpm or over_tpm:
+            await self.cache.adecr(requests_key, 1)
+            await self.cache.adecr(tokens_key, tokens)
+            return False
+        return True
@@ -0,0 +1,246 @@
+# apps/roadmap_management/services/resilience.py
+
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+import asyncio
+import logging
+import random
+import threading
+import time
+from django.conf import settings
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Le circuit du modèle est ouvert : l'appel est refusé sans contacter l'API"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Circuit ouvert pour {name} (nouvel essai dans {retry_in:.0f}s)")
+
+
+@dataclass
+class RetryPolicy:
+    """Backoff exponentiel avec jitter complet"""
+    max_retries: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    @classmethod
+    def from_settings(cls) -> 'RetryPolicy':
+        return cls(
+            max_retries=settings.OPENAI_RETRY_MAX_RETRIES,
+            base_delay=settings.OPENAI_RETRY_BASE_DELAY,
+            max_delay=settings.OPENAI_RETRY_MAX_DELAY
+        )
+
+    def delay_for(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """
+        Délai avant la tentative suivante.
+
+        Args:
+            retry: Numéro de la relance (0 pour la première)
+            retry_after: Délai imposé par l'API (en-tête Retry-After)
+        """
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** retry))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur à trois états (CLOSED, OPEN, HALF_OPEN).
+
+    Après `failure_threshold` échecs consécutifs de l'API, le circuit s'ouvre
+    et les appels échouent immédiatement pendant `recovery_timeout` secondes ;
+    un seul appel d'essai est ensuite autorisé pour refermer le circuit.
+    """
+
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indique si un appel peut partir vers l'API."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def release_probe(self) -> None:
+        """Libère l'appel d'essai sans conclure (appel annulé)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} refermé")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit {self.name} ouvert après {self.failures} échec(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'state': self.state, 'failures': self.failures}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model: str) -> CircuitBreaker:
+    """Disjoncteur du modèle, partagé par tout le processus."""
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                model,
+                failure_threshold=settings.OPENAI_CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=settings.OPENAI_CIRCUIT_RECOVERY_TIMEOUT
+            )
+            _breakers[model] = breaker
+        return breaker
+
+
+def circuit_snapshots() -> Dict[str, Dict[str, Any]]:
+    """État des disjoncteurs du processus, par modèle."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Erreurs transitoires : réseau, timeout, 408/409/429 et 5xx."""
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Lit retry-after-ms / Retry-After (secondes ou date HTTP) dans la réponse."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return parsedate_to_datetime(retry_after).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    policy: Optional[RetryPolicy] = None,
+    timeout: Optional[float] = None
+) -> Tuple[T, int]:
+    """
+    Exécute `call` avec relances et disjoncteur.
+
+    Args:
+        call: Appel à l'API
+        breaker: Disjoncteur du modèle
+        policy: Politique de relance (RetryPolicy.from_settings par défaut)
+        timeout: Délai de chaque tentative, sans les attentes entre relances
+
+    Returns:
+        Le résultat de l'appel et le nombre de relances effectuées
+
+    Raises:
+        CircuitOpenError: Si le circuit est ouvert
+        asyncio.TimeoutError: Si une tentative dépasse `timeout` (pas de relance)
+        L'erreur de l'API si elle n'est pas transitoire ou si les relances
+        sont épuisées (l'attribut `retries` y est ajouté)
+    """
+    policy = policy or RetryPolicy.from_settings()
+    retries = 0
+
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(breaker.name, breaker.retry_in())
+
+        try:
+            result = await asyncio.wait_for(call(), timeout) if timeout else await call()
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            # Lenteur, pas une panne : l'appelant décide de la bascule
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                # L'API a répondu : l'erreur vient de la requête, pas de l'amont
+                breaker.record_success()
+                e.retries = retries
+                raise
+            breaker.record_failure()
+            if retries >= policy.max_retries:
+                e.retries = retries
+                raise
+            delay = policy.delay_for(retries, retry_after_seconds(e))
+            retries += 1
+            logger.warning(
+                f"Erreur transitoire OpenAI ({breaker.name}), relance {retries}/{policy.max_retries} "
+                f"dans {delay:.1f}s: {str(e)}"
+            )
+            await asyncio.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result, retries
@@ -0,0 +1,218 @@
+# apps/roadmap_management/services/section_generation.py
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+import asyncio
+import hashlib
+import json
+import logging
+from django.utils import timezone
+from .ai_service import RoadmapAIService
+from .profile_index import ProfileMatch
+if TYPE_CHECKING:
+    from apps.roadmap_management.models import Roadmaps
+
+logger = logging.getLogger(__name__)
+
+# Catégorie des questions sans catégorie
+DEFAULT_CATEGORY = "general"
+
+
+class SectionedRoadmapService:
+    """
+    Génération d'une roadmap par sections, une par catégorie de questions.
+
+    Chaque section est rattachée à l'empreinte des réponses qui l'alimentent,
+    du template de prompt, du modèle et de la température demandés. À la
+    régénération, seules les sections dont l'empreinte a changé repassent par
+    l'API ; les autres sont réutilisées telles quelles depuis RoadmapSection.
+    """
+
+    def __init__(self, ai_service: Optional[RoadmapAIService] = None):
+        self.ai_service = ai_service or RoadmapAIService()
+
+    @staticmethod
+    def split_by_category(structured_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Découpe les données structurées en une entrée par catégorie répondue.
+
+        Returns:
+            Données de chaque section, dans l'ordre d'apparition des catégories
+        """
+        sections: Dict[str, Dict[str, Any]] = {}
+        for response in structured_data.get("user_responses", []):
+            category = response.get("category") or DEFAULT_CATEGORY
+            section = sections.setdefault(category, {
+                "user_info": structured_data.get("user_info", {}),
+                "category": category,
+                "user_responses": [],
+                "unanswered_questions": []
+            })
+            section["user_responses"].append(response)
+
+        for question in structured_data.get("unanswered_questions", []):
+            category = question.get("category") or DEFAULT_CATEGORY
+            if category in sections:
+                sections[category]["unanswered_questions"].append(question)
+        return sections
+
+    @staticmethod
+    def input_hash(
+        section_data: Dict[str, Any],
+        ai_config: Dict[str, Any],
+        prompt_version: Optional[str] = None
+    ) -> str:
+        """
+        Empreinte des entrées d'une section.
+
+        Le template est identifié par sa version (RegisteredTemplate.fingerprint)
+        plutôt que par le prompt rendu, qui contient les réponses de toutes les
+        catégories : une section n'est pas régénérée quand une autre change.
+        """
+        payload = {
+            "responses": sorted(
+                ({"question_id": r["question_id"], "answer": r.get("answer")} for r in section_data["user_responses"]),
+                key=lambda response: response["question_id"]
+            ),
+            "model": ai_config.get("model"),
+            "temperature": ai_config.get("temperature"),
+            "prompt_version": prompt_version
+        }
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def section_prompt(prompt: str, category: str) -> str:
+        return (
+            f"{prompt}\n\n"
+            f"Rédige uniquement la section « {category} » de la roadmap, "
+            f"à partir des réponses de cette catégorie."
+        )
+
+    async def generate(
+        self,
+        roadmap: 'Roadmaps',
+        prompt: str,
+        structured_data: Dict[str, Any],
+        force: bool = False,
+        reference: Optional[ProfileMatch] = None,
+        prompt_version: Optional[str] = None,
+        **ai_config: Any
+    ) -> Dict[str, Any]:
+        """
+        Génère les sections modifiées et assemble la roadmap complète.
+
+        Args:
+            roadmap: Roadmap dont les sections sont mises à jour
+            prompt: Prompt préparé
+            structured_data: Données structurées complètes
+            force: Régénère toutes les sections
+            reference: Roadmap d'un profil similaire dont les sections de même
+                catégorie servent de point de départ aux sections régénérées
+            prompt_version: Version du template ayant produit le prompt
+            **ai_config: Configuration IA transmise à chaque génération
+
+        Returns:
+            Dict contenant le contenu assemblé et les métadonnées agrégées
+
+        Raises:
+            ValidationError: Si une section n'a pas pu être générée (les
+            sections réussies sont conservées pour la tentative suivante)
+        """
+        from apps.roadmap_management.models import RoadmapSection
+
+        sections = self.split_by_category(structured_data)
+        if not sections:
+            # Aucune réponse à répartir : génération d'un seul tenant
+            await RoadmapSection.objects.filter(roadmap=roadmap).adelete()
+            return await self.ai_service.generate_roadmap(
+                prompt,
+                structured_data,
+                reference=reference.reference_for() if reference else None,
+                **ai_config
+            )
+
+        existing = {
+            section.category: section
+            async for section in RoadmapSection.objects.filter(roadmap=roadmap)
+        }
+        hashes = {
+            category: self.input_hash(data, ai_config, prompt_version) for category, data in sections.items()
+        }
+        stale = [
+            category for category in sections
+            if force or category not in existing or existing[category].input_hash != hashes[category]
+        ]
+
+        results = await asyncio.gather(
+            *(
+                self.ai_service.generate_roadmap(
+                    self.section_prompt(prompt, category),
+                    sections[category],
+                    reference=reference.reference_for(category) if reference else None,
+                    **ai_config
+                )
+                for category in stale
+            ),
+            return_exceptions=True
+        )
+
+        generated: Dict[str, Dict[str, Any]] = {}
+        errors: List[BaseException] = []
+        for category, result in zip(stale, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Échec de la section {category} de la roadmap {roadmap.id}: {str(result)}")
+                errors.append(result)
+                continue
+            generated[category] = result
+            existing[category], _ = await RoadmapSection.objects.aupdate_or_create(
+                roadmap=roadmap,
+                category=category,
+                defaults={
+                    "content": result["content"],
+                    "input_hash": hashes[category],
+                    "model": result["metadata"]["model"],
+                    "token_count": result["metadata"].get("token_count"),
+                    "generated_at": timezone.now()
+                }
+            )
+
+        if errors:
+            raise errors[0]
+
+        # Catégories sans réponse désormais : leur section disparaît
+        await RoadmapSection.objects.filter(roadmap=roadmap).exclude(category__in=list(sections)).adelete()
+        for position, category in enumerate(sections):
+            if existing[category].position != position:
+                existing[category].position = position
+                await existing[category].asave(update_fields=['position'])
+
+        content = "\n\n".join(
+            f"## {category}\n\n{existing[category].content}" for category in sections
+        )
+        metadata = self._aggregate_metadata(generated, [existing[category] for category in sections])
+        return {"content": content, "metadata": metadata}
+
+    @staticmethod
+    def _aggregate_metadata(generated: Dict[str, Dict[str, Any]], sections: List[Any]) -> Dict[str, Any]:
+        metadata = [result["metadata"] for result in generated.values()]
+        models = sorted({section.model for section in sections})
+        return {
+            # Modèle le plus utilisé parmi les sections de la roadmap
+            "model": max(models, key=lambda model: sum(section.model == model for section in sections)),
+            "models": models,
+            "temperature": metadata[0]["temperature"] if metadata else None,
+            "max_tokens": metadata[0]["max_tokens"] if metadata else None,
+            "token_count": sum(item.get("token_count") or 0 for item in metadata),
+            "prompt_tokens": sum(item.get("prompt_tokens") or 0 for item in metadata),
+            "completion_tokens": sum(item.get("completion_tokens") or 0 for item in metadata),
+            # Les sections sont générées en parallèle
+            "generation_time": max((item.get("generation_time") or 0 for item in metadata), default=0.0),
+            "finish_reason": "length" if any(item.get("finish_reason") == "length" for item in metadata) else "stop",
+            "cached": all(item.get("cached") for item in metadata) if metadata else True,
+            "retries": sum(item.get("retries", 0) for item in metadata),
+            "sections": {
+                "regenerated": list(generated),
+                "reused": [section.category for section in sections if section.category not in generated]
+            }
+        }
@@ -1,3 +1,926 @@
-from django.test import TestCase
+from django.conf import settings
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from apps.user_management.models import Users
+from apps.roadmap_management.models import Roadmaps, GenerationJob, GenerationHistory, AIConfiguration
+from apps.roadmap_management.services.generation_jobs import GenerationJobService
 
-# Create your tests here.
+# Cache partagé réel (LocMem) : les settings de dev utilisent DummyCache pour 'default'
+SHARED_CACHES = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+class FakePreparationService:
+    async def prepare_complete_generation_data(self, temp_responses, user):
+        return {"prompt": "Prompt de test", "data": {"user_responses": []}}
+
+
+class FakeRoadmapAIService:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def generate_roadmap(self, prompt, structured_data, **config):
+        if self.error:
+            raise self.error
+        return {
+            "content": "Roadmap générée",
+            "metadata": {
+                "model": "gpt-4",
+                "temperature": 0.5,
+                "max_tokens": 2000,
+                "token_count": 42,
+                "generation_time": 1.5,
+                "finish_reason": "stop"
+            }
+        }
+
+
+class GenerationJobServiceTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(email="worker@test.fr", username="worker")
+        self.roadmap = Roadmaps.objects.create(user=self.user, title="Roadmap")
+
+    def test_enqueue_marks_roadmap_generating(self):
+        job = GenerationJobService.enqueue(self.roadmap, self.user, {"q1": "réponse"})
+
+        self.roadmap.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertEqual(self.roadmap.status, 'GENERATING')
+        self.assertFalse(self.roadmap.can_generate())
+
+    def test_claim_jobs_locks_each_job_once(self):
+        GenerationJobService.enqueue(self.roadmap, self.user, {"q1": "réponse"})
+
+        claimed = GenerationJobService.claim_jobs("worker-1", 5)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0].status, 'RUNNING')
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(GenerationJobService.claim_jobs("worker-2", 5), [])
+
+    def test_concurrent_enqueue_attaches_to_in_flight_job(self):
+        from apps.roadmap_management.services.generation_jobs import GenerationInProgress
+
+        first, created = GenerationJobService.enqueue_or_attach(self.roadmap, self.user, {"q1": "réponse"})
+        second, attached_created = GenerationJobService.enqueue_or_attach(self.roadmap, self.user, {"q1": "autre"})
+
+        self.assertTrue(created)
+        self.assertFalse(attached_created)
+        self.assertEqual(str(first.id), second.id)
+        self.assertEqual(GenerationJob.objects.filter(roadmap=self.roadmap).count(), 1)
+
+        # Génération en streaming (sans tâche) : le bail bloque toute nouvelle génération
+        other = Roadmaps.objects.create(user=self.user, title="Streaming")
+        self.assertTrue(GenerationJobService.acquire_lease(other))
+        self.assertFalse(GenerationJobService.acquire_lease(other))
+        with self.assertRaises(GenerationInProgress):
+            GenerationJobService.enqueue_or_attach(other, self.user, {"q1": "réponse"})
+
+    def test_expired_lease_can_be_taken_over(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        Roadmaps.objects.filter(pk=self.roadmap.pk).update(
+            status='GENERATING',
+            generation_lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.roadmap.refresh_from_db()
+
+        self.assertTrue(self.roadmap.can_generate())
+        self.assertTrue(GenerationJobService.acquire_lease(self.roadmap))
+        self.assertFalse(self.roadmap.can_generate())
+
+    async def test_run_job_records_result(self):
+        job = await self._claimed_job()
+
+        await GenerationJobService.run_job(
+            job,
+            ai_service=FakeRoadmapAIService(),
+            preparation_service=FakePreparationService()
+        )
+
+        roadmap = await Roadmaps.objects.aget(pk=self.roadmap.pk)
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertEqual(roadmap.status, 'COMPLETED')
+        self.assertEqual(roadmap.content, "Roadmap générée")
+        config = await AIConfiguration.objects.aget(roadmap=roadmap)
+        self.assertTrue(config.is_successful)
+        self.assertEqual(config.token_count, 42)
+        history = await GenerationHistory.objects.aget(roadmap=roadmap)
+        self.assertTrue(history.success)
+        self.assertEqual((history.model, history.token_count, history.finish_reason), ("gpt-4", 42, "stop"))
+
+    async def test_run_job_failure_is_retried_then_recorded(self):
+        job = await self._claimed_job()
+        job.max_attempts = 1
+
+        await GenerationJobService.run_job(
+            job,
+            ai_service=FakeRoadmapAIService(error=RuntimeError("API indisponible")),
+            preparation_service=FakePreparationService()
+        )
+
+        roadmap = await Roadmaps.objects.aget(pk=self.roadmap.pk)
+        self.assertEqual(job.status, 'FAILED')
+        self.assertEqual(roadmap.status, 'ERROR')
+        config = await AIConfiguration.objects.aget(roadmap=roadmap)
+        self.assertFalse(config.is_successful)
+        self.assertIn("API indisponible", config.error_message)
+        history = await GenerationHistory.objects.aget(roadmap=roadmap)
+        self.assertFalse(history.success)
+        self.assertIn("API indisponible", history.error_message)
+
+    async def _claimed_job(self):
+        from asgiref.sync import sync_to_async
+        await sync_to_async(GenerationJobService.enqueue)(self.roadmap, self.user, {"q1": "réponse"})
+        jobs = await sync_to_async(GenerationJobService.claim_jobs)("worker-1", 1)
+        return jobs[0]
+
+
+class RoadmapGenerationViewTest(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from apps.question_handling.models import Questions
+        from apps.question_handling.questionnaire_cache import questionnaire_cache
+        from apps.response_management.models import ResponseDraft
+
+        user = Users.objects.create(email="vue@test.fr", username="vue")
+        question = Questions.objects.create(text="Objectif", type="TEXT", order_num=1, configuration={})
+        ResponseDraft.objects.create(user=user, question=question, answer="Devenir développeur backend")
+        questionnaire_cache.bump_version()
+        # Utilisateur relu en base, comme celui de l'authentification
+        self.user = Users.objects.get(pk=user.pk)
+        self.roadmap = Roadmaps.objects.create(user=self.user, title="Roadmap", status='DRAFT')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post(self, action):
+        from django.urls import reverse
+        return self.client.post(reverse(f'roadmaps-{action}', args=[self.roadmap.id]), {}, format='json')
+
+    def test_generate_enqueues_a_job_and_attaches_concurrent_calls(self):
+        response = self._post('generate')
+
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertFalse(response.data["attached"])
+        job = GenerationJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual((job.roadmap_id, job.kind, job.status), (str(self.roadmap.id), 'GENERATE', 'PENDING'))
+
+        again = self._post('generate')
+        self.assertEqual(again.status_code, 202)
+        self.assertTrue(again.data["attached"])
+        self.assertEqual(GenerationJob.objects.filter(roadmap=self.roadmap).count(), 1)
+
+    def test_stream_request_under_wsgi_is_queued(self):
+        from django.urls import reverse
+
+        url = reverse('roadmaps-generate', args=[self.roadmap.id]) + "?stream=1"
+        response = self.client.post(url, {}, format='json')
+
+        # Sous WSGI le flux ne partirait qu'une fois la génération terminée
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual(GenerationJob.objects.get(pk=response.data["job_id"]).status, 'PENDING')
+
+    async def test_stream_under_asgi_sends_tokens_before_the_generation_ends(self):
+        from django.test import AsyncClient
+        from django.urls import reverse
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        client = AsyncClient()
+        token = AccessToken.for_user(self.user)
+        url = reverse('roadmaps-generate', args=[self.roadmap.id]) + "?stream=1"
+        with override_settings(
+            OPENAI_API_TYPE='stub', OPENAI_API_KEY=None, OPENAI_STUB_LATENCY_MEDIAN=0,
+            OPENAI_STUB_COMPLETION_TOKENS=20, AI_COMPLETION_CACHE_ENABLED=False
+        ):
+            response = await client.post(
+                url, {}, content_type='application/json', headers={"Authorization": f"Bearer {token}"}
+            )
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            events = aiter(response.streaming_content)
+            first = (await anext(events)).decode()
+
+            # Premier événement reçu alors que la génération n'est pas terminée
+            self.assertTrue(first.startswith("event: token\n"))
+            roadmap = await Roadmaps.objects.aget(pk=self.roadmap.pk)
+            self.assertEqual(roadmap.status, 'GENERATING')
+
+            rest = [chunk.decode() async for chunk in events]
+        self.assertTrue(rest[-1].startswith("event: done\n"))
+        self.assertEqual((await Roadmaps.objects.aget(pk=self.roadmap.pk)).status, 'COMPLETED')
+        self.assertFalse(await GenerationJob.objects.filter(roadmap_id=self.roadmap.pk).aexists())
+
+    def test_regenerate_enqueues_a_regeneration_job(self):
+        response = self._post('regenerate')
+
+        self.assertEqual(response.status_code, 202, response.data)
+        job = GenerationJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual((job.roadmap_id, job.kind), (str(self.roadmap.id), 'REGENERATE'))
+
+
+class CompletionCacheTest(TestCase):
+    messages = [{"role": "user", "content": "Roadmap Python"}]
+    config = {"model": "gpt-4", "temperature": 0.5, "max_tokens": 2000}
+
+    def setUp(self):
+        from django.core.cache import caches
+        caches['ai_completions'].clear()
+
+    def test_key_is_stable_and_sensitive_to_parameters(self):
+        from apps.roadmap_management.services.completion_cache import CompletionCache
+
+        key = CompletionCache.make_key(self.messages, self.config)
+        self.assertEqual(key, CompletionCache.make_key(list(self.messages), dict(reversed(self.config.items()))))
+        self.assertNotEqual(key, CompletionCache.make_key(self.messages, {**self.config, "temperature": 0.6}))
+        self.assertNotEqual(key, CompletionCache.make_key(self.messages, {**self.config, "presence_penalty": 1}))
+
+    def test_generation_key_ignores_volatile_fields(self):
+        from apps.roadmap_management.services.ai_service import RoadmapAIService
+
+        def data(roadmaps_generated, last_activity, answer):
+            return {
+                "user_info": {"username": "alice", "profile": {
+                    "roadmaps_generated": roadmaps_generated, "last_activity": last_activity
+                }},
+                "user_responses": [{"question_id": "q1", "type": "TEXT", "answer": answer}],
+                "metadata": {"user_context": {"activity_level": "Actif"}}
+            }
+
+        service = RoadmapAIService()
+        key = service._completion_key("Roadmap", data(1, "2026-10-17T08:00:00", "Python"), None, self.config)
+        self.assertEqual(
+            key,
+            service._completion_key("Roadmap", data(2, "2026-10-18T09:30:00", "Python"), None, self.config)
+        )
+        self.assertNotEqual(
+            key,
+            service._completion_key("Roadmap", data(1, "2026-10-17T08:00:00", "Go"), None, self.config)
+        )
+        # Une date saisie par l'utilisateur fait partie de la demande
+        self.assertNotEqual(
+            service._completion_key("Disponible le 2026-11-02", data(1, None, "Python"), None, self.config),
+            service._completion_key("Disponible le 2027-01-04", data(1, None, "Python"), None, self.config)
+        )
+
+    async def test_generate_completion_uses_cache_unless_bypassed(self):
+        from apps.roadmap_management.services.ai_service import AIService
+
+        class CountingAIService(AIService):
+            calls = 0
+
+            async def _request_completion(self, messages, config, deadline=None):
+                type(self).calls += 1
+                return {"content": f"variante {self.calls}", "model": config["model"]}
+
+        service = CountingAIService()
+        first = await service.generate_completion(self.messages, self.config)
+        second = await service.generate_completion(self.messages, self.config)
+        fresh = await service.generate_completion(self.messages, self.config, use_cache=False)
+
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["content"], "variante 1")
+        self.assertEqual(fresh["content"], "variante 2")
+        stats = await service.completion_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class ResilienceTest(TestCase):
+    def _rate_limit_error(self, retry_after="0"):
+        import httpx
+        from openai import RateLimitError
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+        return RateLimitError("Rate limit", response=response, body=None)
+
+    async def test_transient_errors_are_retried(self):
+        from apps.roadmap_management.services.resilience import CircuitBreaker, RetryPolicy, call_with_retries
+
+        errors = [self._rate_limit_error(), self._rate_limit_error()]
+
+        async def call():
+            if errors:
+                raise errors.pop()
+            return "ok"
+
+        result, retries = await call_with_retries(call, CircuitBreaker("gpt-4"), RetryPolicy(max_retries=3))
+        self.assertEqual((result, retries), ("ok", 2))
+
+    def test_retry_after_header_is_honored(self):
+        from apps.roadmap_management.services.resilience import RetryPolicy, retry_after_seconds
+
+        delay = retry_after_seconds(self._rate_limit_error(retry_after="7"))
+        self.assertEqual(delay, 7.0)
+        self.assertEqual(RetryPolicy(max_delay=5).delay_for(0, delay), 5)
+
+    async def test_circuit_opens_and_fails_fast(self):
+        from apps.roadmap_management.services.resilience import (
+            CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retries
+        )
+
+        breaker = CircuitBreaker("gpt-4", failure_threshold=2, recovery_timeout=60)
+        calls = []
+
+        async def failing_call():
+            calls.append(1)
+            raise self._rate_limit_error()
+
+        with self.assertRaises(Exception):
+            await call_with_retries(failing_call, breaker, RetryPolicy(max_retries=5))
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(len(calls), 2)
+
+        with self.assertRaises(CircuitOpenError):
+            await call_with_retries(failing_call, breaker)
+        self.assertEqual(len(calls), 2)
+
+
+class RateLimiterTest(TestCase):
+    def setUp(self):
+        from django.core.cache import caches
+        caches[settings.OPENAI_RATE_LIMIT_CACHE_ALIAS].clear()
+
+    async def test_caller_waits_when_bucket_is_empty(self):
+        from unittest import mock
+        from apps.roadmap_management.services.rate_limiter import OpenAIRateLimiter, RateLimitWaitTimeout
+
+        limiter = OpenAIRateLimiter(max_wait=0)
+        with mock.patch.object(OpenAIRateLimiter, 'limits_for', return_value={'rpm': 2, 'tpm': 1000}):
+            self.assertLess(await limiter.acquire('gpt-4', 400), 1)
+            with self.assertRaises(RateLimitWaitTimeout):
+                await limiter.acquire('gpt-4', 700)
+            # La réservation refusée est rendue au seau
+            await limiter.acquire('gpt-4', 600)
+            with self.assertRaises(RateLimitWaitTimeout):
+                await limiter.acquire('gpt-4', 1)
+
+    def test_estimate_includes_completion_budget(self):
+        from apps.roadmap_management.services.rate_limiter import OpenAIRateLimiter
+
+        tokens = OpenAIRateLimiter.estimate_request_tokens([{"role": "user", "content": "Bonjour"}], 100, 'gpt-4')
+        self.assertGreater(tokens, 100)
+
+
+class PromptBudgetTest(TestCase):
+    def _structured_data(self):
+        return {
+            "user_info": {"username": "alice"},
+            "user_responses": [
+                {"question_id": "1", "type": "TEXT", "answer": "projet " * 3000},
+                {"question_id": "2", "type": "MULTIPLE_CHOICE", "answer": ["Python"]},
+            ],
+            "unanswered_questions": [{"question_id": str(i)} for i in range(3, 40)],
+            "metadata": {"categories": {"backend"}},
+        }
+
+    def test_low_priority_data_is_condensed_to_fit(self):
+        from apps.roadmap_management.services.ai_service import RoadmapAIService
+
+        service = RoadmapAIService(settings_service=object())
+        data = self._structured_data()
+        config = {"model": "gpt-4", "max_tokens": 2000, "context_window": 3000}
+
+        messages, plan = service._fit_messages("Prompt", data, config)
+
+        self.assertLessEqual(plan.prompt_tokens, plan.prompt_budget)
+        self.assertGreater(plan.original_prompt_tokens, plan.prompt_budget)
+        self.assertIn("text_answers:512", plan.trimmed)
+        self.assertIn("Python", messages[-1]["content"])
+        # Les données de l'appelant ne sont pas modifiées
+        self.assertEqual(data["user_responses"][0]["answer"], "projet " * 3000)
+
+    def test_oversized_prompt_is_rejected_before_sending(self):
+        from apps.roadmap_management.services.prompt_budget import PromptBudgeter, PromptBudgetExceeded
+
+        data = self._structured_data()
+        data["user_responses"][1]["answer"] = ["Python " * 3000]
+        budgeter = PromptBudgeter("gpt-4", 2000, context_window=2500)
+        with self.assertRaises(PromptBudgetExceeded):
+            budgeter.fit(data, lambda d: [{"role": "user", "content": str(d)}])
+
+
+class ModelRoutingTest(TestCase):
+    def test_simple_questionnaires_go_to_the_simple_model(self):
+        from apps.roadmap_management.services.model_router import ModelRouter
+
+        router = ModelRouter()
+        simple = router.route({"technical_precision": 0.0, "response_complexity": 2}, "gpt-4")
+        complex_ = router.route({"technical_precision": 0.8, "response_complexity": 2}, "gpt-4")
+        requested = router.route({"technical_precision": 0.0, "response_complexity": 2}, "gpt-4", "gpt-4-turbo")
+
+        self.assertEqual((simple.model, simple.reason), ("gpt-3.5-turbo", "simple_context"))
+        self.assertEqual((complex_.model, complex_.fallback_model), ("gpt-4", "gpt-3.5-turbo"))
+        self.assertEqual((requested.model, requested.reason), ("gpt-4-turbo", "requested"))
+
+    async def test_open_circuit_falls_back_and_is_recorded(self):
+        from apps.roadmap_management.services.ai_service import (
+            AIService, OpenAICircuitOpenError, RoadmapAIService
+        )
+
+        class FlakyAIService(AIService):
+            async def generate_completion(self, messages, config, use_cache=True, cache_key=None, deadline=None):
+                if config["model"] == "gpt-4":
+                    raise OpenAICircuitOpenError("Circuit ouvert", model="gpt-4")
+                return {
+                    "content": "roadmap", "model": config["model"], "token_count": 10,
+                    "generation_time": 0.1, "finish_reason": "stop"
+                }
+
+        service = RoadmapAIService(ai_service=FlakyAIService())
+        data = {"user_responses": [{"answer": "software engineering"}]}
+        result = await service.generate_roadmap("Prompt", data, max_tokens=1000)
+
+        routing = result["metadata"]["routing"]
+        self.assertEqual(result["metadata"]["model"], "gpt-3.5-turbo")
+        self.assertEqual((routing["model"], routing["fallback_used"]), ("gpt-4", True))
+        self.assertEqual(routing["fallback_reason"], "circuit_open")
+
+    async def test_deadline_applies_to_each_attempt_not_to_the_rate_limit_wait(self):
+        import asyncio
+        from types import SimpleNamespace
+        from apps.roadmap_management.services.ai_service import AIService, RoadmapAIService
+
+        class FakeCompletions:
+            def __init__(self, slow_model):
+                self.slow_model = slow_model
+
+            async def create(self, model, **kwargs):
+                await asyncio.sleep(0.5 if model == self.slow_model else 0)
+                return SimpleNamespace(
+                    choices=[SimpleNamespace(message=SimpleNamespace(content=model), finish_reason="stop")],
+                    usage=SimpleNamespace(total_tokens=10, prompt_tokens=6, completion_tokens=4)
+                )
+
+        class ThrottledAIService(AIService):
+            def __init__(self, slow_model=None):
+                super().__init__()
+                self.fake_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(slow_model)))
+
+            @property
+            def client(self):
+                return self.fake_client
+
+            async def _acquire_capacity(self, messages, config):
+                # Attente du limiteur de débit plus longue que le délai de routage
+                await asyncio.sleep(0.3)
+                return 0.3
+
+        data = {"user_responses": [{"answer": "software engineering"}]}
+        with override_settings(AI_ROUTING_DEADLINE=0.2):
+            waited = await RoadmapAIService(ai_service=ThrottledAIService()).generate_roadmap(
+                "Prompt", data, max_tokens=1000, use_cache=False
+            )
+            slow = await RoadmapAIService(ai_service=ThrottledAIService(slow_model="gpt-4")).generate_roadmap(
+                "Prompt", data, max_tokens=1000, use_cache=False
+            )
+
+        self.assertEqual(waited["content"], "gpt-4")
+        self.assertFalse(waited["metadata"]["routing"]["fallback_used"])
+        self.assertEqual(slow["content"], "gpt-3.5-turbo")
+        self.assertEqual(slow["metadata"]["routing"]["fallback_reason"], "deadline")
+
+
+class StubBackendTest(TestCase):
+    def setUp(self):
+        from apps.question_handling.models import Questions
+        from apps.question_handling.questionnaire_cache import questionnaire_cache
+        self.addCleanup(questionnaire_cache.clear)
+        self.user = Users.objects.create(email="charge@test.fr", username="charge")
+        self.roadmap = Roadmaps.objects.create(user=self.user, title="Roadmap")
+        self.question = Questions.objects.create(
+            text="Quel est votre objectif ?", type="TEXT", order_num=1, configuration={}
+        )
+
+    async def test_generation_runs_end_to_end_without_network(self):
+        from asgiref.sync import sync_to_async
+        from django.test import override_settings
+
+        temp_responses = {str(self.question.id): {"answer": "Devenir développeur backend", "user_id": str(self.user.id)}}
+        with override_settings(
+            OPENAI_API_TYPE='stub', OPENAI_API_KEY=None, OPENAI_STUB_LATENCY_MEDIAN=0,
+            OPENAI_STUB_COMPLETION_TOKENS=20, AI_COMPLETION_CACHE_ENABLED=False
+        ):
+            await sync_to_async(GenerationJobService.enqueue)(self.roadmap, self.user, temp_responses)
+            job = (await sync_to_async(GenerationJobService.claim_jobs)("stub-worker", 1))[0]
+            await GenerationJobService.run_job(job)
+
+        roadmap = await Roadmaps.objects.aget(pk=self.roadmap.pk)
+        self.assertEqual(job.status, 'SUCCEEDED', job.error_message)
+        self.assertEqual(roadmap.status, 'COMPLETED')
+        self.assertTrue(roadmap.content)
+
+    async def test_streaming_takes_the_lease_when_the_stream_starts(self):
+        from types import SimpleNamespace
+        from asgiref.sync import sync_to_async
+        from django.test import override_settings
+        from apps.roadmap_management.views import RoadmapViewSet
+
+        temp_responses = {str(self.question.id): {"answer": "Devenir développeur backend", "user_id": str(self.user.id)}}
+        request = SimpleNamespace(user=self.user)
+        with override_settings(
+            OPENAI_API_TYPE='stub', OPENAI_API_KEY=None, OPENAI_STUB_LATENCY_MEDIAN=0,
+            OPENAI_STUB_COMPLETION_TOKENS=20, ROADMAP_STREAM_FLUSH_TOKENS=5
+        ):
+            # Client déconnecté avant la première itération : aucun bail pris
+            abandoned = RoadmapViewSet()._stream_generation(request, self.roadmap, temp_responses, {})
+            abandoned.close()
+            self.assertNotEqual((await Roadmaps.objects.aget(pk=self.roadmap.pk)).status, 'GENERATING')
+
+            response = RoadmapViewSet()._stream_generation(request, self.roadmap, temp_responses, {})
+            chunks = [chunk.decode() async for chunk in response.streaming_content]
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(chunks[0].startswith("event: token\n"))
+        self.assertTrue(chunks[-1].startswith("event: done\n"))
+        roadmap = await Roadmaps.objects.aget(pk=self.roadmap.pk)
+        self.assertEqual(roadmap.status, 'COMPLETED')
+        self.assertIsNone(roadmap.generation_lease_expires_at)
+        self.assertTrue(roadmap.content)
+
+        # Bail tenu par une autre génération : le flux se limite à in_progress
+        await sync_to_async(GenerationJobService.acquire_lease)(roadmap)
+        busy = RoadmapViewSet()._stream_generation(request, roadmap, temp_responses, {})
+        chunks = [chunk.decode() async for chunk in busy.streaming_content]
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].startswith("event: in_progress\n"))
+
+    def test_clients_of_closed_event_loops_are_released(self):
+        import asyncio
+        from unittest import mock
+        from django.test import override_settings
+        from apps.roadmap_management.services import openai_client
+
+        async def client_and_loop():
+            return openai_client.get_async_client(), asyncio.get_running_loop()
+
+        with override_settings(OPENAI_API_TYPE='stub'), mock.patch.object(openai_client, '_clients', {}):
+            # Une boucle par appel, comme async_to_sync sous WSGI
+            first, _ = asyncio.run(client_and_loop())
+            second, second_loop = asyncio.run(client_and_loop())
+
+            self.assertIsNot(first, second)
+            self.assertEqual(list(openai_client._clients), [second_loop])
+
+    def test_load_test_command_submits_through_the_views(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.question_handling.questionnaire_cache import questionnaire_cache
+
+        questionnaire_cache.bump_version()
+        for endpoint in ('submit', 'generate'):
+            out = StringIO()
+            with override_settings(OPENAI_API_TYPE='stub'):
+                call_command(
+                    'load_test_generation', self.user.username,
+                    '--jobs', '2', '--endpoint', endpoint, '--timeout', '0', stdout=out
+                )
+            self.assertIn("2 génération(s) soumise(s)", out.getvalue())
+
+        jobs = GenerationJob.objects.filter(user=self.user)
+        self.assertEqual(jobs.count(), 4)
+        # Réponses tirées au hasard pour chaque génération
+        self.assertEqual(len({str(job.payload["temp_responses"]) for job in jobs}), 4)
+
+    async def test_stub_injects_configured_errors(self):
+        from openai import RateLimitError
+        from apps.roadmap_management.services.openai_stub import StubAsyncOpenAI, StubProfile
+
+        client = StubAsyncOpenAI(profile=StubProfile(latency_median=0, rate_limit_rate=1.0))
+        with self.assertRaises(RateLimitError):
+            await client.chat.completions.create(model="gpt-4", messages=[], max_tokens=10)
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class AIHealthTest(TestCase):
+    def setUp(self):
+        from django.core.cache import caches
+        from apps.roadmap_management.services.ai_health import call_stats
+        caches['default'].clear()
+        call_stats.clear()
+
+    async def test_probe_is_cached_and_reports_recent_calls(self):
+        from unittest import mock
+        from django.test import override_settings
+        from apps.roadmap_management.services.ai_health import call_stats
+        from apps.roadmap_management.services.openai_stub import _StubCompletions, _StubModels
+
+        # Appels enregistrés par un worker : seuls les compteurs partagés les voient
+        for duration in (1.0, 2.0, 3.0):
+            await call_stats.arecord(duration, success=True)
+        await call_stats.arecord(0.5, success=False)
+        call_stats.local.clear()
+
+        with override_settings(OPENAI_API_TYPE='stub', OPENAI_STUB_LATENCY_MEDIAN=0), \
+                mock.patch.object(_StubModels, 'retrieve', autospec=True, return_value={}) as retrieve, \
+                mock.patch.object(_StubCompletions, 'create') as create:
+            first = await self.async_client.get('/api/ai-health/')
+            second = await self.async_client.get('/api/ai-health/')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retrieve.call_count, 1)
+        create.assert_not_called()
+        report = second.json()
+        self.assertTrue(report['cached'])
+        self.assertEqual(report['recent_calls']['calls'], 4)
+        self.assertEqual(report['recent_calls']['success_rate'], 0.75)
+        self.assertEqual(report['recent_calls']['p95_latency'], 2.0)
+
+
+class BatchGenerationTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(email="cohorte@test.fr", username="cohorte")
+        self.roadmaps = [Roadmaps.objects.create(user=self.user, title=f"Roadmap {i}") for i in range(2)]
+        for roadmap in self.roadmaps:
+            GenerationJobService.enqueue(roadmap, self.user, {"q1": "réponse"}, {"model": "gpt-3.5-turbo"}, mode='BATCH')
+        self.interactive = Roadmaps.objects.create(user=self.user, title="Roadmap interactive")
+        GenerationJobService.enqueue(self.interactive, self.user, {"q1": "réponse"})
+
+    def test_local_batch_round_trip(self):
+        import tempfile
+        from pathlib import Path
+        from asgiref.sync import async_to_sync
+        from apps.roadmap_management.models import GenerationHistory
+        from apps.roadmap_management.services.batch_generation import BatchGenerationService, LocalBatchBackend
+
+        with tempfile.TemporaryDirectory() as directory:
+            service = BatchGenerationService(LocalBatchBackend(directory))
+            jobs = service.collect_jobs(10)
+            # Les générations interactives restent au worker
+            self.assertEqual(len(jobs), 2)
+            self.assertEqual(GenerationJob.objects.get(roadmap=self.interactive).status, 'PENDING')
+            lease = Roadmaps.objects.get(pk=self.roadmaps[0].pk).generation_lease_expires_at
+            self.assertGreater((lease - timezone.now()).total_seconds(), settings.ROADMAP_GENERATION_LEASE)
+            lines = async_to_sync(service.build_requests)(jobs, preparation_service=FakePreparationService())
+            input_path = service.write_input(lines, Path(directory) / "input.jsonl")
+            batch_id = service.submit(input_path, [line["custom_id"] for line in lines])
+
+            # Les tâches soumises ne sont pas remises en file par les workers
+            self.assertEqual(GenerationJobService.requeue_stale(0), 0)
+
+            status, paths = service.download_results(batch_id, Path(directory))
+            counts = service.import_results(paths[0])
+
+        self.assertEqual(status, "completed")
+        self.assertEqual(lines[0]["body"]["model"], "gpt-3.5-turbo")
+        self.assertEqual(counts["succeeded"], 2)
+        roadmap = Roadmaps.objects.get(pk=self.roadmaps[0].pk)
+        self.assertEqual(roadmap.status, 'COMPLETED')
+        self.assertTrue(roadmap.content)
+        job = GenerationJob.objects.get(roadmap=roadmap)
+        self.assertEqual((job.status, job.result["batch_id"]), ('SUCCEEDED', batch_id))
+        self.assertEqual(GenerationHistory.objects.filter(success=True).count(), 2)
+
+    def test_submission_error_releases_claimed_jobs(self):
+        import tempfile
+        from pathlib import Path
+        from apps.roadmap_management.services.batch_generation import BatchGenerationService, LocalBatchBackend
+
+        class UnavailableBackend(LocalBatchBackend):
+            def submit(self, input_path, metadata):
+                raise ConnectionError("API Batch indisponible")
+
+        with tempfile.TemporaryDirectory() as directory:
+            service = BatchGenerationService(UnavailableBackend(directory))
+            jobs = service.collect_jobs(10)
+            with self.assertRaises(ConnectionError):
+                service.submit_jobs(jobs, Path(directory) / "input.jsonl", preparation_service=FakePreparationService())
+
+        for roadmap in self.roadmaps:
+            job = GenerationJob.objects.get(roadmap=roadmap)
+            self.assertEqual((job.status, job.locked_by, job.attempts, job.mode), ('PENDING', None, 0, 'BATCH'))
+            lease = Roadmaps.objects.get(pk=roadmap.pk).generation_lease_expires_at
+            self.assertLessEqual((lease - timezone.now()).total_seconds(), settings.ROADMAP_GENERATION_LEASE)
+        # Les tâches libérées sont réclamées par le lot suivant
+        self.assertEqual(len(BatchGenerationService(LocalBatchBackend()).collect_jobs(10)), 2)
+
+    def test_expired_batch_hands_jobs_to_the_worker(self):
+        import json
+        import tempfile
+        from pathlib import Path
+        from apps.roadmap_management.services.batch_generation import BatchGenerationService, LocalBatchBackend
+
+        with tempfile.TemporaryDirectory() as directory:
+            backend = LocalBatchBackend(directory)
+            service = BatchGenerationService(backend)
+            jobs = service.collect_jobs(10)
+            batch_id, submitted = service.submit_jobs(
+                jobs,
+                Path(directory) / "input.jsonl",
+                preparation_service=FakePreparationService()
+            )
+            status_path = backend.directory / batch_id / "status.json"
+            status_path.write_text(
+                json.dumps({'status': 'expired', 'output_file_id': None, 'error_file_id': None}),
+                encoding='utf-8'
+            )
+            status, paths = service.download_results(batch_id, Path(directory))
+
+        self.assertEqual((submitted, status, paths), (2, 'expired', []))
+        for roadmap in self.roadmaps:
+            job = GenerationJob.objects.get(roadmap=roadmap)
+            self.assertEqual((job.status, job.locked_by, job.mode), ('PENDING', None, 'INTERACTIVE'))
+        claimed = GenerationJobService.claim_jobs("worker-1", 10)
+        self.assertEqual(len(claimed), 3)
+
+
+class SectionedGenerationTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(email="sections@test.fr", username="sections")
+        self.roadmap = Roadmaps.objects.create(user=self.user, title="Roadmap")
+
+    @staticmethod
+    def _data(experience):
+        return {
+            "user_responses": [
+                {"question_id": "q1", "category": "parcours", "answer": experience},
+                {"question_id": "q2", "category": "objectifs", "answer": "Devenir lead"}
+            ]
+        }
+
+    async def test_only_changed_sections_are_regenerated(self):
+        from apps.roadmap_management.models import RoadmapSection
+        from apps.roadmap_management.services.section_generation import SectionedRoadmapService
+
+        ai_service = FakeRoadmapAIService()
+        calls = []
+        generate_roadmap = ai_service.generate_roadmap
+
+        async def counting_generate(prompt, structured_data, **config):
+            calls.append(structured_data["category"])
+            return await generate_roadmap(prompt, structured_data, **config)
+        ai_service.generate_roadmap = counting_generate
+
+        service = SectionedRoadmapService(ai_service)
+        await service.generate(self.roadmap, "Prompt", self._data("2 ans"))
+        result = await service.generate(self.roadmap, "Prompt", self._data("5 ans"))
+
+        self.assertEqual(calls, ["parcours", "objectifs", "parcours"])
+        self.assertEqual(result["metadata"]["sections"], {"regenerated": ["parcours"], "reused": ["objectifs"]})
+        self.assertIn("## objectifs", result["content"])
+        self.assertEqual(await RoadmapSection.objects.filter(roadmap=self.roadmap).acount(), 2)
+
+    async def test_template_or_temperature_change_regenerates_every_section(self):
+        from apps.roadmap_management.services.section_generation import SectionedRoadmapService
+
+        service = SectionedRoadmapService(FakeRoadmapAIService())
+        await service.generate(self.roadmap, "Prompt", self._data("2 ans"), prompt_version="roadmap:v1", temperature=0.7)
+        same = await service.generate(
+            self.roadmap, "Prompt", self._data("2 ans"), prompt_version="roadmap:v1", temperature=0.7
+        )
+        template = await service.generate(
+            self.roadmap, "Prompt", self._data("2 ans"), prompt_version="roadmap:v2", temperature=0.7
+        )
+        temperature = await service.generate(
+            self.roadmap, "Prompt", self._data("2 ans"), prompt_version="roadmap:v2", temperature=0.2
+        )
+
+        self.assertEqual(same["metadata"]["sections"]["regenerated"], [])
+        self.assertEqual(template["metadata"]["sections"]["regenerated"], ["parcours", "objectifs"])
+        self.assertEqual(temperature["metadata"]["sections"]["regenerated"], ["parcours", "objectifs"])
+
+
+class GenerationStatsTest(TestCase):
+    def test_latency_percentiles_per_model(self):
+        from django.core.exceptions import ValidationError
+        from apps.roadmap_management.services.generation_stats import GenerationStatsService
+
+        roadmap = Roadmaps.objects.create(title="Stats")
+        for i in range(1, 101):
+            GenerationHistory.objects.create(
+                roadmap=roadmap, configuration_used={}, prompt_used="", model="gpt-4",
+                token_count=100, prompt_tokens=60, completion_tokens=40, generation_time=float(i)
+            )
+        GenerationHistory.objects.create(
+            roadmap=roadmap, configuration_used={}, prompt_used="", model="gpt-3.5-turbo",
+            token_count=0, generation_time=2.0, success=False, error_message="Timeout"
+        )
+
+        stats = GenerationStatsService.window_stats("1h")["models"]
+
+        self.assertEqual(stats["gpt-4"]["latency"], {"p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0})
+        self.assertEqual(stats["gpt-4"]["tokens"]["prompt"], 6000)
+        self.assertEqual(stats["gpt-3.5-turbo"]["success_rate"], 0.0)
+        with self.assertRaises(ValidationError):
+            GenerationStatsService.window_stats("1y")
+
+
+class CompiledPromptTemplateTest(TestCase):
+    def test_single_pass_rendering(self):
+        from apps.roadmap_management.services.prompt_validation_service import PromptValidationService
+
+        template = "{user.username} : {responses[0].content} / {responses[3].content} {metadata}"
+        data = {
+            'user': {'username': "alice", 'role': "USER"},
+            'responses': [{'content': "{user.role}", 'is_valid': True}]
+        }
+
+        rendered = PromptValidationService.substitute_variables(template, data, safe_mode=False)
+
+        # Les valeurs ne sont pas réinterprétées ; les emplacements sans donnée restent tels quels
+        self.assertEqual(rendered, "alice : {user.role} / {responses[3].content} {metadata}")
+        self.assertIs(PromptValidationService.compile_template(template), PromptValidationService.compile_template(template))
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class PromptRegistryTest(TestCase):
+    CONTENT = (
+        "{user} {questions} {responses} {generation_date}\n"
+        "Profil {user.username} ({user.role}) ; {questions.text} {questions.type} ; "
+        "{responses.content} {responses.is_valid}"
+    )
+
+    def setUp(self):
+        from unittest import mock
+        from apps.question_handling import questionnaire_cache
+
+        # Le registre du test joue un autre processus : la version passe par le cache, comme avec Redis
+        patcher = mock.patch.object(questionnaire_cache, 'LOCAL_CACHE_BACKENDS', ())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_active_templates_are_served_from_memory_and_reloaded_on_save(self):
+        from apps.roadmap_management.models import PromptTemplate
+        from apps.roadmap_management.services.prompt_registry import PromptTemplateRegistry
+
+        registry = PromptTemplateRegistry()
+        template = PromptTemplate.objects.create(name="roadmap", template_content=self.CONTENT, is_active=True)
+        PromptTemplate.objects.create(name="brouillon", template_content=self.CONTENT, is_active=False)
+
+        first = registry.get("roadmap")
+        with self.assertNumQueries(0):
+            self.assertIs(registry.get("roadmap"), first)
+            self.assertIsNone(registry.get("brouillon"))
+
+        template.template_content = self.CONTENT + "\nVersion 2"
+        template.version = 2
+        template.save()
+
+        second = registry.get("roadmap")
+        self.assertEqual(second.version, 2)
+        self.assertTrue(second.compiled.render({}).endswith("Version 2"))
+        self.assertIs(registry.get("roadmap", version=1), first)
+
+    def test_rendered_prompt_contains_the_answers_without_a_date(self):
+        from asgiref.sync import async_to_sync
+        from apps.roadmap_management.models import PromptTemplate
+        from apps.question_handling.questionnaire_cache import questionnaire_cache
+        from apps.roadmap_management.services.ai_preparation_service import AIDataPreparationService
+
+        self.addCleanup(questionnaire_cache.clear)
+        PromptTemplate.objects.create(
+            name="roadmap",
+            template_content=self.CONTENT + "\n{questions[0].text} : {responses[0].content}",
+            is_active=True
+        )
+        structured_data = {
+            "user_info": {"username": "alice", "role": "USER"},
+            "user_responses": [
+                {"question_id": "q1", "type": "TEXT", "category": "Objectifs", "answer": "Devenir développeuse backend"}
+            ]
+        }
+
+        prompt = async_to_sync(AIDataPreparationService()._build_validated_prompt)(structured_data, {})
+
+        self.assertIn("Profil alice (USER)", prompt)
+        self.assertIn(" : Devenir développeuse backend", prompt)
+        self.assertNotIn("{generation_date}", prompt)
+        self.assertNotRegex(prompt, r"\d{4}-\d{2}-\d{2}")
+
+
+class ProfileIndexTest(TestCase):
+    @staticmethod
+    def _data(goal, stack, text):
+        return {
+            "user_responses": [
+                {"question_id": "q1", "type": "MULTIPLE_CHOICE", "answer": [goal]},
+                {"question_id": "q2", "type": "TABLE", "answer": {"rows": [{"techno": stack, "niveau": "débutant"}]}},
+                {"question_id": "q3", "type": "TEXT", "answer": text}
+            ]
+        }
+
+    def test_nearest_completed_roadmap_above_threshold(self):
+        from apps.roadmap_management.services.profile_index import ProfileIndex
+
+        backend = Roadmaps.objects.create(title="Backend", status='COMPLETED', content="Roadmap backend")
+        design = Roadmaps.objects.create(title="Design", status='COMPLETED', content="Roadmap design")
+        index = ProfileIndex(dimensions=256)
+        index.record(backend, self._data("backend", "python", "Je veux créer des API web en Python"))
+        index.record(design, self._data("design", "figma", "J'aime dessiner des interfaces"))
+
+        match = index.find(self._data("backend", "python", "Créer des API en Python"), threshold=0.6)
+        self.assertEqual((match.roadmap_id, match.content), (str(backend.id), "Roadmap backend"))
+        self.assertIsNone(index.find(self._data("mobile", "swift", "Applications iOS"), threshold=0.6))
+        self.assertIsNone(index.find(self._data("backend", "python", "API Python"), exclude=[backend.id], threshold=0.9))
+
+        # Génération en streaming (serveur web) : profil persisté sans entrer dans l'index local
+        data = Roadmaps.objects.create(title="Data", status='COMPLETED', content="Roadmap data")
+        index.record(data, self._data("data", "sql", "Analyser des données avec SQL"), index=False)
+        self.assertEqual(len(index), 2)
+
+        # Un autre processus reconstruit l'index depuis RoadmapProfile
+        other = ProfileIndex(dimensions=256)
+        self.assertEqual(other.find(self._data("data", "sql", "Analyser des données"), threshold=0.6).roadmap_id, str(data.id))
+        self.assertEqual(other.find(self._data("design", "figma", "Dessiner des interfaces"), threshold=0.6).roadmap_id, str(design.id))
+
+        # Une roadmap supprimée sort de l'index à la recherche suivante
+        backend.delete()
+        self.assertIsNone(other.find(self._data("backend", "python", "Créer des API en Python"), threshold=0.6))
+        self.assertEqual(len(other), 2)
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     GlobalAIConfigurationView, RoadmapViewSet, AdminRoadmapListView, AdminRoadmapDetailView,
-    RegenerateRoadmapView, ArchiveRoadmapView, update_prompt, fetch_questions_and_responses
+    RegenerateRoadmapView, ArchiveRoadmapView, AIHealthView, GenerationStatsView, update_prompt, fetch_questions_and_responses
 )
 
 
@@ -17,6 +17,8 @@ urlpatterns = [
     path('admin/roadmaps/<str:pk>/regenerate/', RegenerateRoadmapView.as_view(), name='admin_roadmap_regenerate'),
     path('admin/roadmaps/<str:pk>/archive/', ArchiveRoadmapView.as_view(), name='admin_roadmap_archive'),
     path('ai-config/', GlobalAIConfigurationView.as_view(), name='global_ai_config'),
+    path('ai-health/', AIHealthView.as_view(), name='ai_health'),
+    path('ai-stats/', GenerationStatsView.as_view(), name='ai_generation_stats'),
     path('update-prompt/', update_prompt, name='update_prompt'),
     path('roadmap/<int:roadmap_id>/questions-responses/', fetch_questions_and_responses, name='fetch_questions_and_responses'),
 ]
\ No newline at end of file
@@ -1,4 +1,6 @@
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -6,15 +8,21 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from asgiref.sync import sync_to_async
+from asgiref.sync import async_to_sync, sync_to_async
 from django.db.transaction import atomic
 from typing import Any, Dict
-from .models import AIConfiguration, Roadmaps
+from .models import AIConfiguration, RoadmapSection, Roadmaps
 from .serializers import AIConfigurationSerializer, RoadmapSerializer, RoadmapDetailSerializer, RoadmapUpdateSerializer
 from .services.ai_preparation_service import AIDataPreparationService
 from .services.ai_service import AIService, RoadmapAIService
-from apps.user_management.permissions import HasRoadmapAccess
+from .services.generation_jobs import GenerationInProgress, GenerationJobService
+from .services.generation_stats import GenerationStatsService
+from django.core.exceptions import ValidationError as DjangoValidationError
+from apps.user_management.permissions import HasRoadmapAccess, IsAdmin, IsManager
+from apps.response_management.services.draft_store import DraftStore
+import json
 import logging
+import time
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.decorators.http import require_POST
@@ -25,7 +33,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
-from apps.roadmap_management.services.prompt_validation_service import PromptValidationService
+from apps.roadmap_management.services.prompt_validation_service import PromptValidationError, PromptValidationService
 from apps.roadmap_management.services.ai_prompt_service import AIPromptService
 
 
@@ -50,13 +58,11 @@ def update_prompt(request):
         if not ai_config:
             raise ValidationError("Aucune configuration IA associée à cette roadmap.")
 
-        # Valider le prompt avec le service de validation
-        validation_result = PromptValidationService.validate_prompt_template(prompt_template)
-        if not validation_result['is_valid']:
-            return Response(
-                {'success': False, 'error': validation_result['error_message']},
-                status=400
-            )
+        # Valider le prompt (compilation mise en cache par contenu)
+        try:
+            PromptValidationService.validate_prompt_template(prompt_template)
+        except PromptValidationError as e:
+            return Response({'success': False, 'error': e.messages[0]}, status=400)
 
         # Sauvegarder le nouveau prompt
         ai_config.prompt_template = prompt_template
@@ -104,11 +110,12 @@ class RoadmapViewSet(viewsets.ModelViewSet):
     serializer_class = RoadmapSerializer
     permission_classes = [IsAuthenticated, HasRoadmapAccess]
 
-    async def get_queryset(self):
+    def get_queryset(self):
+        # Synchrone : get_object (generate, regenerate...) filtre ce queryset
         user = self.request.user
         if user.role in ['MANAGER', 'ADMIN']:
-            return await Roadmaps.objects.all().aasync_all()
-        return await Roadmaps.objects.filter(user=user).aasync_all()
+            return Roadmaps.objects.all()
+        return Roadmaps.objects.filter(user=user)
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -127,17 +134,18 @@ class RoadmapViewSet(viewsets.ModelViewSet):
         )
 
     @action(detail=True, methods=['post'])
-    async def generate(self, request, pk=None):
-        roadmap = await sync_to_async(self.get_object)()
+    def generate(self, request, pk=None):
+        # Vue synchrone (DRF n'attend pas les coroutines) : les parties async passent par async_to_sync
+        roadmap = self.get_object()
         
         try:
-            if not await sync_to_async(roadmap.can_generate)():
+            if roadmap.status == 'ARCHIVED':
                 return Response(
                     {"error": "La roadmap ne peut pas être générée"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            temp_responses = request.session.get("temp_responses", {})
+            temp_responses = async_to_sync(DraftStore.acollect)(request.user)
             if not temp_responses:
                 return Response(
                     {"error": "Aucune réponse trouvée"},
@@ -148,60 +156,40 @@ class RoadmapViewSet(viewsets.ModelViewSet):
             ai_config = {}
             if 'ai_config' in request.data:
                 try:
-                    ai_config = await sync_to_async(self._validate_ai_config)(request.data['ai_config'])
+                    ai_config = self._validate_ai_config(request.data['ai_config'])
                 except ValidationError as e:
                     return Response(
                         {"error": f"Configuration AI invalide: {str(e)}"},
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
-            preparation_service = AIDataPreparationService()
-            ai_service = RoadmapAIService()
-
-            @atomic
-            async def generate_content():
-                roadmap.status = 'GENERATING'
-                await sync_to_async(roadmap.save)()
-
-                try:
-                    generation_data = await preparation_service.prepare_complete_generation_data(
-                        temp_responses,
-                        request.user
-                    )
-
-                    generation_result = await ai_service.generate_roadmap(
-                        generation_data["prompt"],
-                        generation_data["data"],
-                        **ai_config
-                    )
-
-                    roadmap.content = generation_result["content"]
-                    roadmap.status = 'COMPLETED'
-                    await sync_to_async(roadmap.increment_version)()
-                    roadmap.updated_at = timezone.now()
-                    await sync_to_async(roadmap.save)()
-
-                    if "temp_responses" in request.session:
-                        del request.session["temp_responses"]
-                        request.session.modified = True
-
-                    return generation_result
+            if self._wants_stream(request):
+                if self._can_stream(request):
+                    # Le bail est pris par le flux lui-même (voir _stream_generation)
+                    if not roadmap.can_generate():
+                        return self._in_flight_response(roadmap)
+                    return self._stream_generation(request, roadmap, temp_responses, ai_config)
+                logger.info(f"Streaming indisponible sous WSGI : génération de {roadmap.id} mise en file")
 
-                except Exception as e:
-                    roadmap.status = 'ERROR'
-                    await sync_to_async(roadmap.save)()
-                    raise e
-
-            result = await generate_content()
+            try:
+                job, created = GenerationJobService.enqueue_or_attach(
+                    roadmap,
+                    request.user,
+                    temp_responses,
+                    ai_config
+                )
+            except GenerationInProgress:
+                return self._in_flight_response(roadmap)
 
             return Response({
-                "message": "Roadmap générée avec succès",
+                "message": "Génération de la roadmap planifiée" if created else "Génération déjà en cours",
+                "job_id": job.id,
+                "attached": not created,
                 "roadmap_id": roadmap.id,
                 "status": roadmap.status,
                 "version": roadmap.version,
-                "used_config": ai_config,
-                "metadata": result.get("metadata", {})
-            })
+                "used_config": ai_config if created else job.payload.get('ai_config', {})
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"Erreur génération roadmap {roadmap.id}: {str(e)}")
@@ -210,35 +198,194 @@ class RoadmapViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _in_flight_response(self, roadmap) -> Response:
+        """
+        Rattache l'appelant à la génération en cours au lieu d'en lancer une autre.
+
+        Le résultat se suit ensuite via l'action status, comme pour une tâche en file.
+        """
+        roadmap.refresh_from_db()
+        job = GenerationJobService.latest_for(roadmap)
+        return Response({
+            "message": "Génération déjà en cours",
+            "attached": True,
+            "roadmap_id": roadmap.id,
+            "status": roadmap.status,
+            "version": roadmap.version,
+            "job": GenerationJobService.describe(job) if job and not job.is_finished else None
+        }, status=status.HTTP_202_ACCEPTED)
+
+    def _wants_stream(self, request) -> bool:
+        """Le client demande-t-il le mode streaming (?stream=1 ou "stream": true) ?"""
+        flag = request.query_params.get('stream', request.data.get('stream', False))
+        return str(flag).lower() in ('1', 'true', 'yes')
+
+    @staticmethod
+    def _can_stream(request) -> bool:
+        """
+        Le serveur peut-il envoyer le flux au fil de l'eau ?
+
+        Sous WSGI, Django consomme entièrement un itérateur asynchrone avant
+        d'envoyer la réponse : le client ne recevrait rien avant la fin de la
+        génération. Seul un serveur ASGI (core.asgi) sert le streaming ; sous
+        WSGI, la génération passe par la file comme sans ?stream=1.
+        """
+        return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+    def _stream_generation(self, request, roadmap, temp_responses, ai_config) -> StreamingHttpResponse:
+        """
+        Génère la roadmap en Server-Sent Events (serveur ASGI, voir _can_stream).
+        
+        Les tokens sont envoyés au client au fil de l'eau et le contenu partiel
+        est écrit dans Roadmaps.content tous les ROADMAP_STREAM_FLUSH_TOKENS
+        tokens, pour ne pas perdre le travail déjà payé si la connexion tombe.
+
+        Le bail de génération est obtenu à la première itération du flux : un
+        client déconnecté avant le début de la réponse ne bloque pas la roadmap.
+        Si une autre génération l'a pris entre-temps, le flux se limite à un
+        événement in_progress.
+        """
+        flush_every = settings.ROADMAP_STREAM_FLUSH_TOKENS
+
+        def sse(event: str, data: Dict[str, Any]) -> str:
+            return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+        async def persist_partial(parts):
+            await Roadmaps.objects.filter(pk=roadmap.pk).aupdate(
+                content=''.join(parts),
+                updated_at=timezone.now()
+            )
+
+        async def event_stream():
+            if not await sync_to_async(GenerationJobService.acquire_lease)(roadmap):
+                job = await sync_to_async(GenerationJobService.latest_for)(roadmap)
+                yield sse('in_progress', {
+                    "roadmap_id": roadmap.id,
+                    "job": GenerationJobService.describe(job) if job and not job.is_finished else None
+                })
+                return
+
+            parts = []
+            pending = 0
+            start_time = time.time()
+            ai_service = RoadmapAIService()
+            generation_data = {}
+
+            try:
+                preparation_service = AIDataPreparationService()
+
+                generation_data = await preparation_service.prepare_complete_generation_data(
+                    temp_responses,
+                    request.user
+                )
+
+                metadata = {}
+                async for event in ai_service.stream_roadmap(
+                    generation_data["prompt"],
+                    generation_data["data"],
+                    **ai_config
+                ):
+                    if event['type'] == 'token':
+                        parts.append(event['content'])
+                        pending += 1
+                        if pending >= flush_every:
+                            await persist_partial(parts)
+                            pending = 0
+                        yield sse('token', {'content': event['content']})
+                    else:
+                        metadata = event['metadata']
+
+                roadmap.content = ''.join(parts)
+                roadmap.status = 'COMPLETED'
+                roadmap.generation_lease_expires_at = None
+                roadmap.increment_version()
+                roadmap.updated_at = timezone.now()
+                await sync_to_async(roadmap.save)()
+                # Contenu généré d'un seul tenant : les sections ne le reflètent plus
+                await RoadmapSection.objects.filter(roadmap=roadmap).adelete()
+                await ai_service.log_generation(roadmap, generation_data["prompt"], metadata, ai_config, start_time)
+                await GenerationJobService.record_profile(roadmap, generation_data["data"], index=False)
+
+                # Les réponses temporaires (DraftStore) sont conservées en mode streaming.
+                yield sse('done', {
+                    "roadmap_id": roadmap.id,
+                    "status": roadmap.status,
+                    "version": roadmap.version,
+                    "used_config": ai_config,
+                    "metadata": metadata
+                })
+
+            except BaseException as e:
+                # Déconnexion du client (annulation) ou erreur : on garde le partiel
+                logger.error(f"Erreur génération streaming roadmap {roadmap.id}: {str(e)}")
+                roadmap.content = ''.join(parts) or roadmap.content
+                roadmap.status = 'ERROR'
+                roadmap.generation_lease_expires_at = None
+                await sync_to_async(roadmap.save)()
+                await ai_service.log_generation(
+                    roadmap,
+                    generation_data.get("prompt", ""),
+                    {'completion_tokens': len(parts)},
+                    ai_config,
+                    start_time,
+                    error=str(e) or type(e).__name__
+                )
+                if not isinstance(e, Exception):
+                    raise
+                yield sse('error', {"error": "Erreur lors de la génération"})
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     @action(detail=True, methods=['get'])
     async def status(self, request, pk=None):
         roadmap = await sync_to_async(self.get_object)()
+        job = await sync_to_async(GenerationJobService.latest_for)(roadmap)
         return Response({
             "status": roadmap.status,
             "version": roadmap.version,
-            "updated_at": roadmap.updated_at
+            "updated_at": roadmap.updated_at,
+            "job": GenerationJobService.describe(job)
         })
 
     @action(detail=True, methods=['post'])
-    async def regenerate(self, request, pk=None):
-        roadmap = await sync_to_async(self.get_object)()
+    def regenerate(self, request, pk=None):
+        roadmap = self.get_object()
         
         try:
-            if roadmap.status == 'GENERATING':
+            if roadmap.status == 'ARCHIVED':
                 return Response(
-                    {"error": "Déjà en cours de génération"},
+                    {"error": "La roadmap ne peut pas être régénérée"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            @atomic
-            async def update_roadmap():
-                roadmap.version += 1
-                roadmap.status = 'GENERATING'
-                roadmap.updated_at = timezone.now()
-                await sync_to_async(roadmap.save)()
+            temp_responses = async_to_sync(DraftStore.acollect)(request.user)
+            if not temp_responses:
+                return Response(
+                    {"error": "Aucune réponse trouvée"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            await update_roadmap()
-            return await self.generate(request, pk)
+            try:
+                job, created = GenerationJobService.enqueue_or_attach(
+                    roadmap,
+                    request.user,
+                    temp_responses,
+                    kind='REGENERATE'
+                )
+            except GenerationInProgress:
+                return self._in_flight_response(roadmap)
+
+            return Response({
+                "message": "Régénération de la roadmap planifiée" if created else "Génération déjà en cours",
+                "job_id": job.id,
+                "attached": not created,
+                "roadmap_id": roadmap.id,
+                "status": roadmap.status,
+                "version": roadmap.version
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"Erreur régénération roadmap {roadmap.id}: {str(e)}")
@@ -381,12 +528,22 @@ class RoadmapViewSet(viewsets.ModelViewSet):
             except ValueError:
                 raise ValidationError("max_tokens doit être un nombre entier")
 
+        if 'context_window' in config:
+            try:
+                validated_config['context_window'] = int(config['context_window'])
+            except ValueError:
+                raise ValidationError("context_window doit être un nombre entier")
+
+        # Permet de demander une variante fraîche sans passer par le cache
+        if 'use_cache' in config:
+            validated_config['use_cache'] = str(config['use_cache']).lower() not in ('0', 'false', 'no')
+
         return validated_config
 
     @action(detail=True, methods=['get'])
     async def analyze_context(self, request, pk=None):
         try:
-            temp_responses = request.session.get("temp_responses", {})
+            temp_responses = await DraftStore.acollect(request.user)
             if not temp_responses:
                 return Response(
                     {"error": "Aucune réponse trouvée pour l'analyse"},
@@ -454,7 +611,7 @@ class RegenerateRoadmapView(LoginRequiredMixin, View):
             preparation_service = AIDataPreparationService()
 
             data = preparation_service.prepare_complete_generation_data(
-                temp_responses=request.session.get('temp_responses', {}),
+                temp_responses=async_to_sync(DraftStore.acollect)(roadmap.user),
                 user=roadmap.user
             )
             result = ai_service.send_prompt(data['prompt'])
@@ -499,4 +656,33 @@ class GlobalAIConfigurationView(APIView):
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
-        return Response(serializer.errors, status=400)
\ No newline at end of file
+        return Response(serializer.errors, status=400)
+
+class AIHealthView(View):
+    """
+    Sonde de santé du fournisseur IA pour l'orchestrateur (sans authentification).
+    Répond instantanément depuis le cache : 200 si l'API est joignable, 503 sinon.
+    """
+
+    async def get(self, request):
+        report = await AIService().health_check()
+        status_code = 503 if report['status'] == 'unhealthy' else 200
+        return JsonResponse(report, status=status_code)
+
+
+class GenerationStatsView(APIView):
+    """
+    Agrégats des générations par modèle (latences p50/p95/p99, tokens).
+
+    Paramètre windows : fenêtres glissantes séparées par des virgules
+    (par défaut 1h,24h,7d).
+    """
+    permission_classes = [IsAuthenticated, IsManager | IsAdmin]
+
+    def get(self, request):
+        windows = [w for w in request.query_params.get('windows', '').split(',') if w.strip()]
+        try:
+            report = GenerationStatsService.report(windows)
+        except DjangoValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"windows": report, "timestamp": timezone.now()})
@@ -0,0 +1,71 @@
+# apps/user_management/management/commands/purge_users.py
+
+import asyncio
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from apps.response_management.services.user_data import UserDataPurge
+from apps.user_management.models import Users
+
+
+class Command(BaseCommand):
+    help = (
+        "Désactive (ou supprime) des utilisateurs en masse et purge leurs réponses "
+        "par lots courts, requêtes ensemblistes uniquement"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', default=[], help="Identifiants des utilisateurs à purger")
+        parser.add_argument(
+            '--inactive-days', type=int,
+            help="Utilisateurs (rôle USER) sans connexion depuis ce nombre de jours"
+        )
+        parser.add_argument('--delete', action='store_true', help="Supprime les comptes au lieu de les désactiver")
+        parser.add_argument('--chunk-size', type=int, default=200, help="Utilisateurs traités par transaction")
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help="Pause (secondes) entre deux lots, pour laisser passer le trafic"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Liste le nombre d'utilisateurs concernés")
+
+    def handle(self, *args, **options):
+        if not options['users'] and options['inactive_days'] is None:
+            raise CommandError("Préciser --users ou --inactive-days")
+        asyncio.run(self.purge(options))
+
+    async def purge(self, options):
+        users = Users.objects.none()
+        if options['users']:
+            users = Users.objects.filter(id__in=options['users'])
+        if options['inactive_days'] is not None:
+            since = timezone.now() - timedelta(days=options['inactive_days'])
+            users = users | Users.objects.filter(role='USER').filter(
+                Q(last_login__lt=since) | Q(last_login__isnull=True, created_at__lt=since)
+            )
+        user_ids = [user_id async for user_id in users.values_list('id', flat=True).distinct()]
+
+        if options['dry_run']:
+            self.stdout.write(f"[simulation] {len(user_ids)} utilisateur(s) concerné(s)")
+            return
+
+        totals = {'responses': 0, 'backups': 0, 'archived_segments': 0}
+        for start in range(0, len(user_ids), options['chunk_size']):
+            chunk = user_ids[start:start + options['chunk_size']]
+            deleted = await UserDataPurge.apurge(chunk)
+            for key, count in deleted.items():
+                totals[key] += count
+
+            if options['delete']:
+                await Users.objects.filter(id__in=chunk).adelete()
+            else:
+                await Users.objects.filter(id__in=chunk).aupdate(is_active=False)
+            self.stdout.write(f"Lot {start // options['chunk_size'] + 1} : {len(chunk)} utilisateur(s) traité(s)")
+            if options['pause']:
+                await asyncio.sleep(options['pause'])
+
+        action = "supprimé(s)" if options['delete'] else "désactivé(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(user_ids)} utilisateur(s) {action} : {totals['responses']} réponse(s), "
+            f"{totals['backups']} backup(s) et {totals['archived_segments']} index d'archive purgés"
+        ))
@@ -67,32 +67,33 @@ def delete(self, deleted_by=None, self_delete=False, *args, **kwargs):
                 'deleted_at': timezone.now()
             }
 
-            # 2. Gestion des réponses et backups
-            responses = self.responses.all()
-            original_responses = responses.filter(is_original=True)
-            
-            if original_responses.exists():
-                # Création des backups finaux
-                for response in original_responses:
-                    ResponsesBackup.objects.create(
-                        response=response,
-                        user=self,
-                        question=response.question,
-                        content=response.content,
-                        is_complete=response.is_complete,
-                        version_index=response.backups.count() + 1
-                    )
-                
+            # 2. Gestion des réponses et backups : un backup final par réponse originale, en une insertion
+            original_responses = self.responses.filter(is_original=True)
+            final_backups = [
+                ResponsesBackup(
+                    response_id=response_id,
+                    user=self,
+                    question_id=question_id,
+                    content=content,
+                    is_complete=is_complete,
+                    version_index=version
+                )
+                for response_id, question_id, content, is_complete, version in original_responses.values_list(
+                    'id', 'question_id', 'content', 'is_complete', 'version'
+                )
+            ]
+            if final_backups:
+                ResponsesBackup.objects.bulk_create(final_backups)
                 # Désactivation du flag is_original
                 original_responses.update(is_original=False)
 
             # 3. Suppression en cascade
-            super().delete(*args, **kwargs)
+            super(Users, self).delete(*args, **kwargs)
 
             # 4. Log de l'opération
-            print(f"Utilisateur {self.email} supprimé {deleter_info}")
-            print(f"Détails de la suppression: {user_info}")
+            logger.info(f"Utilisateur {self.email} supprimé {deleter_info}")
+            logger.info(f"Détails de la suppression: {user_info}")
 
     except Exception as e:
-        print(f"Erreur lors de la suppression de l'utilisateur {self.email}: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error(f"Erreur lors de la suppression de l'utilisateur {self.email}: {str(e)}")
+        raise
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_asgi_application()
+
+# Encodages tiktoken chargés hors du chemin des requêtes
+from django.conf import settings  # noqa: E402
+from apps.response_management.services.token_counter import start_warm_up  # noqa: E402
+
+start_warm_up(settings.TOKEN_COUNTER_WARMUP_MODELS)
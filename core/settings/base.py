@@ -1,6 +1,7 @@
 # backend/core/settings/base.py
 
 import os
+import json
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -115,7 +116,8 @@ AUTH_PASSWORD_VALIDATORS = [
 
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 1209600  # Durée de session en secondes (2 semaines par défaut)
-SESSION_SAVE_EVERY_REQUEST = True
+# Session réécrite seulement si modifiée (les brouillons de réponses sont dans DraftStore)
+SESSION_SAVE_EVERY_REQUEST = False
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
 # Internationalization
@@ -193,6 +195,154 @@ LOGGING = {
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4')
 OPENAI_MAX_TOKENS = int(os.environ.get('OPENAI_MAX_TOKENS', 4000))
+# openai, azure, ou stub / replay pour les tests de charge hors ligne
+OPENAI_API_TYPE = os.environ.get('OPENAI_API_TYPE', 'openai')
+
+# Backend simulé (OPENAI_API_TYPE = stub ou replay)
+OPENAI_STUB_LATENCY_MEDIAN = float(os.environ.get('OPENAI_STUB_LATENCY_MEDIAN', 8.0))
+OPENAI_STUB_LATENCY_SIGMA = float(os.environ.get('OPENAI_STUB_LATENCY_SIGMA', 0.5))
+OPENAI_STUB_TOKENS_PER_SECOND = float(os.environ.get('OPENAI_STUB_TOKENS_PER_SECOND', 40.0))
+OPENAI_STUB_COMPLETION_TOKENS = int(os.environ.get('OPENAI_STUB_COMPLETION_TOKENS', 1500))
+OPENAI_STUB_RATE_LIMIT_RATE = float(os.environ.get('OPENAI_STUB_RATE_LIMIT_RATE', 0.0))
+OPENAI_STUB_ERROR_RATE = float(os.environ.get('OPENAI_STUB_ERROR_RATE', 0.0))
+OPENAI_STUB_SEED = os.environ.get('OPENAI_STUB_SEED')
+OPENAI_STUB_REPLAY_FILE = os.environ.get('OPENAI_STUB_REPLAY_FILE')
+# Enregistre les complétions réelles pour les rejouer ensuite en mode replay
+OPENAI_STUB_RECORD_FILE = os.environ.get('OPENAI_STUB_RECORD_FILE')
+
+# Pool de connexions HTTP partagé par le client OpenAI asynchrone
+OPENAI_HTTP_MAX_CONNECTIONS = int(os.environ.get('OPENAI_HTTP_MAX_CONNECTIONS', 20))
+OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS', 10))
+OPENAI_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_HTTP_KEEPALIVE_EXPIRY', 30.0))
+OPENAI_HTTP_TIMEOUT = float(os.environ.get('OPENAI_HTTP_TIMEOUT', 120.0))
+OPENAI_HTTP_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_HTTP_CONNECT_TIMEOUT', 10.0))
+
+# Génération en streaming : écriture du contenu partiel tous les N tokens
+ROADMAP_STREAM_FLUSH_TOKENS = int(os.environ.get('ROADMAP_STREAM_FLUSH_TOKENS', 50))
+
+# Génération par sections (une par catégorie de questions) : seules les
+# sections dont les réponses ont changé sont régénérées par le worker
+ROADMAP_SECTIONED_GENERATION = os.environ.get('ROADMAP_SECTIONED_GENERATION', 'False') == 'True'
+
+# Worker de génération (python manage.py run_generation_worker)
+GENERATION_WORKER_CONCURRENCY = int(os.environ.get('GENERATION_WORKER_CONCURRENCY', 4))
+GENERATION_WORKER_POLL_INTERVAL = float(os.environ.get('GENERATION_WORKER_POLL_INTERVAL', 2.0))
+GENERATION_WORKER_STALE_AFTER = int(os.environ.get('GENERATION_WORKER_STALE_AFTER', 600))
+# Bail d'une génération en cours (secondes) : au-delà, la roadmap peut être régénérée
+ROADMAP_GENERATION_LEASE = int(os.environ.get('ROADMAP_GENERATION_LEASE', 900))
+
+# Historique des réponses : backups en deltas inverses, une version entière toutes les N ;
+# rétention par défaut de prune_response_backups (dernières versions conservées)
+RESPONSE_BACKUP_SNAPSHOT_EVERY = int(os.environ.get('RESPONSE_BACKUP_SNAPSHOT_EVERY', 10))
+RESPONSE_BACKUP_KEEP_LAST = int(os.environ.get('RESPONSE_BACKUP_KEEP_LAST', 20))
+# Archivage froid (archive_response_backups) : NDJSON compressé par mois, hors de la base
+RESPONSE_BACKUP_ARCHIVE_DIR = os.environ.get('RESPONSE_BACKUP_ARCHIVE_DIR', str(BASE_DIR / 'var' / 'backup_archive'))
+RESPONSE_BACKUP_ARCHIVE_AFTER_DAYS = int(os.environ.get('RESPONSE_BACKUP_ARCHIVE_AFTER_DAYS', 180))
+
+# Brouillons de réponses (DraftStore) : une ligne ResponseDraft par (utilisateur, question),
+# copiée dans le cache 'drafts' pour les lectures
+DRAFT_STORE_CACHE_ALIAS = 'drafts'
+DRAFT_STORE_TTL = int(os.environ.get('DRAFT_STORE_TTL', SESSION_COOKIE_AGE))
+
+# Réutilisation des roadmaps de profils similaires : la roadmap terminée la plus
+# proche (cosinus TF-IDF des réponses hachées) sert de base à adapter par le modèle économique.
+# Désactivée par défaut : elle change de modèle et transmet la roadmap d'un autre utilisateur
+ROADMAP_PROFILE_REUSE = os.environ.get('ROADMAP_PROFILE_REUSE', 'False') == 'True'
+ROADMAP_PROFILE_REUSE_THRESHOLD = float(os.environ.get('ROADMAP_PROFILE_REUSE_THRESHOLD', 0.9))
+ROADMAP_PROFILE_DIMENSIONS = int(os.environ.get('ROADMAP_PROFILE_DIMENSIONS', 512))
+
+# Questionnaire actif mis en cache par processus, invalidé par version partagée ;
+# durée de vie de la copie locale si le cache partagé est indisponible (DummyCache)
+QUESTIONNAIRE_CACHE_TTL = int(os.environ.get('QUESTIONNAIRE_CACHE_TTL', 60))
+
+# Comptage de tokens : encodages tiktoken chargés au démarrage du serveur et du worker, et LRU des comptes par contenu
+TOKEN_COUNTER_WARMUP_MODELS = [
+    model for model in os.environ.get('TOKEN_COUNTER_WARMUP_MODELS', 'gpt-4,gpt-3.5-turbo').split(',') if model
+]
+TOKEN_COUNT_CACHE_SIZE = int(os.environ.get('TOKEN_COUNT_CACHE_SIZE', 10000))
+
+# Template de prompt utilisé pour la génération (par défaut : dernier PromptTemplate actif modifié)
+PROMPT_TEMPLATE_NAME = os.environ.get('PROMPT_TEMPLATE_NAME')
+# Durée de vie du registre des templates si le cache partagé est indisponible (DummyCache)
+PROMPT_REGISTRY_CACHE_TTL = int(os.environ.get('PROMPT_REGISTRY_CACHE_TTL', 60))
+
+# Génération par lots via l'API Batch (submit_generation_batch / import_generation_batch)
+# AI_BATCH_BACKEND = local traite les lots hors ligne avec le client simulé
+AI_BATCH_BACKEND = os.environ.get('AI_BATCH_BACKEND', 'openai')
+AI_BATCH_DIR = os.environ.get('AI_BATCH_DIR', str(BASE_DIR / 'var' / 'batches'))
+AI_BATCH_COMPLETION_WINDOW = os.environ.get('AI_BATCH_COMPLETION_WINDOW', '24h')
+# Bail (secondes) des roadmaps d'un lot : fenêtre de traitement et délai d'import
+AI_BATCH_LEASE = int(os.environ.get('AI_BATCH_LEASE', 48 * 60 * 60))
+# Onboarding de cohorte : les soumissions finales attendent le prochain lot au lieu du worker
+AI_BATCH_SUBMISSIONS = os.environ.get('AI_BATCH_SUBMISSIONS', 'False') == 'True'
+
+# Cache des complétions OpenAI (clé = empreinte des messages et paramètres)
+AI_COMPLETION_CACHE_ENABLED = os.environ.get('AI_COMPLETION_CACHE_ENABLED', 'True') == 'True'
+AI_COMPLETION_CACHE_ALIAS = 'ai_completions'
+AI_COMPLETION_CACHE_TTL = int(os.environ.get('AI_COMPLETION_CACHE_TTL', 60 * 60 * 24))
+AI_COMPLETION_CACHE_MAX_ENTRIES = int(os.environ.get('AI_COMPLETION_CACHE_MAX_ENTRIES', 1000))
+AI_COMPLETION_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('AI_COMPLETION_CACHE_MAX_ENTRY_BYTES', 256 * 1024))
+
+# Résilience des appels OpenAI : relances avec backoff et disjoncteur par modèle
+OPENAI_RETRY_MAX_RETRIES = int(os.environ.get('OPENAI_RETRY_MAX_RETRIES', 3))
+OPENAI_RETRY_BASE_DELAY = float(os.environ.get('OPENAI_RETRY_BASE_DELAY', 1.0))
+OPENAI_RETRY_MAX_DELAY = float(os.environ.get('OPENAI_RETRY_MAX_DELAY', 60.0))
+OPENAI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('OPENAI_CIRCUIT_FAILURE_THRESHOLD', 5))
+OPENAI_CIRCUIT_RECOVERY_TIMEOUT = float(os.environ.get('OPENAI_CIRCUIT_RECOVERY_TIMEOUT', 30.0))
+
+# Budget de tokens du prompt : réservation de complétion minimale après condensation
+PROMPT_BUDGET_MIN_COMPLETION_TOKENS = int(os.environ.get('PROMPT_BUDGET_MIN_COMPLETION_TOKENS', 1000))
+
+# Routage des générations selon la complexité du questionnaire
+AI_ROUTING_ENABLED = os.environ.get('AI_ROUTING_ENABLED', 'True') == 'True'
+AI_ROUTING_SIMPLE_MODEL = os.environ.get('AI_ROUTING_SIMPLE_MODEL', 'gpt-3.5-turbo')
+AI_ROUTING_COMPLEX_MODEL = os.environ.get('AI_ROUTING_COMPLEX_MODEL', 'gpt-4')
+AI_ROUTING_FALLBACK_MODEL = os.environ.get('AI_ROUTING_FALLBACK_MODEL', 'gpt-3.5-turbo')
+AI_ROUTING_MIN_TECHNICAL_PRECISION = float(os.environ.get('AI_ROUTING_MIN_TECHNICAL_PRECISION', 0.3))
+AI_ROUTING_MIN_RESPONSES = int(os.environ.get('AI_ROUTING_MIN_RESPONSES', 10))
+AI_ROUTING_MAX_COST_PER_1K_TOKENS = float(os.environ.get('AI_ROUTING_MAX_COST_PER_1K_TOKENS', 0))  # 0 = sans cible
+AI_ROUTING_DEADLINE = float(os.environ.get('AI_ROUTING_DEADLINE', 90.0))
+AI_ROUTING_FIRST_TOKEN_DEADLINE = float(os.environ.get('AI_ROUTING_FIRST_TOKEN_DEADLINE', 20.0))
+
+# Sonde de santé du fournisseur IA (mise en cache, sans consommation de tokens)
+AI_HEALTH_CACHE_TTL = int(os.environ.get('AI_HEALTH_CACHE_TTL', 30))
+AI_HEALTH_PROBE_TIMEOUT = float(os.environ.get('AI_HEALTH_PROBE_TIMEOUT', 5.0))
+AI_HEALTH_STATS_WINDOW = float(os.environ.get('AI_HEALTH_STATS_WINDOW', 300.0))
+AI_HEALTH_STATS_MAX_CALLS = int(os.environ.get('AI_HEALTH_STATS_MAX_CALLS', 500))
+AI_HEALTH_MIN_CALLS = int(os.environ.get('AI_HEALTH_MIN_CALLS', 5))
+AI_HEALTH_MIN_SUCCESS_RATE = float(os.environ.get('AI_HEALTH_MIN_SUCCESS_RATE', 0.9))
+# Compteurs d'appels publiés par les workers et relus par les processus web
+AI_HEALTH_STATS_CACHE_ALIAS = 'ai_counters'
+
+# Limiteur de débit RPM/TPM partagé par les workers (cache Django à incr atomique)
+# OPENAI_RATE_LIMITS fixe les limites par modèle (illimitées par défaut), ex. {"gpt-4": {"rpm": 500, "tpm": 10000}}
+# Alias dédié : en local (LocMem) la limite s'applique par processus, Redis la partage en production
+OPENAI_RATE_LIMIT_CACHE_ALIAS = 'ai_counters'
+OPENAI_RATE_LIMIT_MAX_WAIT = float(os.environ.get('OPENAI_RATE_LIMIT_MAX_WAIT', 300.0))
+OPENAI_RATE_LIMITS = json.loads(os.environ.get('OPENAI_RATE_LIMITS', '{}'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    AI_COMPLETION_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ai-completions',
+        'TIMEOUT': AI_COMPLETION_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': AI_COMPLETION_CACHE_MAX_ENTRIES,
+        },
+    },
+    OPENAI_RATE_LIMIT_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ai-counters',
+    },
+    # Pas de copie propre au processus (périmée dès qu'un autre worker écrit) :
+    # sans backend partagé, les brouillons sont lus en base
+    DRAFT_STORE_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
 
 
 
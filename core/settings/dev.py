@@ -63,5 +63,8 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    AI_COMPLETION_CACHE_ALIAS: CACHES[AI_COMPLETION_CACHE_ALIAS],
+    OPENAI_RATE_LIMIT_CACHE_ALIAS: CACHES[OPENAI_RATE_LIMIT_CACHE_ALIAS],
+    DRAFT_STORE_CACHE_ALIAS: CACHES[DRAFT_STORE_CACHE_ALIAS],
 }
@@ -62,7 +62,26 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': os.environ.get('REDIS_URL'),
-    }
+    },
+    # Le nombre d'entrées est borné par la maxmemory-policy (allkeys-lru) de Redis
+    AI_COMPLETION_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL'),
+        'KEY_PREFIX': 'ai',
+        'TIMEOUT': AI_COMPLETION_CACHE_TTL,
+    },
+    OPENAI_RATE_LIMIT_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL'),
+        'KEY_PREFIX': 'counters',
+    },
+    # Copie des brouillons ResponseDraft ; une entrée évincée est relue en base
+    DRAFT_STORE_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL'),
+        'KEY_PREFIX': 'drafts',
+        'TIMEOUT': DRAFT_STORE_TTL,
+    },
 }
 
 # Configuration Email (SMTP pour la production)
@@ -5,6 +5,9 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
+
+La génération en streaming (?stream=1) nécessite le serveur ASGI (core.asgi) :
+sous WSGI, les demandes de streaming passent par la file de génération.
 """
 
 import os
@@ -12,4 +15,10 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.dev')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Encodages tiktoken chargés hors du chemin des requêtes
+from django.conf import settings  # noqa: E402
+from apps.response_management.services.token_counter import start_warm_up  # noqa: E402
+
+start_warm_up(settings.TOKEN_COUNTER_WARMUP_MODELS)